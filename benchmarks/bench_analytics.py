@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+🧮 Benchmark do motor analítico colunar
+Compara ColumnarView.aggregate (NumPy) com a varredura em Python puro (aggregate_scan)
+nos agrupamentos usados pelo dashboard e pelos resumos, conferindo que os resultados
+são idênticos. Também mede a construção da visão e o acréscimo incremental.
+
+Uso: python benchmarks/bench_analytics.py [--size 1M] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from expense_tracker_voice_fixed import ColumnarView, aggregate_scan, optional_numpy
+from synthetic import generate_dataset, parse_size
+
+SCENARIOS = {
+    "categorias no período": ("category", {"date_from": "2024-03-01", "date_to": "2024-09-30", "type": "despesa"}),
+    "fontes no ano": ("source", {"year": 2024}),
+    "gastos por viagem": ("trip_id", {"has_trip": True, "type": "despesa"}),
+    "totais por mês": ("month", {"type": "despesa"}),
+    "moedas (BRL, lazer)": ("currency", {"category": "lazer", "currency": "BRL"}),
+}
+
+
+def best_of(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="1M")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    np = optional_numpy()
+    if np is None:
+        print("❌ NumPy não está instalado")
+        return 1
+
+    size = parse_size(args.size)
+    transactions = generate_dataset(size)["transactions"]
+    print(f"📦 {size} transações")
+
+    build_ms, view = best_of(lambda: ColumnarView(np, transactions), 1)
+    print(f"   construção da visão      {build_ms:10.1f} ms")
+    extra = generate_dataset(1000, seed=99)["transactions"]
+    start = time.perf_counter()
+    for transaction in extra:
+        view.extend([transaction])
+    print(f"   acréscimo incremental    {(time.perf_counter() - start) * 1000 / len(extra):10.4f} ms/transação")
+    transactions.extend(extra)
+
+    ok = True
+    for name, (group_by, filters) in SCENARIOS.items():
+        scan_ms, expected = best_of(lambda: aggregate_scan(transactions, group_by, **filters), args.repeat)
+        column_ms, result = best_of(lambda: view.aggregate(group_by, **filters), args.repeat)
+        same = result == expected
+        ok &= same
+        print(f"   {'✅' if same else '❌'} {name:24s} python {scan_ms:9.1f} ms   numpy {column_ms:8.1f} ms "
+              f"({scan_ms / column_ms:5.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+🧠 Benchmark de memória das transações em memória
+Compara, com tracemalloc, a lista de dicts produzida pelo json.load com a lista
+de registros Transaction (__slots__ + strings internadas) após compact_transactions.
+Também confere que a serialização volta ao mesmo JSON.
+
+Uso: python benchmarks/bench_memory.py [--sizes 100k,500k]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from expense_tracker_voice_fixed import compact_transactions, json_default
+from synthetic import parse_size, write_dataset
+
+
+def load_transactions(path: str) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["transactions"]
+
+
+def measure(build) -> tuple:
+    """(bytes retidos pelo resultado, segundos) de build()"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+
+def compacted(path: str) -> list:
+    transactions = load_transactions(path)
+    compact_transactions(transactions)
+    return transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,500k")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            path = os.path.join(directory, f"memory_{size}.json")
+            write_dataset(path, size)
+            print(f"📦 {label}: {size} transações")
+
+            dicts, dict_bytes, dict_seconds = measure(lambda: load_transactions(path))
+            expected = json.dumps(dicts, ensure_ascii=False)
+            del dicts
+            records, record_bytes, record_seconds = measure(lambda: compacted(path))
+            same = json.dumps(records, ensure_ascii=False, default=json_default) == expected
+            del records
+
+            print(f"   dicts        {dict_bytes / 1e6:9.1f} MB ({dict_bytes / size:6.0f} B/transação) "
+                  f"carga {dict_seconds * 1000:8.0f} ms")
+            print(f"   Transaction  {record_bytes / 1e6:9.1f} MB ({record_bytes / size:6.0f} B/transação) "
+                  f"carga {record_seconds * 1000:8.0f} ms")
+            print(f"   {'✅' if same else '❌'} {dict_bytes / record_bytes:.2f}x menos memória, JSON idêntico: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+🗂️ Benchmark do armazenamento particionado por ano contra o JSON único
+Para cada tamanho, grava o dataset sintético (deslocado para terminar no ano
+corrente) em JSON, divide em partições anuais (migrate_storage) e mede, em processos
+Python novos, a carga do tracker, o pico de memória, o resumo do mês corrente e as
+consultas mensais de um ano antigo (a primeira carrega a partição, a segunda usa o LRU).
+
+Uso: python benchmarks/bench_partitions.py [--sizes 100k,1M] [--modes json,partitioned]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import parse_size
+
+# Gerado e convertido em um processo à parte: o RSS máximo do pai passaria para as medições
+PREPARE = """
+import json, sys, time
+from datetime import date
+sys.path.insert(0, "benchmarks")
+from expense_tracker_voice_fixed import migrate_storage
+from synthetic import generate_dataset
+data = generate_dataset(int(sys.argv[2]))
+# Os dados sintéticos terminam em 2025: o último ano vira o corrente (partição quente)
+shift = date.today().year - 2025
+for record in data["transactions"]:
+    record["date"] = f"{int(record['date'][:4]) + shift}{record['date'][4:]}"
+with open(sys.argv[1], "w", encoding="utf-8") as f:
+    json.dump(data, f, ensure_ascii=False)
+del data
+started = time.perf_counter()
+migrate_storage("partitioned", sys.argv[1], source_mode="json")
+print(json.dumps({"convert_s": time.perf_counter() - started}))
+"""
+
+PROBE = """
+import json, resource, sys, time
+from datetime import date
+import expense_tracker_voice_fixed as module
+scale = 1 if sys.platform == "darwin" else 1024
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+today = date.today()
+started = time.perf_counter()
+tracker = module.ExpenseTracker(sys.argv[1], storage_mode=sys.argv[2])
+loaded = time.perf_counter()
+peak_load = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+tracker.get_monthly_summary(today.year, today.month)
+current = time.perf_counter()
+tracker.query_transactions(year=today.year - 2, month=3, has_trip=False, type="despesa")
+cold_first = time.perf_counter()
+tracker.query_transactions(year=today.year - 2, month=4, has_trip=False, type="despesa")
+cold_second = time.perf_counter()
+print(json.dumps({
+    "load_ms": (loaded - started) * 1000,
+    "current_month_ms": (current - loaded) * 1000,
+    "cold_first_ms": (cold_first - current) * 1000,
+    "cold_cached_ms": (cold_second - cold_first) * 1000,
+    "peak_load_mb": (peak_load - base) / 1e6,
+    "resident": len(tracker.data["transactions"]),
+}))
+"""
+
+
+def run_script(script: str, *args) -> dict:
+    output = subprocess.run([sys.executable, "-c", script, *map(str, args)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M")
+    parser.add_argument("--modes", default="json,partitioned")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            data_file = os.path.join(directory, f"partitions_{size}.json")
+            prepared = run_script(PREPARE, data_file, size)
+            print(f"📦 {label}: {size} transações | JSON {os.path.getsize(data_file) / 1e6:.1f} MB "
+                  f"(divisão em partições {prepared['convert_s']:.1f}s)")
+
+            for mode in args.modes.split(","):
+                result = run_script(PROBE, data_file, mode)
+                print(f"   {mode:12s} carga {result['load_ms']:9.1f} ms | pico {result['peak_load_mb']:8.1f} MB | "
+                      f"{result['resident']:8d} em memória | mês corrente {result['current_month_ms']:7.1f} ms | "
+                      f"ano antigo {result['cold_first_ms']:8.1f} ms (1ª), {result['cold_cached_ms']:6.1f} ms (LRU)")
+
+
+if __name__ == "__main__":
+    main()
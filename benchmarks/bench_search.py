@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+🔎 Benchmark da busca textual (/api/search)
+Para cada tamanho, mede a construção do índice invertido (primeira busca), a
+latência de buscas típicas — palavra exata, prefixo, várias palavras, com filtro de
+ano e de viagem — pelo tracker e pela rota (sem cache de respostas) e o custo de
+manter o índice em uma inserção.
+
+Uso: python benchmarks/bench_search.py [--sizes 10k,100k] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import expense_tracker_voice_fixed as app_module
+from expense_tracker_voice_fixed import ExpenseTracker
+from synthetic import parse_size, write_dataset
+
+QUERIES = [
+    ("exata", "uber", {}),
+    ("exata comum", "supermercado", {}),
+    ("prefixo", "starb", {}),
+    ("prefixo curto", "ca", {}),
+    ("várias palavras", "cafe manha", {}),
+    ("acentos", "AÇAÍ", {}),
+    ("ano", "pizza", {"year": 2024}),
+    ("viagem", "taxi", None),
+]
+
+
+def measure(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"best_ms": min(samples), "median_ms": statistics.median(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--storage", default="json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            data_file = os.path.join(directory, f"search_{size}.json")
+            data = write_dataset(data_file, size)
+            trip_id = Counter(t["trip_id"] for t in data["transactions"] if t["trip_id"]).most_common(1)[0][0]
+            del data
+
+            tracker = ExpenseTracker(data_file, storage_mode=args.storage)
+            started = time.perf_counter()
+            tracker.search_transactions("uber")
+            print(f"📦 {label}: {size} transações | índice construído em {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            for name, query, filters in QUERIES:
+                filters = {"trip_id": trip_id} if filters is None else filters
+                total = tracker.search_transactions(query, 20, 0, **filters)[1]
+                result = measure(lambda: tracker.search_transactions(query, 20, 0, **filters), args.repeat)
+                print(f"   {name:16s} {query!r:16s} {total:7d} resultados | "
+                      f"{result['best_ms']:7.3f} ms (mediana {result['median_ms']:.3f})")
+
+            app_module.tracker = tracker
+            client = app_module.app.test_client()
+            result = measure(lambda: (app_module.response_cache.clear(), client.get('/api/search?q=uber')),
+                             args.repeat)
+            print(f"   {'rota /api/search':16s} {'uber':16s} {'':18s}| "
+                  f"{result['best_ms']:7.3f} ms (mediana {result['median_ms']:.3f})")
+
+            index = tracker._resident.search
+            transactions = tracker.data["transactions"][:1000]
+            result = measure(lambda: [index.add(transaction) for transaction in transactions], 5)
+            print(f"   {'manutenção':16s} {'1000 inserções':16s} {'':18s}| "
+                  f"{result['best_ms'] / 1000 * 1000:7.3f} µs por transação")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+💽 Benchmark do snapshot binário contra o JSON
+Para cada tamanho, grava o dataset sintético em JSON, converte para o snapshot
+binário (migrate_storage) e mede, em processos Python novos, o tempo de carga do
+tracker (dados + índices), o pico de memória (RSS máximo acima do processo após o
+import), a primeira consulta mensal e o tempo de gravação do snapshot.
+
+Uso: python benchmarks/bench_snapshot.py [--sizes 100k,1M] [--modes json,binary]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import parse_size
+
+# No Linux o RSS máximo sobrevive ao fork/exec: o processo pai (que lança as medições)
+# não pode crescer, então o dataset também é gerado e convertido em um processo à parte
+PREPARE = """
+import json, sys, time
+sys.path.insert(0, "benchmarks")
+from expense_tracker_voice_fixed import migrate_storage
+from synthetic import write_dataset
+data = write_dataset(sys.argv[1], int(sys.argv[2]))
+month = data["transactions"][0]["date"][:7]
+del data
+started = time.perf_counter()
+migrate_storage("binary", sys.argv[1], source_mode="json")
+print(json.dumps({"year": int(month[:4]), "month": int(month[5:]), "convert_s": time.perf_counter() - started}))
+"""
+
+# Executado em um interpretador novo para cada medição (o pico de RSS não volta a cair)
+PROBE = """
+import json, resource, sys, time
+import expense_tracker_voice_fixed as module
+scale = 1 if sys.platform == "darwin" else 1024
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+started = time.perf_counter()
+tracker = module.ExpenseTracker(sys.argv[1], storage_mode=sys.argv[2])
+loaded = time.perf_counter()
+peak_load = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+tracker.get_monthly_summary(int(sys.argv[3]), int(sys.argv[4]))
+queried = time.perf_counter()
+tracker.save_data()
+saved = time.perf_counter()
+print(json.dumps({
+    "load_ms": (loaded - started) * 1000,
+    "first_monthly_ms": (queried - loaded) * 1000,
+    "save_ms": (saved - queried) * 1000,
+    "peak_load_mb": (peak_load - base) / 1e6,
+    "startup": tracker.startup,
+}))
+"""
+
+
+def run_script(script: str, *args) -> dict:
+    output = subprocess.run([sys.executable, "-c", script, *map(str, args)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M")
+    parser.add_argument("--modes", default="json,binary")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            data_file = os.path.join(directory, f"snapshot_{size}.json")
+            prepared = run_script(PREPARE, data_file, size)
+            snapshot_file = os.path.splitext(data_file)[0] + ".snap"
+            print(f"📦 {label}: {size} transações | JSON {os.path.getsize(data_file) / 1e6:.1f} MB, "
+                  f"snapshot {os.path.getsize(snapshot_file) / 1e6:.1f} MB (conversão {prepared['convert_s']:.1f}s)")
+
+            for mode in args.modes.split(","):
+                result = run_script(PROBE, data_file, mode, prepared["year"], prepared["month"])
+                print(f"   {mode:8s} carga {result['load_ms']:9.1f} ms | pico {result['peak_load_mb']:8.1f} MB | "
+                      f"1ª consulta mensal {result['first_monthly_ms']:7.1f} ms | "
+                      f"gravação {result['save_ms']:9.1f} ms | fases {result['startup']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark de cold start
+Mede, em processos Python novos, o tempo de import do módulo e o tempo até a
+primeira resposta de /api/health (pronto) e de /api/transactions, para cada modo
+de carga (PRELOAD=eager|background|lazy, aplicado por create_app()).
+
+Uso: python benchmarks/bench_startup.py [--repeat 5] [--modes eager,background,lazy]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado em um interpretador novo para cada medição
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import expense_tracker_voice_fixed as module
+imported = time.perf_counter()
+client = module.create_app().test_client()
+first = client.get('/api/health')
+health = time.perf_counter()
+client.get('/api/transactions')
+transactions = time.perf_counter()
+while client.get('/api/health').status_code != 200:
+    time.sleep(0.001)
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_health_ms": (health - started) * 1000,
+    "first_health_status": first.status_code,
+    "first_transactions_ms": (transactions - started) * 1000,
+    "matplotlib_loaded": "matplotlib" in sys.modules,
+    "startup": client.get('/api/health').get_json()["startup"],
+}))
+"""
+
+
+def probe(mode: str) -> dict:
+    env = dict(os.environ, PRELOAD=mode)
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modes", default="eager,background,lazy")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        runs = [probe(mode) for _ in range(args.repeat)]
+        median = lambda key: statistics.median(run[key] for run in runs)
+        print(f"🚀 PRELOAD={mode}")
+        print(f"   import:                 {median('import_ms'):8.1f} ms")
+        print(f"   1ª /api/health:         {median('first_health_ms'):8.1f} ms "
+              f"(status {runs[-1]['first_health_status']})")
+        print(f"   1ª /api/transactions:   {median('first_transactions_ms'):8.1f} ms")
+        print(f"   matplotlib carregado:   {any(run['matplotlib_loaded'] for run in runs)}")
+        print(f"   fases: {runs[-1]['startup']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+📊 Suíte de benchmarks dos caminhos quentes do tracker
+Gera datasets sintéticos determinísticos (benchmarks/synthetic.py) e mede, por tamanho:
+load_data, save_data, get_monthly_summary, get_trip_summary, classify_description,
+voice_shortcut, /api/dashboard/stats (sem cache), /api/dashboard (cache e 304) e
+create_pie_chart (PNG e SVG, sem cache).
+
+Os resultados vão para um JSON comparável entre execuções. Com --baseline, a execução
+falha (código 1) se algum cenário ficar mais lento que o limite (--threshold).
+
+Uso: python benchmarks/bench_suite.py [--sizes 10k,100k,1M] [--repeat 3] [--storage json]
+                                      [--output resultados.json] [--baseline anterior.json]
+                                      [--threshold 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import expense_tracker_voice_fixed as app_module
+from expense_tracker_voice_fixed import ExpenseTracker
+from synthetic import generate_dataset, parse_size, voice_commands
+
+# Diferenças abaixo disso (por operação) são ruído, mesmo que passem do limite relativo
+NOISE_FLOOR_MS = 0.05
+
+
+def measure(fn, repeat: int, ops: int = 1, setup=None) -> dict:
+    """Melhor e mediana de `repeat` execuções, em ms por operação"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000 / ops)
+    return {"best_ms": round(min(samples), 4), "median_ms": round(statistics.median(samples), 4),
+            "ops": ops, "repeat": repeat}
+
+
+def busiest_month(data: dict):
+    months = {}
+    for transaction in data["transactions"]:
+        key = transaction["date"][:7]
+        months[key] = months.get(key, 0) + 1
+    year, month = max(months, key=months.get).split("-")
+    return int(year), int(month)
+
+
+def run_size(size: int, repeat: int, storage: str, voice_calls: int, directory: str) -> dict:
+    data_file = os.path.join(directory, f"bench_{size}.json")
+    data = generate_dataset(size)
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    year, month = busiest_month(data)
+    trip_id = Counter(t["trip_id"] for t in data["transactions"] if t["trip_id"]).most_common(1)[0][0]
+    descriptions = [t["description"] for t in data["transactions"][:1000]]
+    del data
+
+    tracker = ExpenseTracker(data_file, storage_mode=storage)
+    results = {}
+
+    results["load_data"] = measure(tracker.load_data, repeat)
+    results["get_monthly_summary"] = measure(lambda: tracker.get_monthly_summary(year, month), repeat)
+    results["get_trip_summary"] = measure(lambda: tracker.get_trip_summary(trip_id), repeat)
+    results["classify_description"] = measure(
+        lambda: [tracker.classify_description(d) for d in descriptions], repeat, ops=len(descriptions))
+
+    # As rotas usam o tracker global do módulo
+    app_module.tracker = tracker
+    client = app_module.app.test_client()
+    results["api_dashboard_stats"] = measure(lambda: client.get('/api/dashboard/stats'), repeat,
+                                             setup=app_module.response_cache.clear)
+    results["api_dashboard_cached"] = measure(lambda: client.get('/api/dashboard'), repeat)
+    etag = client.get('/api/dashboard').headers['ETag']
+    results["api_dashboard_304"] = measure(
+        lambda: client.get('/api/dashboard', headers={'If-None-Match': etag}), repeat)
+
+    results["create_pie_chart_png"] = measure(lambda: tracker.create_pie_chart(year, month), repeat,
+                                              setup=tracker.chart_cache.clear)
+    results["create_pie_chart_svg"] = measure(lambda: tracker.create_pie_chart(year, month, fmt="svg"), repeat,
+                                              setup=tracker.chart_cache.clear)
+
+    # Escritas por último: alteram o arquivo usado pelas medições acima
+    results["save_data"] = measure(tracker.save_data, repeat)
+    commands = voice_commands(voice_calls * repeat)
+    batches = iter([commands[i:i + voice_calls] for i in range(0, len(commands), voice_calls)])
+    results["voice_shortcut"] = measure(
+        lambda: [tracker.voice_shortcut(command) for command in next(batches)], repeat, ops=voice_calls)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Cenários que ficaram mais lentos que baseline * (1 + threshold)"""
+    regressions = []
+    for size, scenarios in current["results"].items():
+        for scenario, result in scenarios.items():
+            previous = baseline.get("results", {}).get(size, {}).get(scenario)
+            if not previous:
+                continue
+            limit = previous["best_ms"] * (1 + threshold)
+            if result["best_ms"] > limit and result["best_ms"] - previous["best_ms"] > NOISE_FLOOR_MS:
+                regressions.append((size, scenario, previous["best_ms"], result["best_ms"]))
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--storage", default="json", help="json, journal, sqlite ou binary")
+    parser.add_argument("--voice-calls", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.25, help="lentidão relativa tolerada (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": args.storage,
+            "repeat": args.repeat
+        },
+        "results": {}
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            print(f"📦 {label}: {size} transações")
+            results = run_size(size, args.repeat, args.storage, args.voice_calls, directory)
+            report["results"][label] = results
+            for scenario, result in results.items():
+                print(f"   {scenario:24s} {result['best_ms']:12.3f} ms (mediana {result['median_ms']:.3f})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Resultados em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressão(ões) acima de {args.threshold:.0%}:")
+            for size, scenario, before, after in regressions:
+                print(f"   {size} {scenario}: {before:.3f} → {after:.3f} ms ({after / before:.2f}x)")
+            return 1
+        print(f"✅ Nenhuma regressão acima de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+⏱️ Microbenchmark do parser de comandos de voz
+Compara a gramática compilada (parse_voice_command) com a antiga lista de 25 regex
+
+Divergências esperadas: comandos com símbolo e palavra de moeda ("€12 euros pizza"),
+em que a gramática não deixa mais a palavra "euros" vazar para a descrição.
+
+Uso: python benchmarks/bench_voice_parser.py [--commands 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expense_tracker_voice_fixed import parse_voice_command
+
+# Lista de padrões usada por voice_shortcut antes da gramática compilada
+LEGACY_PATTERNS = [
+    r'gravar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'gravar\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'paguei\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'paguei\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'gastei\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'gastei\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'comprei\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'comprei\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'adicionar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'adicionar\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'gasto\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'gasto\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'gravar\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'paguei\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'gastei\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'comprei\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+    r'registrar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)?\s*(.+)',
+    r'anotar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)?\s*(.+)',
+    r'despesa\s+(?:de\s+)?(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)?\s*(.+)',
+    r'(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
+    r'(\d+(?:[.,]\d{1,2})?)\s+(.+)'
+]
+
+VERBS = ["gravar", "paguei", "gastei", "comprei", "adicionar", "gasto", "registrar", "anotar", "despesa de", ""]
+CURRENCIES = ["euros", "reais", "euro", "", "", ""]
+DESCRIPTIONS = [
+    "pizza delivery", "café da manhã", "uber centro", "supermercado", "jantar restaurante",
+    "passagem ryanair", "aluguel do quarto", "cinema com amigos", "x", "netflix", "hostel em lisboa"
+]
+
+
+def legacy_parse(command: str):
+    """Laço antigo: testa os padrões um a um até achar um válido"""
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, command)
+        if match:
+            amount = float(match.group(1).replace(',', '.'))
+            description = match.group(2).strip()
+            if amount <= 0 or amount > 10000 or len(description) < 2:
+                continue
+            return amount, description
+    return None
+
+
+def compiled_parse(command: str):
+    parsed = parse_voice_command(command)
+    if parsed and 0 < parsed["amount"] <= 10000 and len(parsed["description"]) >= 2:
+        return parsed["amount"], parsed["description"]
+    return None
+
+
+def build_corpus(size: int, seed: int = 42):
+    """Corpus determinístico de comandos, incluindo alguns inválidos"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < 0.1:
+            corpus.append(rng.choice(["gravar pizza", "quanto gastei hoje", "paguei muito caro", ""]))
+            continue
+        amount = rng.choice([str(rng.randint(1, 200)), f"{rng.randint(1, 99)},{rng.randint(0, 99):02d}"])
+        amount = rng.choice(["", "", "€", "r$ "]) + amount
+        parts = [rng.choice(VERBS), amount, rng.choice(CURRENCIES), rng.choice(DESCRIPTIONS)]
+        corpus.append(" ".join(part for part in parts if part))
+    return corpus
+
+
+# Símbolo seguido da palavra de moeda: a única diferença intencional entre os parsers
+REDUNDANT_CURRENCY = re.compile(r'(?:€|r\$)\s*\d+(?:[.,]\d{1,2})?\s+(?:euros?|reais?)\s')
+
+
+def timed(parse, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for command in corpus:
+            parse(command)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    corpus = build_corpus(args.commands)
+    mismatches = [command for command in corpus if legacy_parse(command) != compiled_parse(command)]
+    expected = [command for command in mismatches if REDUNDANT_CURRENCY.search(command)]
+    mismatches = [command for command in mismatches if not REDUNDANT_CURRENCY.search(command)]
+    legacy_time = timed(legacy_parse, corpus, args.repeat)
+    compiled_time = timed(compiled_parse, corpus, args.repeat)
+    
+    print(f"📋 Comandos: {len(corpus)}")
+    print(f"🐢 Lista de padrões:    {legacy_time * 1e6 / len(corpus):8.2f} µs/comando")
+    print(f"🚀 Gramática compilada: {compiled_time * 1e6 / len(corpus):8.2f} µs/comando")
+    print(f"📈 Ganho: {legacy_time / compiled_time:.1f}x")
+    print(f"🔍 Divergências: {len(mismatches)} (+{len(expected)} esperadas: símbolo + palavra de moeda)")
+    for command in mismatches[:10]:
+        print(f"   '{command}': {legacy_parse(command)} != {compiled_parse(command)}")
+
+
+if __name__ == "__main__":
+    main()
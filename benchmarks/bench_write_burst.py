@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+✍️ Benchmark de rajadas de escrita por modo de durabilidade
+Grava uma rajada de transações (como uma sequência de comandos de voz) sobre um
+dataset sintético e mede a latência por escrita vista pela requisição e o tempo
+até tudo estar no disco (flush), para cada backend e modo de durabilidade.
+
+Uso: python benchmarks/bench_write_burst.py [--size 10k] [--burst 200]
+                                            [--modes json,journal,sqlite]
+                                            [--durability immediate,grouped,shutdown]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from expense_tracker_voice_fixed import ExpenseTracker
+from synthetic import parse_size, write_dataset
+
+
+def run(source: str, directory: str, mode: str, durability: str, burst: int) -> dict:
+    data_file = os.path.join(directory, f"burst_{mode}_{durability}.json")
+    shutil.copy(source, data_file)
+    tracker = ExpenseTracker(data_file, storage_mode=mode, durability=durability)
+    # Fixa a taxa para não medir a rede
+    tracker.get_exchange_rate = lambda *args: 6.0
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(burst):
+        before = time.perf_counter()
+        tracker.add_transaction(10.0, "despesa", "alimentacao", f"rajada {i}")
+        latencies.append(time.perf_counter() - before)
+    tracker.flush()
+    durable = time.perf_counter() - started
+
+    persisted = len(ExpenseTracker(data_file, storage_mode=mode).data["transactions"])
+    latencies.sort()
+    return {
+        "mean_ms": sum(latencies) / burst * 1000,
+        "p99_ms": latencies[int(burst * 0.99) - 1] * 1000,
+        "durable_ms": durable * 1000,
+        "persisted": persisted
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k")
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--modes", default="json,journal,sqlite")
+    parser.add_argument("--durability", default="immediate,grouped,shutdown")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.json")
+        write_dataset(source, size)
+        print(f"📦 {size} transações, rajada de {args.burst} escritas")
+        for mode in args.modes.split(","):
+            for durability in args.durability.split(","):
+                result = run(source, directory, mode, durability, args.burst)
+                ok = result["persisted"] == size + args.burst
+                print(f"   {'✅' if ok else '❌'} {mode:8s} {durability:10s} "
+                      f"média {result['mean_ms']:8.3f} ms  p99 {result['p99_ms']:8.3f} ms  "
+                      f"tudo no disco em {result['durable_ms']:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
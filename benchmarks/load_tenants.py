@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+👥 Teste de carga do modo multi-tenant (TENANT_MODE=multi)
+Simula milhares de tenants sobre o app Flask: cada requisição escolhe um tenant com
+distribuição de cauda longa (poucos muito ativos, muitos raros) e grava uma
+transação ou lê o dashboard/resumo mensal. Mede vazão, latência, RSS máximo e o
+número de trackers carregados, e no fim confere, relendo os arquivos de cada tenant,
+que nenhuma escrita se perdeu nos descartes do LRU (flush-on-evict).
+
+Uso: python benchmarks/load_tenants.py [--tenants 5000] [--requests 20000] [--threads 8]
+                                       [--cache-size 200] [--durability grouped]
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCALE = 1 if sys.platform == "darwin" else 1024
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * SCALE / 1e6
+
+
+def pick_tenants(count: int, tenants: int, seed: int, skew: float) -> list:
+    """Tenants por requisição: Zipf sobre uma ordem aleatória (os ativos não são só os primeiros)"""
+    rng = random.Random(seed)
+    ranking = list(range(tenants))
+    rng.shuffle(ranking)
+    weights = [1 / (rank + 1) ** skew for rank in range(tenants)]
+    return rng.choices(ranking, weights=weights, k=count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--cache-size", type=int, default=200)
+    parser.add_argument("--write-share", type=float, default=0.3)
+    parser.add_argument("--skew", type=float, default=0.8, help="expoente Zipf (0 = acesso uniforme)")
+    parser.add_argument("--durability", default="grouped", help="immediate, grouped ou shutdown")
+    parser.add_argument("--storage", default="json", help="json, journal, sqlite, binary ou partitioned")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="tenants_")
+    # O módulo lê a configuração ao ser importado
+    os.environ.update({
+        "TENANT_MODE": "multi",
+        "TENANT_DATA_DIR": directory,
+        "TENANT_CACHE_SIZE": str(args.cache_size),
+        "TENANT_IDLE_SECONDS": "0",
+        "DURABILITY": args.durability,
+        "STORAGE_MODE": args.storage,
+    })
+    import expense_tracker_voice_fixed as module
+    base_rss = rss_mb()
+
+    chosen = pick_tenants(args.requests, args.tenants, 42, args.skew)
+    rng = random.Random(7)
+    writes = [rng.random() < args.write_share for _ in chosen]
+    expected = Counter(tenant for tenant, write in zip(chosen, writes) if write)
+    print(f"👥 {args.tenants} tenants, {args.requests} requisições ({sum(writes)} escritas) em {args.threads} threads; "
+          f"{len(set(chosen))} tenants distintos, LRU de {args.cache_size} trackers")
+
+    latencies, failures, peak_loaded = [], [], [0]
+    lock = threading.Lock()
+
+    def run(offset: int):
+        client = module.app.test_client()
+        local = []
+        for index in range(offset, len(chosen), args.threads):
+            headers = {"X-Tenant-Key": f"user{chosen[index]}"}
+            started = time.perf_counter()
+            if writes[index]:
+                response = client.post("/api/transactions", headers=headers, json={
+                    "amount": 10, "type": "despesa", "category": "alimentacao", "description": "carga"})
+            elif index % 2:
+                response = client.get("/api/dashboard/stats", headers=headers)
+            else:
+                response = client.get("/api/monthly/stats", headers=headers)
+            local.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                with lock:
+                    failures.append((chosen[index], response.status_code))
+            if index % 500 == 0:
+                loaded = module.tenants.stats()["loaded"]
+                with lock:
+                    peak_loaded[0] = max(peak_loaded[0], loaded)
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=run, args=(offset,)) for offset in range(args.threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    peak_rss = rss_mb()
+
+    module.tenants.close_all()
+    counters = module.metrics.counters
+    loads = counters.get(("expense_tenant_loads_total", ()), 0)
+    evictions = counters.get(("expense_tenant_evictions_total", ()), 0)
+
+    # Releitura direta dos arquivos: o que cada tenant gravou de fato
+    lost = 0
+    for tenant, count in expected.items():
+        stored = module.ExpenseTracker(os.path.join(directory, f"user{tenant}.json"), preload="eager")
+        lost += max(count - stored.transaction_count, 0)
+        stored.close()
+
+    latencies.sort()
+    quantile = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+    print(f"   vazão {args.requests / elapsed:8.0f} req/s | latência p50 {statistics.median(latencies):.2f} ms, "
+          f"p95 {quantile(0.95):.2f} ms, p99 {quantile(0.99):.2f} ms")
+    print(f"   trackers carregados (pico) {peak_loaded[0]} | cargas {loads:.0f} | descartes {evictions:.0f} | "
+          f"RSS máximo +{peak_rss - base_rss:.1f} MB")
+    ok = not failures and not lost
+    print(f"{'✅' if ok else '❌'} {len(failures)} requisições com erro, {lost} escritas perdidas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
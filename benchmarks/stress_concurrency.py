@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+🔒 Teste de estresse de escrita concorrente
+Vários processos (como workers do gunicorn), cada um com várias threads, gravam
+transações no mesmo arquivo de dados ao mesmo tempo. No fim, um tracker novo
+relê o arquivo e confere que nenhuma transação se perdeu e que não há IDs repetidos.
+
+Uso: python benchmarks/stress_concurrency.py [--processes 4] [--threads 4] [--writes 50]
+                                             [--modes json,journal,sqlite,binary] [--durability immediate]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def worker(data_file: str, mode: str, durability: str, worker_id: int, threads: int, writes: int):
+    """Um processo: `threads` threads gravando `writes` transações cada uma"""
+    from expense_tracker_voice_fixed import ExpenseTracker
+
+    tracker = ExpenseTracker(data_file, storage_mode=mode, durability=durability)
+
+    def write_batch(thread_id: int):
+        for i in range(writes):
+            tracker.add_transaction(1.0, "despesa", "outros", f"stress {worker_id}-{thread_id}-{i}")
+            # Leituras intercaladas exercitam o lock compartilhado e o recarregamento
+            if i % 10 == 0:
+                tracker.aggregate_transactions("category")
+
+    pool = [threading.Thread(target=write_batch, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    tracker.flush()
+
+
+def run(mode: str, durability: str, processes: int, threads: int, writes: int) -> bool:
+    from expense_tracker_voice_fixed import ExpenseTracker
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = os.path.join(directory, "stress.json")
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=worker, args=(data_file, mode, durability, p, threads, writes))
+                   for p in range(processes)]
+
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        transactions = ExpenseTracker(data_file, storage_mode=mode).data["transactions"]
+        expected = {f"stress {p}-{t}-{i}" for p in range(processes) for t in range(threads) for i in range(writes)}
+        found = {t["description"] for t in transactions}
+        duplicated_ids = [i for i, count in Counter(t["id"] for t in transactions).items() if count > 1]
+        lost = expected - found
+        failed = [process.exitcode for process in workers if process.exitcode]
+
+        ok = not lost and not duplicated_ids and not failed and len(transactions) == len(expected)
+        print(f"{'✅' if ok else '❌'} {mode:8s} {durability:10s} {len(expected)} escritas em {elapsed:.2f}s "
+              f"({len(expected) / elapsed:.0f}/s): {len(transactions)} gravadas, {len(lost)} perdidas, "
+              f"{len(duplicated_ids)} IDs repetidos, {len(failed)} processos com erro")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--modes", default="json,journal,sqlite,binary")
+    parser.add_argument("--durability", default="immediate", help="immediate, grouped ou shutdown")
+    args = parser.parse_args()
+
+    results = [run(mode, args.durability, args.processes, args.threads, args.writes)
+               for mode in args.modes.split(",")]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+🧪 Gerador determinístico de dados sintéticos
+Produz arquivos no formato de expense_data_final.json com viagens, moedas mistas
+(EUR/BRL) e descrições realistas. A mesma semente sempre gera os mesmos dados.
+
+Uso: python benchmarks/synthetic.py --size 100000 --out /tmp/expense_100k.json [--seed 42]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Descrições por categoria, no estilo do que é ditado ou digitado no app
+DESCRIPTIONS = {
+    "alimentacao": ["pizza", "almoço no restaurante", "supermercado", "café da manhã", "jantar sushi",
+                    "padaria", "ifood delivery", "starbucks", "açaí", "cerveja no bar", "mercado da semana"],
+    "transporte": ["uber", "taxi aeroporto", "metro", "passagem de ônibus", "gasolina", "estacionamento",
+                   "bilhete de trem", "ryanair", "pedágio", "cabify"],
+    "lazer": ["cinema", "netflix", "spotify", "ingresso show", "museu", "teatro", "academia",
+              "festa", "passeio de barco", "jogo de futebol"],
+    "moradia": ["aluguel", "condomínio", "conta de luz", "internet", "airbnb", "hotel", "gás",
+                "limpeza", "manutenção", "booking hostel"],
+    "outros": ["presente", "farmácia", "corte de cabelo", "lavanderia", "papelaria", "doação"]
+}
+INCOME_DESCRIPTIONS = ["salário", "freelance", "reembolso", "venda usada", "bônus"]
+TRIP_NAMES = ["Italia", "Lisboa", "Paris", "Rio", "Madrid", "Berlim", "Londres", "Porto", "Roma", "Atenas"]
+SOURCES = ["web", "web", "voice", "voice_shortcut", "import"]
+
+# Período coberto pelos dados sintéticos
+START_DAY = date(2023, 1, 1)
+DAYS = 3 * 365
+
+
+def generate_dataset(size: int, seed: int = 42, trips: int = None) -> dict:
+    """Dados completos (transações, viagens, settings, metadata) com `size` transações"""
+    rng = random.Random(seed)
+    trip_count = trips if trips is not None else max(3, size // 500)
+
+    trip_records = {}
+    for number in range(1, trip_count + 1):
+        start = START_DAY + timedelta(days=rng.randrange(DAYS - 14))
+        end = start + timedelta(days=rng.randint(3, 14))
+        trip_id = f"trip_{number}"
+        trip_records[trip_id] = {
+            "id": trip_id,
+            "name": f"{rng.choice(TRIP_NAMES)} {start.year}",
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "budget": float(rng.choice([500, 1000, 1500, 2500])),
+            "created_at": f"{start.isoformat()}T09:00:00",
+            "status": "planned"
+        }
+    trip_ids = list(trip_records)
+    categories = list(DESCRIPTIONS)
+
+    transactions = []
+    for transaction_id in range(1, size + 1):
+        trip_id = rng.choice(trip_ids) if rng.random() < 0.2 else None
+        if trip_id:
+            trip = trip_records[trip_id]
+            first = date.fromisoformat(trip["start_date"])
+            span = (date.fromisoformat(trip["end_date"]) - first).days
+            day = first + timedelta(days=rng.randint(0, span))
+        else:
+            day = START_DAY + timedelta(days=rng.randrange(DAYS))
+
+        if rng.random() < 0.08 and not trip_id:
+            transaction_type, category = "ganho", "outros"
+            description = rng.choice(INCOME_DESCRIPTIONS)
+            amount = round(rng.uniform(200, 3000), 2)
+        else:
+            transaction_type = "despesa"
+            category = rng.choice(categories)
+            description = rng.choice(DESCRIPTIONS[category])
+            amount = round(rng.lognormvariate(2.8, 0.9), 2)
+
+        currency = "BRL" if rng.random() < 0.25 else "EUR"
+        exchange_rate = round(rng.uniform(5.6, 6.6), 4)
+        amount_eur = amount if currency == "EUR" else amount / exchange_rate
+        amount_brl = amount * exchange_rate if currency == "EUR" else amount
+
+        transactions.append({
+            "id": transaction_id,
+            "date": f"{day.isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00",
+            "amount": float(amount_eur),
+            "amount_eur": round(amount_eur, 2),
+            "amount_brl": round(amount_brl, 2),
+            "type": transaction_type,
+            "category": category,
+            "description": description,
+            "trip_id": trip_id,
+            "currency": currency,
+            "exchange_rate": exchange_rate,
+            "source": rng.choice(SOURCES)
+        })
+
+    return {
+        "transactions": transactions,
+        "trips": trip_records,
+        "settings": {"currency": "EUR", "currency_symbol": "€", "base_currency": "BRL", "default_budget": 1000},
+        "metadata": {"created_at": f"{START_DAY.isoformat()}T00:00:00", "version": "synthetic",
+                     "next_id": size + 1}
+    }
+
+
+def voice_commands(count: int, seed: int = 7) -> list:
+    """Comandos de voz determinísticos ("gastei 12 euros pizza")"""
+    rng = random.Random(seed)
+    verbs = ["gravar", "gastei", "paguei", "comprei", ""]
+    currencies = ["euros", "reais", ""]
+    commands = []
+    for _ in range(count):
+        description = rng.choice(DESCRIPTIONS[rng.choice(list(DESCRIPTIONS))])
+        parts = [rng.choice(verbs), str(rng.randint(1, 150)), rng.choice(currencies), description]
+        commands.append(" ".join(part for part in parts if part))
+    return commands
+
+
+def write_dataset(path: str, size: int, seed: int = 42) -> dict:
+    data = generate_dataset(size, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return data
+
+
+def parse_size(value: str) -> int:
+    """Aceita 10000, 10k ou 1M"""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    data = write_dataset(args.out, parse_size(args.size), args.seed)
+    print(f"📦 {len(data['transactions'])} transações e {len(data['trips'])} viagens em {args.out} "
+          f"({os.path.getsize(args.out) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
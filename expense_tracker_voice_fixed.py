@@ -4,39 +4,3126 @@
 Padrões de voz melhorados para português natural
 """
 
+import atexit
+import csv
+import gc
 import json
+import logging
+import math
+import mmap
 import os
 import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import unicodedata
 import requests
-from datetime import datetime, timedelta
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple, Any
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+from collections import OrderedDict, defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from heapq import nlargest
+from html import escape as html_escape
+from itertools import islice
+from operator import attrgetter, itemgetter
+from typing import Dict, List, Optional, Tuple, Any, Iterator
 import io
 import base64
+from array import array
 
-from flask import Flask, render_template, request, jsonify
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos, apenas entre threads
+    fcntl = None
+
+# Fases do cold start, expostas em /api/health
+STARTUP_STARTED = time.perf_counter()
+STARTUP_TIMINGS = {}
+
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
+
+STARTUP_TIMINGS["imports_ms"] = round((time.perf_counter() - STARTUP_STARTED) * 1000, 1)
+
+_numpy = None
+
+
+def optional_numpy():
+    """NumPy é opcional e só é importado no primeiro cálculo em lote"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+# ==================== MÉTRICAS ====================
+
+logger = logging.getLogger("expense_tracker")
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+
+class Histogram:
+    """Histograma cumulativo de durações (segundos), no modelo do Prometheus"""
+    
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Metrics:
+    """Contadores e histogramas em memória, exportados no formato texto do Prometheus
+    
+    Cada observação custa uma busca em dicionário e um bisect sob um lock curto.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}   # (nome, labels) -> Histogram
+        self.counters = {}     # (nome, labels) -> valor
+        self.descriptions = {}
+    
+    def describe(self, name: str, text: str):
+        self.descriptions[name] = text
+    
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+    
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def timed(self, operation: str):
+        """Decorador que registra a duração em expense_operation_duration_seconds"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe("expense_operation_duration_seconds", time.perf_counter() - started,
+                                 operation=operation)
+            return wrapper
+        return decorator
+    
+    @staticmethod
+    def _labels(labels: Tuple, **extra) -> str:
+        pairs = list(labels) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+    
+    def render(self, gauges: Dict[str, float] = None) -> str:
+        """Exposição no formato texto do Prometheus (version 0.0.4)"""
+        with self.lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+        
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+        
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(Histogram.BUCKETS + (float('inf'),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{self._labels(labels, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+        
+        for name, value in (gauges or {}).items():
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("expense_http_requests_total", "Requisições HTTP por rota, método e status")
+metrics.describe("expense_http_request_duration_seconds", "Latência das requisições HTTP por rota")
+metrics.describe("expense_operation_duration_seconds",
+                 "Duração de operações internas (load_data, save_data, commit, câmbio, classificação, gráficos)")
+metrics.describe("expense_transactions", "Transações carregadas")
+metrics.describe("expense_data_version", "Versão em memória dos dados")
+metrics.describe("expense_flushed_mutations_total", "Mutações gravadas pelo flush em grupo")
+metrics.describe("expense_pending_mutations", "Mutações em memória aguardando o flush")
+
+
+# ==================== ARMAZENAMENTO ====================
+
+# Colunas que podem ser usadas como filtro/agrupamento nas consultas
+QUERY_COLUMNS = ("type", "category", "source", "trip_id", "currency")
+
+# Valor assumido quando a transação não tem o campo (ex.: registros antigos de /api/voz)
+COLUMN_DEFAULTS = {"source": "manual"}
+
+# Agrupamentos aceitos por aggregate_transactions ("month" agrupa por (ano, mês))
+GROUP_KEYS = QUERY_COLUMNS + ("month",)
+
+
+def date_ordinal(value: Any) -> int:
+    """Normaliza datas ISO heterogêneas ('2025-08-08', '...T03:00:00.000Z') para o dia ordinal"""
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def date_bounds(year: int = None, month: int = None, date_from: str = None,
+                date_to: str = None) -> Tuple[Optional[int], Optional[int]]:
+    """Intervalo [início, fim) em dias ordinais para filtros de mês/ano e de/até"""
+    start = end = None
+    if year:
+        if month:
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            start, end = date(year, month, 1).toordinal(), date(next_year, next_month, 1).toordinal()
+        else:
+            start, end = date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal()
+    if date_from:
+        start = max(start or 0, date_ordinal(date_from))
+    if date_to:
+        # Data final inclusiva
+        day_after = date_ordinal(date_to) + 1
+        end = day_after if end is None else min(end, day_after)
+    return start, end
+
+
+# Marca slot vazio (None é um valor válido, ex.: trip_id)
+_MISSING = object()
+
+
+class Transaction(MutableMapping):
+    """Registro compacto de uma transação (__slots__ no lugar de um dict por linha)
+    
+    Os campos de _build_transaction() ficam em slots (slot vazio = chave ausente) e
+    qualquer chave extra de versões anteriores vai para `_extra`. Os campos de poucos
+    valores distintos (tipo, categoria, moeda, origem, viagem) são internados, então
+    milhares de transações compartilham o mesmo objeto; descrições são texto livre,
+    quase sempre únicas, e não entram (strings internadas podem nunca ser liberadas,
+    o que anularia o descarte de partições e de tenants). Continua se comportando como um dict
+    (get, [], in, pop, dict(t), {**t}) e serializa no mesmo esquema JSON via to_dict().
+    
+    As chaves saem na ordem de FIELDS seguida das extras, que é a ordem de
+    _build_transaction(). Registros antigos com outra ordem (ex.: os de /api/voz)
+    guardam a própria em `_order`, para que o JSON gravado continue byte a byte igual.
+    """
+    
+    FIELDS = ("id", "date", "amount", "amount_eur", "amount_brl", "type", "category",
+              "description", "trip_id", "currency", "exchange_rate", "source")
+    INTERNED = frozenset(("type", "category", "trip_id", "currency", "source"))
+    __slots__ = FIELDS + ("_extra", "_order")
+    
+    def __init__(self, fields: Dict = None):
+        self._extra = None
+        self._order = None
+        if fields:
+            for key, value in fields.items():
+                self._set(key, value)
+            if not in_field_order(fields):
+                self._order = list(fields)
+    
+    @classmethod
+    def from_dict(cls, fields: Dict) -> "Transaction":
+        """Converte um dict (já convertido: devolve o próprio objeto)"""
+        return fields if isinstance(fields, cls) else cls(fields)
+    
+    def to_dict(self) -> Dict:
+        if self._order is not None:
+            return {key: self[key] for key in self._order}
+        try:
+            # Caso comum: todos os campos presentes
+            fields = dict(zip(self.FIELDS, _get_fields(self)))
+        except AttributeError:
+            fields = {}
+            for key in self.FIELDS:
+                value = getattr(self, key, _MISSING)
+                if value is not _MISSING:
+                    fields[key] = value
+        if self._extra:
+            fields.update(self._extra)
+        return fields
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in _TRANSACTION_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _TRANSACTION_FIELDS:
+            return getattr(self, key, default)
+        return default if self._extra is None else self._extra.get(key, default)
+    
+    def __setitem__(self, key: str, value: Any):
+        # Como num dict, uma chave nova entra no fim
+        if key not in self:
+            if self._order is not None:
+                self._order.append(key)
+            elif not self._lands_last(key):
+                self._order = [*self, key]
+        self._set(key, value)
+    
+    def _lands_last(self, key: str) -> bool:
+        """A chave nova já ficaria no fim na ordem de FIELDS + extras?"""
+        if key not in _TRANSACTION_FIELDS:
+            return True
+        if self._extra:
+            return False
+        return not any(hasattr(self, later) for later in self.FIELDS[_FIELD_POSITIONS[key] + 1:])
+    
+    def _set(self, key: str, value: Any):
+        if key in _TRANSACTION_FIELDS:
+            if key in self.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key: str):
+        if key in _TRANSACTION_FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+        if self._order is not None:
+            self._order.remove(key)
+    
+    def __contains__(self, key: Any) -> bool:
+        if key in _TRANSACTION_FIELDS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+    
+    def __iter__(self):
+        if self._order is not None:
+            yield from self._order
+            return
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (Transaction, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"Transaction({self.to_dict()!r})"
+    
+    def __reduce__(self):
+        return Transaction, (self.to_dict(),)
+
+
+_TRANSACTION_FIELDS = frozenset(Transaction.FIELDS)
+_FIELD_POSITIONS = {key: position for position, key in enumerate(Transaction.FIELDS)}
+_get_fields = attrgetter(*Transaction.FIELDS)
+
+
+def in_field_order(keys: Any) -> bool:
+    """As chaves seguem a ordem de Transaction.FIELDS, com as extras no fim?"""
+    keys = tuple(keys)
+    if keys == Transaction.FIELDS:
+        return True
+    last = -1
+    for key in keys:
+        position = _FIELD_POSITIONS.get(key)
+        if position is None:
+            last = len(Transaction.FIELDS)
+        elif position <= last:
+            return False
+        else:
+            last = position
+    return True
+
+
+def json_default(value: Any) -> Any:
+    """`default` do json.dump para os registros compactos"""
+    if isinstance(value, Transaction):
+        return value.to_dict()
+    raise TypeError(f"Objeto não serializável em JSON: {type(value).__name__}")
+
+
+def compact_transactions(transactions: List[Dict]):
+    """Troca, na própria lista, os dicts carregados por registros Transaction"""
+    for position, transaction in enumerate(transactions):
+        transactions[position] = Transaction.from_dict(transaction)
+
+
+def order_id(transaction: Dict) -> int:
+    """ID usado na ordem (dia, id); IDs legados que não são inteiros contam como 0"""
+    transaction_id = transaction.get("id")
+    return transaction_id if type(transaction_id) is int else 0
+
+
+class TimeIndex:
+    """Transações ordenadas por (dia ordinal, id), para consultas por período com bisect
+    
+    `keys` guarda só o dia; dentro do mesmo dia a ordem é a do ID, a mesma do
+    cursor (dia, id) de page_transactions, então reinserir uma transação não a
+    tira do lugar.
+    """
+    
+    def __init__(self, transactions: List[Dict] = ()):
+        self.rebuild(transactions)
+    
+    @classmethod
+    def prebuilt(cls, keys: List[int], items: List[Dict]) -> "TimeIndex":
+        """Índice a partir de chaves já ordenadas (ex.: lidas de um snapshot binário)"""
+        index = cls()
+        index.keys, index.items = keys, items
+        return index
+    
+    def rebuild(self, transactions: List[Dict]):
+        triples = sorted(((date_ordinal(t.get("date")), order_id(t), t) for t in transactions),
+                         key=lambda triple: triple[:2])
+        self.keys = [key for key, _, _ in triples]
+        self.items = [transaction for _, _, transaction in triples]
+    
+    def add(self, transaction: Dict):
+        key = date_ordinal(transaction.get("date"))
+        transaction_id = order_id(transaction)
+        # Busca binária pelo ID dentro das transações do mesmo dia
+        lo, hi = bisect_left(self.keys, key), bisect_right(self.keys, key)
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if order_id(self.items[middle]) <= transaction_id:
+                lo = middle + 1
+            else:
+                hi = middle
+        self.keys.insert(lo, key)
+        self.items.insert(lo, transaction)
+    
+    def remove(self, transaction: Dict):
+        key = date_ordinal(transaction.get("date"))
+        for position in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+            if self.items[position] is transaction:
+                del self.keys[position]
+                del self.items[position]
+                return
+    
+    def range(self, start: int = None, end: int = None) -> List[Dict]:
+        """Transações com start <= dia < end, em ordem cronológica"""
+        lo = bisect_left(self.keys, start) if start is not None else 0
+        hi = bisect_left(self.keys, end) if end is not None else len(self.keys)
+        return self.items[lo:hi]
+    
+    def iter_range(self, start: int = None, end: int = None):
+        """Como range(), mas devolve pares (dia, transação) sob demanda, sem copiar a fatia"""
+        lo = bisect_left(self.keys, start) if start is not None else 0
+        hi = bisect_left(self.keys, end) if end is not None else len(self.keys)
+        for position in range(lo, hi):
+            yield self.keys[position], self.items[position]
+
+
+class Rollups:
+    """Totais materializados (soma, contagem) atualizados a cada mutação em O(1)
+    
+    - by_month[(ano, mês)][(tem_viagem, tipo, categoria)]
+    - by_month_source[(ano, mês)][(tipo, fonte)]
+    - by_trip[trip_id][(tipo, categoria)]
+    - by_type[(tem_viagem, tipo)]
+    """
+    
+    # Diferença máxima tolerada entre totais incrementais e recalculados
+    TOLERANCE = 1e-6
+    
+    def __init__(self, transactions: List[Dict] = ()):
+        self.by_month = {}
+        self.by_month_source = {}
+        self.by_trip = {}
+        self.by_type = {}
+        for transaction in transactions:
+            self.add(transaction)
+    
+    @staticmethod
+    def _bump(buckets: Dict, key: Any, amount: float, sign: int):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [0, 0]
+        bucket[0] += sign * amount
+        bucket[1] += sign
+        # Grupos vazios desaparecem, como em um recálculo do zero
+        if bucket[1] == 0:
+            del buckets[key]
+    
+    def add(self, transaction: Dict, sign: int = 1):
+        amount = transaction.get("amount", 0)
+        tx_type = transaction.get("type")
+        category = transaction.get("category")
+        trip_id = transaction.get("trip_id")
+        has_trip = bool(trip_id)
+        
+        ordinal = date_ordinal(transaction.get("date"))
+        if ordinal:
+            day = date.fromordinal(ordinal)
+            month_key = (day.year, day.month)
+            self._bump(self.by_month.setdefault(month_key, {}), (has_trip, tx_type, category), amount, sign)
+            self._bump(self.by_month_source.setdefault(month_key, {}),
+                       (tx_type, transaction.get("source", COLUMN_DEFAULTS["source"])), amount, sign)
+        if has_trip:
+            self._bump(self.by_trip.setdefault(trip_id, {}), (tx_type, category), amount, sign)
+        self._bump(self.by_type, (has_trip, tx_type), amount, sign)
+    
+    def remove(self, transaction: Dict):
+        self.add(transaction, sign=-1)
+    
+    def state(self) -> Dict:
+        """Totais em formato serializável em JSON (chaves em tupla viram listas)"""
+        def pairs(buckets):
+            return [[list(key), bucket] for key, bucket in buckets.items()]
+        return {
+            "by_month": [[list(month), pairs(buckets)] for month, buckets in self.by_month.items()],
+            "by_month_source": [[list(month), pairs(buckets)] for month, buckets in self.by_month_source.items()],
+            "by_trip": [[trip_id, pairs(buckets)] for trip_id, buckets in self.by_trip.items()],
+            "by_type": pairs(self.by_type)
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict) -> "Rollups":
+        """Inverso de state(), sem percorrer as transações"""
+        def buckets(pairs):
+            return {tuple(key): bucket for key, bucket in pairs}
+        rollups = cls()
+        rollups.by_month = {tuple(month): buckets(pairs) for month, pairs in state["by_month"]}
+        rollups.by_month_source = {tuple(month): buckets(pairs) for month, pairs in state["by_month_source"]}
+        rollups.by_trip = {trip_id: buckets(pairs) for trip_id, pairs in state["by_trip"]}
+        rollups.by_type = buckets(state["by_type"])
+        return rollups
+    
+    def aggregate(self, group_by: str = None, year: int = None, month: int = None,
+                  date_from: str = None, date_to: str = None, trip_id: str = None,
+                  has_trip: bool = None, type: str = None, **columns) -> Optional[Dict]:
+        """Responde aggregate_transactions() pelos rollups; None se os filtros não forem cobertos"""
+        if date_from or date_to or (year and not month) or any(v is not None for v in columns.values()):
+            return None
+        
+        if year and month:
+            if trip_id:
+                return None
+            if group_by == "source":
+                if has_trip is not None:
+                    return None
+                buckets = self.by_month_source.get((year, month), {})
+                rows = ((tx_type, source, bucket) for (tx_type, source), bucket in buckets.items())
+            elif group_by in (None, "type", "category"):
+                buckets = self.by_month.get((year, month), {})
+                rows = ((tx_type, {"type": tx_type, "category": category}.get(group_by), bucket)
+                        for (flag, tx_type, category), bucket in buckets.items()
+                        if has_trip is None or flag == has_trip)
+            else:
+                return None
+        elif trip_id:
+            if group_by not in (None, "type", "category") or has_trip is False:
+                return None
+            buckets = self.by_trip.get(trip_id, {})
+            rows = ((tx_type, {"type": tx_type, "category": category}.get(group_by), bucket)
+                    for (tx_type, category), bucket in buckets.items())
+        else:
+            if group_by not in (None, "type"):
+                return None
+            rows = ((tx_type, tx_type if group_by else None, bucket)
+                    for (flag, tx_type), bucket in self.by_type.items()
+                    if has_trip is None or flag == has_trip)
+        
+        groups = {}
+        for tx_type, key, (total, count) in rows:
+            if type is not None and tx_type != type:
+                continue
+            group_total, group_count = groups.get(key, (0, 0))
+            groups[key] = (group_total + total, group_count + count)
+        return groups
+    
+    def diff(self, other: "Rollups") -> List[str]:
+        """Lista as divergências entre dois conjuntos de rollups"""
+        differences = []
+        for name in ("by_month", "by_month_source", "by_trip", "by_type"):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if name == "by_type":
+                mine, theirs = {None: mine}, {None: theirs}
+            for outer in set(mine) | set(theirs):
+                left, right = mine.get(outer, {}), theirs.get(outer, {})
+                for key in set(left) | set(right):
+                    a, b = left.get(key, [0, 0]), right.get(key, [0, 0])
+                    if a[1] != b[1] or abs(a[0] - b[0]) > self.TOLERANCE:
+                        differences.append(f"{name}[{outer}][{key}]: {a} != {b}")
+        return differences
+
+
+def month_key(ordinal: int) -> Optional[Tuple[int, int]]:
+    """(ano, mês) de um dia ordinal; None para datas inválidas"""
+    if not ordinal:
+        return None
+    day = date.fromordinal(ordinal)
+    return day.year, day.month
+
+
+def aggregate_scan(transactions: List[Dict], group_by: str = None, year: int = None, month: int = None,
+                   date_from: str = None, date_to: str = None, trip_id: str = None,
+                   has_trip: bool = None, **columns) -> Dict[Any, Tuple[float, int]]:
+    """Agregação de referência em Python puro: soma sequencial, na ordem recebida"""
+    if group_by is not None and group_by not in GROUP_KEYS:
+        raise ValueError(f"Coluna inválida: {group_by}")
+    start, end = date_bounds(year, month, date_from, date_to)
+    columns = {column: value for column, value in columns.items() if value is not None}
+    groups = {}
+    for transaction in transactions:
+        ordinal = date_ordinal(transaction.get("date"))
+        if (start is not None and ordinal < start) or (end is not None and ordinal >= end):
+            continue
+        if trip_id and transaction.get('trip_id') != trip_id:
+            continue
+        if has_trip is not None and bool(transaction.get('trip_id')) != has_trip:
+            continue
+        if not all(transaction.get(column, COLUMN_DEFAULTS.get(column)) == value
+                   for column, value in columns.items()):
+            continue
+        if group_by == "month":
+            key = month_key(ordinal)
+        else:
+            key = transaction.get(group_by, COLUMN_DEFAULTS.get(group_by)) if group_by else None
+        total, count = groups.get(key, (0, 0))
+        groups[key] = (total + transaction.get("amount", 0), count + 1)
+    return groups
+
+
+class ColumnarView:
+    """Visão colunar (NumPy) das transações, na mesma ordem da lista
+    
+    Valores em float64, dia ordinal e mês em int32 e as colunas de QUERY_COLUMNS como
+    códigos inteiros. Linhas novas entram no fim (capacidade dobrada quando preciso);
+    remoções repetem a troca com a última linha feita pelo IdIndex.
+    
+    As somas usam np.bincount, que acumula em ordem: o resultado é idêntico ao de
+    aggregate_scan() sobre a mesma lista.
+    """
+    
+    NUMERIC = (("amount", "float64"), ("amount_eur", "float64"), ("amount_brl", "float64"),
+               ("ordinal", "int32"), ("month", "int32"), ("has_trip", "bool"))
+    
+    def __init__(self, np, transactions: List[Dict]):
+        self.np = np
+        self.size = 0
+        self.capacity = max(16, len(transactions))
+        self.arrays = {name: np.zeros(self.capacity, dtype) for name, dtype in self.NUMERIC}
+        self.codes = {column: np.zeros(self.capacity, np.int32) for column in QUERY_COLUMNS}
+        self.values = {column: [] for column in QUERY_COLUMNS}
+        self.lookup = {column: {} for column in QUERY_COLUMNS}
+        self.extend(transactions)
+    
+    def _code(self, column: str, value: Any) -> int:
+        lookup = self.lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.values[column])
+            self.values[column].append(value)
+        return code
+    
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        self.capacity = max(needed, self.capacity * 2)
+        for store in (self.arrays, self.codes):
+            for name, array in store.items():
+                grown = self.np.zeros(self.capacity, array.dtype)
+                grown[:self.size] = array[:self.size]
+                store[name] = grown
+    
+    def write(self, position: int, transaction: Dict):
+        """(Re)grava a linha de uma posição a partir do dicionário da transação"""
+        arrays = self.arrays
+        amount = transaction.get("amount", 0)
+        ordinal = date_ordinal(transaction.get("date"))
+        key = month_key(ordinal)
+        arrays["amount"][position] = amount
+        arrays["amount_eur"][position] = transaction.get("amount_eur", amount) or 0
+        arrays["amount_brl"][position] = transaction.get("amount_brl") or 0
+        arrays["ordinal"][position] = ordinal
+        arrays["month"][position] = key[0] * 12 + key[1] - 1 if key else -1
+        arrays["has_trip"][position] = bool(transaction.get("trip_id"))
+        for column in QUERY_COLUMNS:
+            self.codes[column][position] = self._code(
+                column, transaction.get(column, COLUMN_DEFAULTS.get(column)))
+    
+    def extend(self, transactions: List[Dict]):
+        """Acrescenta linhas no fim (atualização incremental)"""
+        if len(transactions) == 1:
+            self._grow(self.size + 1)
+            self.write(self.size, transactions[0])
+            self.size += 1
+            return
+        
+        # Em lote: monta cada coluna como lista e copia a fatia inteira
+        start, end = self.size, self.size + len(transactions)
+        self._grow(end)
+        amounts = [t.get("amount", 0) for t in transactions]
+        ordinals = [date_ordinal(t.get("date")) for t in transactions]
+        months = {}
+        for ordinal in set(ordinals):
+            key = month_key(ordinal)
+            months[ordinal] = key[0] * 12 + key[1] - 1 if key else -1
+        
+        arrays = self.arrays
+        arrays["amount"][start:end] = amounts
+        arrays["amount_eur"][start:end] = [t.get("amount_eur", amount) or 0
+                                           for t, amount in zip(transactions, amounts)]
+        arrays["amount_brl"][start:end] = [t.get("amount_brl") or 0 for t in transactions]
+        arrays["ordinal"][start:end] = ordinals
+        arrays["month"][start:end] = [months[ordinal] for ordinal in ordinals]
+        arrays["has_trip"][start:end] = [bool(t.get("trip_id")) for t in transactions]
+        for column in QUERY_COLUMNS:
+            default, code = COLUMN_DEFAULTS.get(column), self._code
+            self.codes[column][start:end] = [code(column, t.get(column, default)) for t in transactions]
+        self.size = end
+    
+    def remove(self, position: int):
+        """Remove a linha trocando-a pela última, como IdIndex.remove"""
+        last = self.size - 1
+        if position != last:
+            for store in (self.arrays, self.codes):
+                for array in store.values():
+                    array[position] = array[last]
+        self.size = last
+    
+    def aggregate(self, group_by: str = None, year: int = None, month: int = None,
+                  date_from: str = None, date_to: str = None, trip_id: str = None,
+                  has_trip: bool = None, **columns) -> Dict[Any, Tuple[float, int]]:
+        """Mesma semântica de aggregate_scan(), com máscaras e np.bincount"""
+        if group_by is not None and group_by not in GROUP_KEYS:
+            raise ValueError(f"Coluna inválida: {group_by}")
+        np, n = self.np, self.size
+        mask = np.ones(n, bool)
+        
+        start, end = date_bounds(year, month, date_from, date_to)
+        if start is not None:
+            mask &= self.arrays["ordinal"][:n] >= start
+        if end is not None:
+            mask &= self.arrays["ordinal"][:n] < end
+        if has_trip is not None:
+            mask &= self.arrays["has_trip"][:n] == has_trip
+        if trip_id:
+            columns["trip_id"] = trip_id
+        for column, value in columns.items():
+            if column not in QUERY_COLUMNS:
+                raise ValueError(f"Coluna inválida: {column}")
+            if value is None:
+                continue
+            code = self.lookup[column].get(value)
+            if code is None:
+                return {}
+            mask &= self.codes[column][:n] == code
+        
+        amounts = self.arrays["amount"][:n][mask]
+        if group_by is None:
+            keys, labels = np.zeros(len(amounts), np.intp), [None]
+        elif group_by == "month":
+            months, keys = np.unique(self.arrays["month"][:n][mask], return_inverse=True)
+            labels = [(int(m) // 12, int(m) % 12 + 1) if m >= 0 else None for m in months]
+        else:
+            keys, labels = self.codes[group_by][:n][mask], self.values[group_by]
+        
+        totals = np.bincount(keys, weights=amounts, minlength=len(labels))
+        counts = np.bincount(keys, minlength=len(labels))
+        return {labels[i]: (float(totals[i]), int(counts[i])) for i in np.flatnonzero(counts)}
+
+
+class IdIndex:
+    """Índices por ID sobre a lista de transações
+    
+    - positions: id -> posição na lista (busca, substituição e remoção em O(1))
+    - by_trip: trip_id -> ids das transações da viagem
+    
+    A remoção troca a transação pela última da lista, então a lista deixa de
+    seguir a ordem de inserção; listagens e consultas por período usam a ordem
+    (dia, id) do TimeIndex.
+    """
+    
+    def __init__(self, transactions: List[Dict]):
+        self.transactions = transactions
+        self.rebuild()
+    
+    @classmethod
+    def prebuilt(cls, transactions: List[Dict], positions: Dict[int, int], by_trip: Dict) -> "IdIndex":
+        """Índice a partir de mapas já calculados (ex.: colunas de um snapshot binário)"""
+        index = cls.__new__(cls)
+        index.transactions, index.positions, index.by_trip = transactions, positions, by_trip
+        return index
+    
+    def rebuild(self):
+        self.positions = {}
+        self.by_trip = defaultdict(set)
+        for position in range(len(self.transactions)):
+            self.track(position)
+    
+    def track(self, position: int):
+        """Registra a transação que está na posição informada"""
+        transaction = self.transactions[position]
+        if transaction.get("id") is not None:
+            self.positions[transaction["id"]] = position
+            if transaction.get("trip_id"):
+                self.by_trip[transaction["trip_id"]].add(transaction["id"])
+    
+    def _untrack_trip(self, transaction: Dict):
+        trip_ids = self.by_trip.get(transaction.get("trip_id"))
+        if trip_ids is not None:
+            trip_ids.discard(transaction["id"])
+            if not trip_ids:
+                del self.by_trip[transaction["trip_id"]]
+    
+    def get(self, transaction_id: int) -> Optional[Dict]:
+        position = self.positions.get(transaction_id)
+        return None if position is None else self.transactions[position]
+    
+    def trip_transactions(self, trip_id: str) -> List[Dict]:
+        """Transações da viagem, na ordem da lista"""
+        return [self.transactions[position] for position in
+                sorted(self.positions[transaction_id] for transaction_id in self.by_trip.get(trip_id, ()))]
+    
+    def replace(self, transaction: Dict) -> Dict:
+        """Substitui a transação de mesmo ID e devolve a anterior"""
+        position = self._position(transaction["id"])
+        previous = self.transactions[position]
+        self._untrack_trip(previous)
+        self.transactions[position] = transaction
+        self.track(position)
+        return previous
+    
+    def remove(self, transaction_id: int) -> Dict:
+        """Remove a transação trocando-a pela última da lista"""
+        position = self._position(transaction_id)
+        removed = self.transactions[position]
+        self._untrack_trip(removed)
+        del self.positions[transaction_id]
+        last = self.transactions.pop()
+        if last is not removed:
+            self.transactions[position] = last
+            self.track(position)
+        return removed
+    
+    def _position(self, transaction_id: int) -> int:
+        if transaction_id not in self.positions:
+            raise KeyError(f"Transação não encontrada: {transaction_id}")
+        return self.positions[transaction_id]
+
+
+SEARCH_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+@lru_cache(maxsize=65536)
+def search_tokens(text: Any) -> Tuple[str, ...]:
+    """Palavras em minúsculas e sem acentos ("Café da Manhã" -> ("cafe", "da", "manha"))"""
+    decomposed = unicodedata.normalize("NFKD", str(text or "").lower())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return tuple(SEARCH_TOKEN_PATTERN.findall(folded))
+
+
+class SearchIndex:
+    """Índice invertido de descrições e categorias para a busca textual
+    
+    - description / category: palavra -> ids das transações que a contêm
+    - vocabulary: todas as palavras em ordem, para expandir prefixos com bisect
+    - documents: id -> palavras indexadas (para remover sem consultar a transação)
+    - days: id -> dia ordinal (filtros de período sem consultar a transação)
+    """
+    
+    # Pontuação por termo da busca: palavra exata > prefixo; na categoria vale a metade
+    EXACT_SCORE = 2.0
+    PREFIX_SCORE = 1.0
+    CATEGORY_FACTOR = 0.5
+    
+    def __init__(self, transactions: List[Dict] = ()):
+        self.description = {}
+        self.category = {}
+        self.vocabulary = []
+        self.documents = {}
+        self.days = {}
+        for transaction in transactions:
+            self.add(transaction)
+    
+    def add(self, transaction: Dict):
+        transaction_id = transaction.get("id")
+        if transaction_id in self.documents:
+            self.remove(transaction_id)
+        words = (search_tokens(transaction.get("description")), search_tokens(transaction.get("category")))
+        self.documents[transaction_id] = words
+        self.days[transaction_id] = date_ordinal(transaction.get("date"))
+        for postings, tokens in zip((self.description, self.category), words):
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is None:
+                    if token not in self.description and token not in self.category:
+                        insort(self.vocabulary, token)
+                    ids = postings[token] = set()
+                ids.add(transaction_id)
+    
+    def remove(self, transaction_id: int):
+        words = self.documents.pop(transaction_id, None)
+        if words is None:
+            return
+        del self.days[transaction_id]
+        for postings, tokens in zip((self.description, self.category), words):
+            for token in tokens:
+                ids = postings.get(token)
+                # Palavra repetida na mesma descrição: já removida na primeira ocorrência
+                if ids is None:
+                    continue
+                ids.discard(transaction_id)
+                if not ids:
+                    del postings[token]
+                    if token not in self.description and token not in self.category:
+                        del self.vocabulary[bisect_left(self.vocabulary, token)]
+    
+    def apply(self, op: str, result: Any):
+        """Acompanha uma mutação já aplicada (resultado de apply_mutation)"""
+        if op in ("add_transaction", "put_transaction"):
+            self.add(result)
+        elif op == "add_transactions":
+            for transaction in result:
+                self.add(transaction)
+        elif op == "delete_transaction":
+            self.remove(result.get("id"))
+    
+    def expand(self, term: str) -> List[str]:
+        """Palavras do vocabulário que começam com `term`"""
+        vocabulary = self.vocabulary
+        position = bisect_left(vocabulary, term)
+        matches = []
+        while position < len(vocabulary) and vocabulary[position].startswith(term):
+            matches.append(vocabulary[position])
+            position += 1
+        return matches
+    
+    def match(self, terms: List[str]) -> Dict[int, float]:
+        """IDs que têm todos os termos (como palavra ou prefixo) -> pontuação somada"""
+        scores = None
+        for term in terms:
+            weighted = []
+            for token in self.expand(term):
+                score = self.EXACT_SCORE if token == term else self.PREFIX_SCORE
+                if token in self.description:
+                    weighted.append((score, self.description[token]))
+                if token in self.category:
+                    weighted.append((score * self.CATEGORY_FACTOR, self.category[token]))
+            # Em ordem crescente: cada transação fica com o melhor acerto do termo
+            term_scores = {}
+            for score, ids in sorted(weighted, key=itemgetter(0)):
+                term_scores.update(dict.fromkeys(ids, score))
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {transaction_id: total + term_scores[transaction_id]
+                          for transaction_id, total in scores.items() if transaction_id in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+    
+    def in_period(self, candidates, start: Optional[int], end: Optional[int]) -> List[int]:
+        """IDs do período [start, end) em dias ordinais (mesma regra de aggregate_scan)"""
+        days = self.days
+        low = start if start is not None else 0
+        high = end if end is not None else math.inf
+        return [transaction_id for transaction_id in candidates if low <= days[transaction_id] < high]
+    
+    @staticmethod
+    def top(scores: Dict[int, float], candidates, count: int) -> List[Tuple[float, int]]:
+        """As `count` melhores (pontuação, id) entre os candidatos; no empate, maior ID primeiro
+        
+        Há poucas pontuações distintas: percorre as faixas da maior para a menor e
+        para assim que a página está completa.
+        """
+        distinct = set(scores.values()) if candidates is scores else {scores[i] for i in candidates}
+        ranked = []
+        for score in sorted(distinct, reverse=True):
+            tier = candidates if len(distinct) == 1 else [i for i in candidates if scores[i] == score]
+            ranked.extend((score, transaction_id) for transaction_id in nlargest(count - len(ranked), tier))
+            if len(ranked) >= count:
+                break
+        return ranked
+
+
+def assign_ids(data: Dict) -> int:
+    """Garante IDs únicos e o contador monotônico metadata["next_id"]
+    
+    Transações antigas sem ID ou com ID repetido (da época de len()+1) recebem um
+    novo. Retorna quantas foram alteradas.
+    """
+    transactions = data["transactions"]
+    existing = [t.get("id") for t in transactions if isinstance(t.get("id"), int)]
+    next_id = max([data["metadata"].get("next_id", 1)] + [i + 1 for i in existing])
+    seen, changed = set(), 0
+    for transaction in transactions:
+        if not isinstance(transaction.get("id"), int) or transaction["id"] in seen:
+            transaction["id"] = next_id
+            next_id += 1
+            changed += 1
+        seen.add(transaction["id"])
+    data["metadata"]["next_id"] = next_id
+    return changed
+
+
+def advance_next_id(data: Dict, transactions: List[Dict]):
+    """Mantém next_id à frente dos IDs gravados (também no replay do journal)"""
+    ids = [t["id"] for t in transactions if isinstance(t.get("id"), int)]
+    if ids:
+        data["metadata"]["next_id"] = max(data["metadata"].get("next_id", 1), max(ids) + 1)
+
+
+def apply_mutation(data: Dict, op: str, payload: Dict, ids: IdIndex = None) -> Any:
+    """Aplica uma mutação ao dicionário de dados (usado também no replay do journal)
+    
+    `ids`, quando informado, é mantido em sincronia e evita varrer a lista.
+    """
+    transactions = data["transactions"]
+    if op == "add_transaction":
+        transaction = Transaction.from_dict(payload["transaction"])
+        transactions.append(transaction)
+        advance_next_id(data, [transaction])
+        if ids is not None:
+            ids.track(len(transactions) - 1)
+        return transaction
+    if op == "add_transactions":
+        start = len(transactions)
+        transactions.extend(map(Transaction.from_dict, payload["transactions"]))
+        added = transactions[start:]
+        advance_next_id(data, added)
+        if ids is not None:
+            for position in range(start, len(transactions)):
+                ids.track(position)
+        return added
+    if op == "delete_transaction":
+        return (ids or IdIndex(transactions)).remove(payload["id"])
+    if op == "put_transaction":
+        transaction = Transaction.from_dict(payload["transaction"])
+        (ids or IdIndex(transactions)).replace(transaction)
+        return transaction
+    if op == "put_trip":
+        data["trips"][payload["trip"]["id"]] = payload["trip"]
+        return payload["trip"]
+    if op == "delete_trip":
+        trip_id = payload["trip_id"]
+        deleted_trip = data["trips"].pop(trip_id)
+        # Remove a associação trip_id das transações relacionadas
+        if ids is not None:
+            related = ids.trip_transactions(trip_id)
+            ids.by_trip.pop(trip_id, None)
+        else:
+            related = [t for t in transactions if t.get('trip_id') == trip_id]
+        for transaction in related:
+            transaction.pop('trip_id', None)
+        return deleted_trip, len(related)
+    raise ValueError(f"Operação desconhecida: {op}")
+
+
+def apply_indexed_mutation(data: Dict, op: str, payload: Dict, ids: IdIndex, time_index: TimeIndex,
+                           rollups: Rollups) -> Tuple[Any, List[Dict], Optional[int]]:
+    """apply_mutation() mantendo também o índice temporal e os rollups em sincronia
+    
+    Retorna (resultado, transações desassociadas de uma viagem removida, posição
+    afetada na lista), que o tracker usa para atualizar a visão colunar.
+    """
+    # Transações que mudam de grupo precisam sair dos rollups antes da mutação
+    detached = []
+    position = None
+    if op == "delete_trip":
+        detached = ids.trip_transactions(payload["trip_id"])
+        for transaction in detached:
+            rollups.remove(transaction)
+    elif op == "put_transaction":
+        position = ids.positions[payload["transaction"]["id"]]
+        previous = data["transactions"][position]
+        time_index.remove(previous)
+        rollups.remove(previous)
+    elif op == "delete_transaction":
+        position = ids.positions.get(payload["id"])
+    
+    result = apply_mutation(data, op, payload, ids)
+    if op in ("add_transaction", "put_transaction"):
+        time_index.add(result)
+        rollups.add(result)
+    elif op == "add_transactions":
+        for transaction in result:
+            time_index.add(transaction)
+            rollups.add(transaction)
+    elif op == "delete_transaction":
+        time_index.remove(result)
+        rollups.remove(result)
+    elif op == "delete_trip":
+        for transaction in detached:
+            rollups.add(transaction)
+    return result, detached, position
+
+
+def fsync_directory(path: str):
+    """Garante que um rename dentro do diretório chegou ao disco (POSIX)"""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_file(path: str, mode: str = 'w', **kwargs):
+    """Arquivo temporário que só substitui `path` (fsync + rename) se o bloco terminar sem erro
+    
+    Uma queda no meio da escrita deixa só o .tmp incompleto; o arquivo anterior continua íntegro.
+    """
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, mode, **kwargs) as f:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    fsync_directory(path)
+
+
+@contextmanager
+def gc_paused():
+    """Suspende o coletor de ciclos enquanto milhões de objetos são criados de uma vez
+    
+    Sem isso cada coleta automática percorre de novo todos os objetos já criados.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class JsonStorage:
+    """Snapshot JSON completo, reescrito a cada mutação"""
+    
+    name = "json"
+    supports_queries = False
+    partitioned = False
+    
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.journal_file = os.path.splitext(data_file)[0] + ".journal"
+        self.journal_seq = 0
+        self.journal_entries = 0
+    
+    def load(self, empty: Dict) -> Dict:
+        """Carrega o snapshot e reaplica o journal, se houver"""
+        data = empty
+        if os.path.exists(self.data_file):
+            try:
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                # Começar vazio aqui faria a próxima gravação apagar os dados
+                logger.error("❌ Arquivo de dados ilegível (%s): %s", self.data_file, e)
+                raise ValueError(f"Arquivo de dados corrompido ou ilegível: {self.data_file}") from e
+        
+        self.journal_seq = data["metadata"].get("journal_seq", 0)
+        self.journal_entries = 0
+        # Reaplica mesmo no modo "json" para não perder um journal pendente
+        self._replay_journal(data)
+        return data
+    
+    def _replay_journal(self, data: Dict, indexes: Tuple = None):
+        """Reaplica sobre o snapshot as mutações registradas depois dele
+        
+        `indexes` (IdIndex, TimeIndex, Rollups), quando informados, são mantidos em sincronia.
+        """
+        if not os.path.exists(self.journal_file):
+            return
+        
+        ids = indexes[0] if indexes else IdIndex(data["transactions"])
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha truncada por uma queda no meio da escrita
+                    break
+                # Registros já incorporados ao snapshot são ignorados
+                if record["seq"] <= self.journal_seq:
+                    continue
+                if indexes:
+                    apply_indexed_mutation(data, record["op"], record["payload"], *indexes)
+                else:
+                    apply_mutation(data, record["op"], record["payload"], ids)
+                data["metadata"]["last_updated"] = record["ts"]
+                self.journal_seq = record["seq"]
+                self.journal_entries += 1
+    
+    def save(self, data: Dict):
+        """Grava o snapshot completo e esvazia o journal"""
+        data["metadata"]["journal_seq"] = self.journal_seq
+        self._write_snapshot(data)
+        # O snapshot já contém tudo o que estava no journal
+        if os.path.exists(self.journal_file):
+            open(self.journal_file, 'w').close()
+        self.journal_entries = 0
+    
+    def _write_snapshot(self, data: Dict):
+        with atomic_file(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=json_default)
+    
+    def take_indexes(self, data: Dict) -> Optional[Tuple]:
+        """Índices (IdIndex, TimeIndex, Rollups) prontos do último load(); None se for preciso construí-los"""
+        return None
+    
+    def bind_indexes(self, data: Dict, indexes: Tuple):
+        """Recebe os índices que o tracker mantém sobre `data` (reaproveitáveis pelo backend)"""
+    
+    def commit(self, data: Dict, op: str, payload: Dict):
+        """Persiste uma mutação já aplicada em memória"""
+        self.commit_many(data, [(op, payload, data["metadata"]["last_updated"])])
+    
+    def commit_many(self, data: Dict, mutations: List[Tuple[str, Dict, str]]):
+        """Persiste de uma vez várias mutações (op, payload, timestamp) já aplicadas em memória"""
+        self.save(data)
+    
+    def compact(self, data: Dict):
+        """Incorpora o journal em um novo snapshot"""
+        self.save(data)
+    
+    def close(self):
+        """Libera arquivos e conexões do backend"""
+
+
+class JournalStorage(JsonStorage):
+    """Snapshot JSON + log append-only de mutações (custo de escrita constante)"""
+    
+    name = "journal"
+    
+    # Número de registros no journal que dispara a compactação automática
+    COMPACT_THRESHOLD = 1000
+    
+    def commit_many(self, data: Dict, mutations: List[Tuple[str, Dict, str]]):
+        """Acrescenta as mutações ao journal em uma única escrita (com fsync)"""
+        lines = []
+        for op, payload, ts in mutations:
+            self.journal_seq += 1
+            record = {"seq": self.journal_seq, "ts": ts, "op": op, "payload": payload}
+            lines.append(json.dumps(record, ensure_ascii=False, default=json_default) + "\n")
+        with open(self.journal_file, 'a+b') as f:
+            self._drop_torn_tail(f)
+            f.write("".join(lines).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_entries += len(mutations)
+        
+        if self.journal_entries >= self.COMPACT_THRESHOLD:
+            self.compact(data)
+    
+    @staticmethod
+    def _drop_torn_tail(f):
+        """Corta a última linha incompleta deixada por uma queda no meio da escrita
+        
+        O replay para nessa linha; sem o corte, tudo o que fosse acrescentado depois
+        dela ficaria invisível no próximo load.
+        """
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        
+        # Procura de trás para frente o fim do último registro completo
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 64 * 1024)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                pos = start + newline + 1
+                break
+            pos = start
+        logger.warning("⚠️ Journal com registro incompleto no fim; descartando %d bytes", end - pos)
+        f.truncate(pos)
+        f.seek(pos)
+
+
+class SQLiteStorage:
+    """Banco SQLite com colunas indexadas para consultas e agregações em SQL"""
+    
+    name = "sqlite"
+    supports_queries = True
+    partitioned = False
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER,
+            day TEXT,
+            amount REAL,
+            type TEXT,
+            category TEXT,
+            source TEXT,
+            trip_id TEXT,
+            currency TEXT,
+            doc TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_id ON transactions(id);
+        CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions(day);
+        CREATE INDEX IF NOT EXISTS idx_transactions_trip ON transactions(trip_id);
+        CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category);
+        CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type);
+        CREATE INDEX IF NOT EXISTS idx_transactions_source ON transactions(source);
+        CREATE TABLE IF NOT EXISTS trips (id TEXT PRIMARY KEY, doc TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+    
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.db_file = os.path.splitext(data_file)[0] + ".db"
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+    
+    def load(self, empty: Dict) -> Dict:
+        """Carrega o banco; na primeira abertura migra os arquivos JSON existentes"""
+        with self.lock:
+            meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        
+        if not meta:
+            # Migração única: snapshot JSON + journal pendente
+            data = JournalStorage(self.data_file).load(empty)
+            self.save(data)
+            return data
+        
+        with self.lock:
+            transactions = [json.loads(doc) for (doc,) in
+                            self.conn.execute("SELECT doc FROM transactions ORDER BY seq")]
+            trips = {trip_id: json.loads(doc) for trip_id, doc in
+                     self.conn.execute("SELECT id, doc FROM trips")}
+        return {
+            "transactions": transactions,
+            "trips": trips,
+            "settings": json.loads(meta["settings"]),
+            "metadata": json.loads(meta["metadata"])
+        }
+    
+    @staticmethod
+    def _row(transaction: Dict) -> Tuple:
+        """Colunas indexadas + documento completo da transação"""
+        ordinal = date_ordinal(transaction.get("date"))
+        return (
+            transaction.get("id"),
+            date.fromordinal(ordinal).isoformat() if ordinal else None,
+            transaction.get("amount", 0),
+            transaction.get("type"),
+            transaction.get("category"),
+            transaction.get("source", COLUMN_DEFAULTS["source"]),
+            transaction.get("trip_id") or None,
+            transaction.get("currency"),
+            json.dumps(transaction, ensure_ascii=False, default=json_default)
+        )
+    
+    def _insert_transaction(self, transaction: Dict):
+        self.conn.execute(
+            "INSERT INTO transactions (id, day, amount, type, category, source, trip_id, currency, doc) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._row(transaction))
+    
+    def _put_meta(self, data: Dict):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, json.dumps(data[key], ensure_ascii=False)) for key in ("settings", "metadata")])
+    
+    def save(self, data: Dict):
+        """Regrava o banco inteiro a partir do dicionário em memória"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM transactions")
+            self.conn.execute("DELETE FROM trips")
+            for transaction in data["transactions"]:
+                self._insert_transaction(transaction)
+            self.conn.executemany(
+                "INSERT INTO trips (id, doc) VALUES (?, ?)",
+                [(trip_id, json.dumps(trip, ensure_ascii=False)) for trip_id, trip in data["trips"].items()])
+            self._put_meta(data)
+    
+    def commit(self, data: Dict, op: str, payload: Dict):
+        """Traduz a mutação em um único comando SQL transacional"""
+        self.commit_many(data, [(op, payload, data["metadata"]["last_updated"])])
+    
+    def commit_many(self, data: Dict, mutations: List[Tuple[str, Dict, str]]):
+        """Aplica várias mutações em uma única transação SQL"""
+        with self.lock, self.conn:
+            for op, payload, _ in mutations:
+                self._apply(op, payload)
+            self._put_meta(data)
+    
+    def _apply(self, op: str, payload: Dict):
+        """Comandos SQL de uma mutação (chamar dentro da transação)"""
+        if op == "add_transaction":
+            self._insert_transaction(payload["transaction"])
+        elif op == "add_transactions":
+            for transaction in payload["transactions"]:
+                self._insert_transaction(transaction)
+        elif op == "delete_transaction":
+            self.conn.execute("DELETE FROM transactions WHERE id = ?", (payload["id"],))
+        elif op == "put_transaction":
+            transaction = payload["transaction"]
+            self.conn.execute(
+                "UPDATE transactions SET id = ?, day = ?, amount = ?, type = ?, category = ?, source = ?, "
+                "trip_id = ?, currency = ?, doc = ? WHERE id = ?", self._row(transaction) + (transaction["id"],))
+        elif op == "put_trip":
+            trip = payload["trip"]
+            self.conn.execute("INSERT OR REPLACE INTO trips (id, doc) VALUES (?, ?)",
+                              (trip["id"], json.dumps(trip, ensure_ascii=False)))
+        elif op == "delete_trip":
+            trip_id = payload["trip_id"]
+            self.conn.execute("DELETE FROM trips WHERE id = ?", (trip_id,))
+            rows = self.conn.execute("SELECT seq, doc FROM transactions WHERE trip_id = ?", (trip_id,)).fetchall()
+            for seq, doc in rows:
+                transaction = json.loads(doc)
+                transaction.pop('trip_id', None)
+                self.conn.execute("UPDATE transactions SET trip_id = NULL, doc = ? WHERE seq = ?",
+                                  (json.dumps(transaction, ensure_ascii=False), seq))
+    
+    def compact(self, data: Dict):
+        """Libera espaço de páginas removidas"""
+        with self.lock:
+            self.conn.execute("VACUUM")
+    
+    def take_indexes(self, data: Dict) -> Optional[Tuple]:
+        return None
+    
+    def bind_indexes(self, data: Dict, indexes: Tuple):
+        pass
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+    
+    @staticmethod
+    def _where(year: int = None, month: int = None, date_from: str = None, date_to: str = None,
+               trip_id: str = None, has_trip: bool = None, **columns) -> Tuple[str, List]:
+        """Monta a cláusula WHERE usando apenas colunas indexadas"""
+        clauses, params = [], []
+        start, end = date_bounds(year, month, date_from, date_to)
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(date.fromordinal(start).isoformat())
+        if end is not None:
+            clauses.append("day < ?")
+            params.append(date.fromordinal(end).isoformat())
+        if trip_id:
+            clauses.append("trip_id = ?")
+            params.append(trip_id)
+        if has_trip is not None:
+            clauses.append("trip_id IS NOT NULL" if has_trip else "trip_id IS NULL")
+        for column, value in columns.items():
+            if column not in QUERY_COLUMNS:
+                raise ValueError(f"Coluna inválida: {column}")
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def query_transactions(self, **filters) -> List[Dict]:
+        """Transações que atendem aos filtros (cronológicas quando há filtro de período)"""
+        where, params = self._where(**filters)
+        dated = any(filters.get(key) for key in ("year", "date_from", "date_to"))
+        order = "day, seq" if dated else "seq"
+        with self.lock:
+            return [json.loads(doc) for (doc,) in
+                    self.conn.execute(f"SELECT doc FROM transactions{where} ORDER BY {order}", params)]
+    
+    def page_transactions(self, limit: int, after: Tuple[int, int] = None,
+                          **filters) -> List[Tuple[int, Dict]]:
+        """Até `limit` pares (dia, transação) em ordem (dia, id), depois do cursor `after`"""
+        where, params = self._where(**filters)
+        if after:
+            cursor_day = date.fromordinal(after[0]).isoformat()
+            where += (" AND " if where else " WHERE ") + "(day > ? OR (day = ? AND IFNULL(id, 0) > ?))"
+            params += [cursor_day, cursor_day, after[1]]
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT day, doc FROM transactions{where} ORDER BY day, IFNULL(id, 0), seq LIMIT ?",
+                params + [limit])
+            return [(date_ordinal(day), json.loads(doc)) for day, doc in rows]
+    
+    def aggregate_transactions(self, group_by: str = None, **filters) -> Dict[Any, Tuple[float, int]]:
+        """Soma e contagem de `amount` agrupadas por uma coluna indexada"""
+        if group_by is not None and group_by not in GROUP_KEYS:
+            raise ValueError(f"Coluna inválida: {group_by}")
+        where, params = self._where(**filters)
+        key = "substr(day, 1, 7)" if group_by == "month" else (group_by or "NULL")
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {key}, SUM(amount), COUNT(*) FROM transactions{where} GROUP BY {key}", params).fetchall()
+        if group_by == "month":
+            rows = [(tuple(map(int, group.split("-"))) if group else None, total, count)
+                    for group, total, count in rows]
+        return {group: (total, count) for group, total, count in rows if count}
+
+
+# Cabeçalho fixo do snapshot binário: magic, versão do formato, reservado, tamanho do cabeçalho JSON
+SNAPSHOT_MAGIC = b"EXPSNAP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PREFIX = struct.Struct("<IIQ")
+SNAPSHOT_ALIGN = 8
+
+# Como cada campo de Transaction vira coluna no snapshot
+SNAPSHOT_FLOATS = ("amount", "amount_eur", "amount_brl", "exchange_rate")
+SNAPSHOT_CODED = ("type", "category", "trip_id", "currency", "source")
+SNAPSHOT_TEXT = ("date", "description")
+
+# Protege a troca de LazyTransaction por Transaction entre threads leitoras
+_MATERIALIZE_LOCK = threading.Lock()
+
+
+class LazyTransaction(Transaction):
+    """Transação de um snapshot binário, decodificada no primeiro acesso
+    
+    `_extra` guarda (snapshot, linha) até a decodificação; depois os slots são
+    preenchidos e o objeto vira um Transaction comum (mesmo layout de slots), então
+    índices e listas que já o referenciam continuam válidos.
+    """
+    
+    __slots__ = ()
+    
+    def _materialize(self):
+        with _MATERIALIZE_LOCK:
+            if type(self) is LazyTransaction:
+                snapshot, row = self._extra
+                # Nesta ordem, uma gravação concorrente vê (snapshot, linha) ou os slots completos
+                snapshot.fill(self, row)
+                self._order = None
+                self._extra = None
+                self.__class__ = Transaction
+    
+    def __getitem__(self, key: str) -> Any:
+        self._materialize()
+        return self[key]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        self._materialize()
+        return self.get(key, default)
+    
+    def __setitem__(self, key: str, value: Any):
+        self._materialize()
+        self[key] = value
+    
+    def __delitem__(self, key: str):
+        self._materialize()
+        del self[key]
+    
+    def __contains__(self, key: Any) -> bool:
+        self._materialize()
+        return key in self
+    
+    def __iter__(self):
+        self._materialize()
+        return iter(self)
+    
+    def __len__(self) -> int:
+        self._materialize()
+        return len(self)
+    
+    def to_dict(self) -> Dict:
+        self._materialize()
+        return self.to_dict()
+    
+    def __eq__(self, other: Any) -> bool:
+        self._materialize()
+        return self == other
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        self._materialize()
+        return repr(self)
+    
+    def __reduce__(self):
+        self._materialize()
+        return self.__reduce__()
+
+
+class Snapshot:
+    """Snapshot binário aberto com mmap: só o cabeçalho é lido na abertura
+    
+    Layout: magic, versão, tamanho do cabeçalho, cabeçalho JSON (settings, metadata,
+    viagens, tabelas de códigos, rollups, seções) e, alinhadas a 8 bytes, as seções:
+    uma coluna por campo (float64, códigos int32 com -1 = None, textos em heap UTF-8
+    com offsets), máscara de campos presentes, ordem cronológica e suas chaves.
+    Linhas fora desses tipos (ex.: amount inteiro, chaves extras) vão inteiras para
+    "overflow" no cabeçalho, então a volta para JSON é exata.
+    """
+    
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            if os.name == "posix":
+                # Um rename posterior não afeta o mapeamento do arquivo antigo
+                self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # No Windows um arquivo mapeado não pode ser substituído
+                self.buffer = f.read()
+        self.view = memoryview(self.buffer)
+        if bytes(self.view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError(f"Arquivo não é um snapshot binário: {path}")
+        version, _, header_length = SNAPSHOT_PREFIX.unpack_from(self.view, len(SNAPSHOT_MAGIC))
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Versão de snapshot não suportada: {version}")
+        start = len(SNAPSHOT_MAGIC) + SNAPSHOT_PREFIX.size
+        self.header = json.loads(bytes(self.view[start:start + header_length]))
+        if self.header["fields"] != list(Transaction.FIELDS):
+            raise ValueError(f"Snapshot gravado com outros campos de transação: {path}")
+        self.base = -(-(start + header_length) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+        self.rows = self.header["rows"]
+        self.tables = {field: [sys.intern(value) if isinstance(value, str) else value for value in values]
+                       for field, values in self.header["tables"].items()}
+        self._columns = {}
+    
+    def column(self, name: str):
+        """Seção como sequência tipada (memoryview sobre o mmap, sem cópia)"""
+        column = self._columns.get(name)
+        if column is None:
+            offset, length, typecode = self.header["sections"][name]
+            raw = self.view[self.base + offset:self.base + offset + length]
+            if self.header["byteorder"] == sys.byteorder or typecode == "B":
+                column = raw.cast(typecode)
+            else:
+                column = array(typecode, raw)
+                column.byteswap()
+            self._columns[name] = column
+        return column
+    
+    def value(self, key: str, row: int) -> Any:
+        """Um campo de uma linha (a linha precisa ter o campo: ver a máscara)"""
+        if key in SNAPSHOT_CODED:
+            code = self.column(key)[row]
+            return None if code < 0 else self.tables[key][code]
+        if key in SNAPSHOT_TEXT:
+            offsets = self.column(f"{key}_offsets")
+            return bytes(self.column(f"{key}_heap")[offsets[row]:offsets[row + 1]]).decode('utf-8')
+        return self.column(key)[row]
+    
+    def row_values(self, row: int) -> Tuple:
+        """Valores da linha na ordem de Transaction.FIELDS (_MISSING = campo ausente)"""
+        mask = self.column("mask")[row]
+        return tuple(self.value(key, row) if mask >> bit & 1 else _MISSING
+                     for bit, key in enumerate(Transaction.FIELDS))
+    
+    def fill(self, record: Transaction, row: int):
+        """Preenche os slots do registro com a linha (sem passar por __setitem__)"""
+        mask = self.column("mask")[row]
+        for bit, key in enumerate(Transaction.FIELDS):
+            if mask >> bit & 1:
+                setattr(record, key, self.value(key, row))
+    
+    def data(self) -> Dict:
+        """Dados completos com transações preguiçosas (nenhuma coluna é lida aqui)"""
+        new = LazyTransaction.__new__
+        transactions = []
+        append = transactions.append
+        for row in range(self.rows):
+            record = new(LazyTransaction)
+            record._extra = (self, row)
+            append(record)
+        for row, fields in self.header["overflow"].items():
+            transactions[int(row)] = Transaction(fields)
+        return {
+            "transactions": transactions,
+            "trips": self.header["trips"],
+            "settings": self.header["settings"],
+            "metadata": self.header["metadata"]
+        }
+    
+    def indexes(self, transactions: List[Dict]) -> Optional[Tuple[IdIndex, TimeIndex, Rollups]]:
+        """Índices a partir das colunas de IDs, viagens e ordem cronológica; None sem IDs únicos"""
+        if not self.header["ids_valid"]:
+            return None
+        ids = self.column("id").tolist()
+        trips = self.tables["trip_id"]
+        by_trip = defaultdict(set)
+        for transaction_id, code in zip(ids, self.column("trip_id").tolist()):
+            if code >= 0 and trips[code]:
+                by_trip[trips[code]].add(transaction_id)
+        id_index = IdIndex.prebuilt(transactions, dict(zip(ids, range(self.rows))), by_trip)
+        keys, order = self.column("time_keys").tolist(), self.column("time_order").tolist()
+        if not self.header.get("time_order_by_id"):
+            # Snapshots anteriores deixavam o mesmo dia na ordem de inserção
+            triples = sorted(zip(keys, map(ids.__getitem__, order), order))
+            keys, order = [key for key, _, _ in triples], [row for _, _, row in triples]
+        time_index = TimeIndex.prebuilt(keys, [transactions[row] for row in order])
+        return id_index, time_index, Rollups.from_state(self.header["rollups"])
+
+
+def _lazy_source(transaction: Dict) -> Optional[Tuple]:
+    """(snapshot, linha) de uma LazyTransaction ainda não decodificada; None para os demais"""
+    source = getattr(transaction, "_extra", None)
+    return source if type(source) is tuple else None
+
+
+class SnapshotWriter:
+    """Monta as seções de um Snapshot linha a linha
+    
+    Linhas ainda preguiçosas de um snapshot base são copiadas em blocos, sem
+    decodificar: as tabelas de códigos começam iguais às do base, então os códigos
+    continuam válidos e os textos são copiados como bytes.
+    """
+    
+    # Máscara de uma linha com todos os campos
+    FULL_MASK = (1 << len(Transaction.FIELDS)) - 1
+    
+    def __init__(self, base: Snapshot = None):
+        self.base = base
+        self.rows = 0
+        self.ids, self.masks = array('q'), array('H')
+        self.floats = {key: array('d') for key in SNAPSHOT_FLOATS}
+        self.codes = {key: array('i') for key in SNAPSHOT_CODED}
+        self.tables = {key: list(base.tables[key]) if base else [] for key in SNAPSHOT_CODED}
+        self.lookups = {key: {value: code for code, value in enumerate(table)}
+                        for key, table in self.tables.items()}
+        self.heaps = {key: [] for key in SNAPSHOT_TEXT}
+        self.offsets = {key: array('Q', [0]) for key in SNAPSHOT_TEXT}
+        self.overflow = {}
+        self.ids_valid = True
+    
+    def _code(self, key: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        lookup = self.lookups[key]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.tables[key])
+            self.tables[key].append(value)
+        return code
+    
+    def _text(self, key: str, value: Optional[str]):
+        offsets = self.offsets[key]
+        if type(value) is str:
+            encoded = value.encode('utf-8')
+            self.heaps[key].append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+        else:
+            offsets.append(offsets[-1])
+    
+    def append(self, transaction: Dict):
+        """Acrescenta uma transação (dict, Transaction ou LazyTransaction de outro snapshot)"""
+        if (type(transaction) is Transaction and not transaction._extra and transaction._order is None
+                and self._append_full(transaction)):
+            return
+        source = _lazy_source(transaction)
+        if source is not None:
+            values, fits = source[0].row_values(source[1]), True
+        else:
+            values, fits = self._fields(transaction)
+        if not fits:
+            self.overflow[str(self.rows)] = dict(transaction)
+        
+        mask = 0
+        for bit, (key, value) in enumerate(zip(Transaction.FIELDS, values)):
+            present = value is not _MISSING
+            if present:
+                mask |= 1 << bit
+            if key == "id":
+                valid = present and type(value) is int
+                self.ids_valid = self.ids_valid and valid
+                self.ids.append(value if valid else 0)
+            elif key in SNAPSHOT_FLOATS:
+                self.floats[key].append(value if type(value) is float else 0.0)
+            elif key in SNAPSHOT_CODED:
+                self.codes[key].append(self._code(key, value) if present and (value is None or type(value) is str)
+                                       else -1)
+            else:
+                self._text(key, value)
+        self.masks.append(mask)
+        self.rows += 1
+    
+    def _append_full(self, transaction: Transaction) -> bool:
+        """Caminho rápido: todos os campos presentes e nos tipos das colunas"""
+        try:
+            (transaction_id, day, amount, amount_eur, amount_brl, tx_type, category,
+             description, trip_id, currency, exchange_rate, source) = _get_fields(transaction)
+        except AttributeError:
+            return False
+        if not (type(transaction_id) is int and type(day) is str and type(description) is str
+                and type(amount) is float and type(amount_eur) is float and type(amount_brl) is float
+                and type(exchange_rate) is float
+                and (tx_type is None or type(tx_type) is str) and (category is None or type(category) is str)
+                and (trip_id is None or type(trip_id) is str) and (currency is None or type(currency) is str)
+                and (source is None or type(source) is str)):
+            return False
+        self.ids.append(transaction_id)
+        self.masks.append(self.FULL_MASK)
+        floats, codes = self.floats, self.codes
+        floats["amount"].append(amount)
+        floats["amount_eur"].append(amount_eur)
+        floats["amount_brl"].append(amount_brl)
+        floats["exchange_rate"].append(exchange_rate)
+        codes["type"].append(self._code("type", tx_type))
+        codes["category"].append(self._code("category", category))
+        codes["trip_id"].append(self._code("trip_id", trip_id))
+        codes["currency"].append(self._code("currency", currency))
+        codes["source"].append(self._code("source", source))
+        self._text("date", day)
+        self._text("description", description)
+        self.rows += 1
+        return True
+    
+    @staticmethod
+    def _fields(transaction: Dict) -> Tuple[Tuple, bool]:
+        """(valores na ordem de Transaction.FIELDS, se cabem nas colunas)"""
+        if isinstance(transaction, Transaction):
+            values = tuple(getattr(transaction, key, _MISSING) for key in Transaction.FIELDS)
+            fits = not transaction._extra and transaction._order is None
+        else:
+            values = tuple(transaction.get(key, _MISSING) for key in Transaction.FIELDS)
+            fits = all(key in _TRANSACTION_FIELDS for key in transaction) and in_field_order(transaction)
+        for key, value in zip(Transaction.FIELDS, values):
+            if value is _MISSING:
+                continue
+            if key == "id":
+                fits = fits and type(value) is int
+            elif key in SNAPSHOT_FLOATS:
+                fits = fits and type(value) is float
+            elif key in SNAPSHOT_CODED:
+                fits = fits and (value is None or type(value) is str)
+            else:
+                fits = fits and type(value) is str
+        return values, fits
+    
+    def copy_rows(self, start: int, stop: int):
+        """Copia as linhas [start, stop) do snapshot base, coluna a coluna"""
+        base = self.base
+        self.ids_valid = self.ids_valid and base.header["ids_valid"]
+        for name, target in [("id", self.ids), ("mask", self.masks), *self.floats.items(), *self.codes.items()]:
+            target.frombytes(base.column(name)[start:stop].tobytes())
+        for key in SNAPSHOT_TEXT:
+            source = base.column(f"{key}_offsets")
+            first, last = source[start], source[stop]
+            offsets = self.offsets[key]
+            shift = offsets[-1] - first
+            offsets.extend([offset + shift for offset in source[start + 1:stop + 1].tolist()])
+            self.heaps[key].append(base.column(f"{key}_heap")[first:last].tobytes())
+        self.rows += stop - start
+    
+    def write(self, path: str, data: Dict, time_index: TimeIndex, rollups: Rollups):
+        """Grava cabeçalho e seções (atômico); time_index.items são as linhas já acrescentadas"""
+        row_of = dict(zip(map(id, data["transactions"]), range(self.rows)))
+        sections = [("id", self.ids), ("mask", self.masks), *self.floats.items(), *self.codes.items()]
+        for key in SNAPSHOT_TEXT:
+            sections += [(f"{key}_offsets", self.offsets[key]), (f"{key}_heap", array('B', b"".join(self.heaps[key])))]
+        sections += [("time_order", array('I', map(row_of.__getitem__, map(id, time_index.items)))),
+                     ("time_keys", array('i', time_index.keys))]
+        
+        layout, position = {}, 0
+        for name, column in sections:
+            length = len(column) * column.itemsize
+            layout[name] = [position, length, column.typecode]
+            position = -(-(position + length) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+        
+        header = json.dumps({
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "fields": list(Transaction.FIELDS),
+            "ids_valid": self.ids_valid and len(set(self.ids)) == self.rows,
+            "settings": data["settings"],
+            "metadata": data["metadata"],
+            "trips": data["trips"],
+            "tables": self.tables,
+            "rollups": rollups.state(),
+            "time_order_by_id": True,
+            "overflow": self.overflow,
+            "sections": layout
+        }, ensure_ascii=False, default=json_default).encode('utf-8')
+        
+        with atomic_file(path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(SNAPSHOT_PREFIX.pack(SNAPSHOT_VERSION, 0, len(header)))
+            f.write(header)
+            f.write(b"\0" * (-f.tell() % SNAPSHOT_ALIGN))
+            base = f.tell()
+            for name, column in sections:
+                f.write(b"\0" * (base + layout[name][0] - f.tell()))
+                f.write(column.tobytes())
+
+
+def write_snapshot(path: str, data: Dict, indexes: Tuple = None):
+    """Grava os dados no formato binário de Snapshot (atômico)
+    
+    `indexes` (IdIndex, TimeIndex, Rollups) mantidos pelo tracker evitam recalcular a
+    ordem cronológica e os rollups; sem eles, são construídos aqui.
+    """
+    transactions = data["transactions"]
+    base = next((source[0] for source in map(_lazy_source, transactions) if source), None)
+    writer = SnapshotWriter(base)
+    # Trechos de linhas consecutivas do base são copiados de uma vez
+    run_start = run_stop = None
+    for transaction in transactions:
+        source = _lazy_source(transaction)
+        if source is not None and source[0] is base:
+            if source[1] != run_stop:
+                if run_start is not None:
+                    writer.copy_rows(run_start, run_stop)
+                run_start = source[1]
+            run_stop = source[1] + 1
+            continue
+        if run_start is not None:
+            writer.copy_rows(run_start, run_stop)
+            run_start = run_stop = None
+        writer.append(transaction)
+    if run_start is not None:
+        writer.copy_rows(run_start, run_stop)
+    
+    if indexes is None or len(indexes[1].items) != len(transactions):
+        indexes = (None, TimeIndex(transactions), Rollups(transactions))
+    writer.write(path, data, indexes[1], indexes[2])
+
+
+class BinaryStorage(JournalStorage):
+    """Snapshot binário colunar (Snapshot) + journal de mutações
+    
+    A carga lê só o cabeçalho e as colunas de índice (IDs, viagens, ordem cronológica);
+    cada transação é decodificada no primeiro acesso e os rollups vêm prontos do arquivo.
+    O JSON continua sendo o formato de troca: migrate_storage() converte nos dois sentidos
+    e /api/export não muda.
+    """
+    
+    name = "binary"
+    
+    # Gravar o snapshot custa mais que reaplicar o journal na carga
+    COMPACT_THRESHOLD = 10000
+    
+    def __init__(self, data_file: str):
+        super().__init__(data_file)
+        self.snapshot_file = os.path.splitext(data_file)[0] + ".snap"
+        self._loaded_indexes = None
+        self._bound_indexes = None
+        # Vários workers abrindo ao mesmo tempo: só um migra (o lock do tracker pode já estar em uso)
+        self._migration_lock = ProcessLock(f"{self.snapshot_file}.lock")
+    
+    def load(self, empty: Dict) -> Dict:
+        """Abre o snapshot e reaplica o journal; na primeira abertura migra os arquivos JSON"""
+        with self._migration_lock:
+            if not os.path.exists(self.snapshot_file):
+                # Migração única: snapshot JSON + journal pendente
+                source = JournalStorage(self.data_file)
+                data = source.load(empty)
+                self.journal_seq = source.journal_seq
+                self.save(data)
+                return data
+        
+        try:
+            snapshot = Snapshot(self.snapshot_file)
+        except (OSError, ValueError) as e:
+            logger.error("❌ Snapshot binário ilegível (%s): %s", self.snapshot_file, e)
+            raise ValueError(f"Arquivo de dados corrompido ou ilegível: {self.snapshot_file}") from e
+        with gc_paused():
+            data = snapshot.data()
+            self.journal_seq = data["metadata"].get("journal_seq", 0)
+            self.journal_entries = 0
+            indexes = snapshot.indexes(data["transactions"])
+            self._replay_journal(data, indexes)
+        self._loaded_indexes = (data["transactions"], indexes) if indexes else None
+        return data
+    
+    def take_indexes(self, data: Dict) -> Optional[Tuple]:
+        loaded, self._loaded_indexes = self._loaded_indexes, None
+        if loaded and loaded[0] is data["transactions"]:
+            return loaded[1]
+        return None
+    
+    def bind_indexes(self, data: Dict, indexes: Tuple):
+        self._bound_indexes = (data["transactions"], indexes)
+    
+    def close(self):
+        # O mapeamento do snapshot é liberado junto com as transações que ainda o referenciam
+        self._bound_indexes = None
+        self._migration_lock.close()
+    
+    def _write_snapshot(self, data: Dict):
+        bound = self._bound_indexes
+        write_snapshot(self.snapshot_file, data, bound[1] if bound and bound[0] is data["transactions"] else None)
+
+
+def partition_year(transaction: Dict) -> int:
+    """Ano da partição da transação (0 para datas inválidas)"""
+    ordinal = date_ordinal(transaction.get("date"))
+    return date.fromordinal(ordinal).year if ordinal else 0
+
+
+def year_bounds(year: int) -> Tuple[int, int]:
+    """Intervalo [início, fim) em dias ordinais coberto pela partição do ano"""
+    if not year:
+        return 0, 1
+    return date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal()
+
+
+class Partition:
+    """Transações de um ano com os próprios índices (lista, IdIndex, TimeIndex)
+    
+    `data` compartilha trips, settings e metadata com os dados principais, então
+    apply_indexed_mutation() funciona sobre uma partição como sobre os dados inteiros.
+    """
+    
+    def __init__(self, year: Optional[int], data: Dict, ids: IdIndex = None, time_index: TimeIndex = None):
+        self.year = year
+        self.data = data
+        self.ids = ids if ids is not None else IdIndex(data["transactions"])
+        self.time_index = time_index if time_index is not None else TimeIndex(data["transactions"])
+        # Alterada em memória desde a última gravação
+        self.dirty = False
+        # Índice da busca textual, construído na primeira busca
+        self.search = None
+    
+    @property
+    def transactions(self) -> List[Dict]:
+        return self.data["transactions"]
+    
+    def candidates(self, start: int = None, end: int = None, trip_id: str = None) -> List[Dict]:
+        """Transações do período (ordem cronológica) ou, sem período, da viagem / todas"""
+        if start is None and end is None:
+            return self.ids.trip_transactions(trip_id) if trip_id else self.transactions
+        return self.time_index.range(start, end)
+
+
+class PartitionedStorage:
+    """Um arquivo JSON por ano + manifesto; só o ano corrente fica sempre em memória
+    
+    Os outros anos são carregados sob demanda em um LRU de partições
+    (PARTITION_CACHE_SIZE). O manifesto guarda settings, metadata, viagens, os
+    rollups de todo o histórico e, por ano, contagem, faixa de IDs e viagens
+    presentes, para decidir quais anos abrir sem lê-los. Cada commit grava as
+    partições alteradas em arquivos novos ({ano}.{geração}.json) e só então troca o
+    manifesto, que aponta para eles: a troca do manifesto é o ponto de commit, e uma
+    queda antes dela deixa o estado anterior inteiro. Partições alteradas só saem
+    do LRU depois de gravadas.
+    """
+    
+    name = "partitioned"
+    supports_queries = False
+    partitioned = True
+    
+    def __init__(self, data_file: str, cache_size: int = None):
+        self.data_file = data_file
+        self.directory = os.path.splitext(data_file)[0] + ".partitions"
+        self.manifest_file = os.path.join(self.directory, "manifest.json")
+        self._migration_lock = ProcessLock(f"{self.directory}.lock")
+        if cache_size is None:
+            cache_size = int(os.environ.get('PARTITION_CACHE_SIZE', 4))
+        self.cache_size = cache_size
+        # Fixado na abertura: depois da virada do ano, o ano novo vira uma partição do LRU
+        self.hot_year = date.today().year
+        self.partitions = {}
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.hot = None
+        self.rollups = None
+        self._loaded_indexes = None
+        # Geração do último manifesto; os arquivos da anterior ficam para leitores atrasados
+        self.generation = 0
+        self._previous_files = set()
+    
+    def _read_partition(self, year: int) -> List[Dict]:
+        info = self.partitions.get(year)
+        if info is None:
+            return []
+        path = os.path.join(self.directory, info["file"])
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                transactions = json.load(f)["transactions"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("❌ Partição ilegível (%s): %s", path, e)
+            raise ValueError(f"Arquivo de dados corrompido ou ilegível: {path}") from e
+        compact_transactions(transactions)
+        return transactions
+    
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("❌ Manifesto ilegível (%s): %s", self.manifest_file, e)
+            raise ValueError(f"Arquivo de dados corrompido ou ilegível: {self.manifest_file}") from e
+    
+    def load(self, empty: Dict) -> Dict:
+        """Lê o manifesto e só a partição do ano corrente; na primeira abertura divide o JSON por ano"""
+        with self._migration_lock:
+            if not os.path.exists(self.manifest_file):
+                # Migração única: snapshot JSON + journal pendente, com IDs únicos em todas as partições
+                data = JournalStorage(self.data_file).load(empty)
+                assign_ids(data)
+                self._write_all(data)
+        
+        manifest = self._read_manifest()
+        self.partitions = {int(year): info for year, info in manifest["partitions"].items()}
+        self.generation = manifest["generation"]
+        self._previous_files = self._referenced_files()
+        with gc_paused():
+            transactions = self._read_partition(self.hot_year)
+            indexes = (IdIndex(transactions), TimeIndex(transactions), Rollups.from_state(manifest["rollups"]))
+        data = {
+            "transactions": transactions,
+            "trips": manifest["trips"],
+            "settings": manifest["settings"],
+            "metadata": manifest["metadata"]
+        }
+        self._loaded_indexes = (transactions, indexes)
+        return data
+    
+    def load_all(self, empty: Dict) -> Dict:
+        """Dados completos, com todas as partições (para migrate_storage)"""
+        data = self.load(empty)
+        for year in sorted(self.partitions):
+            if year != self.hot_year:
+                data["transactions"].extend(self._read_partition(year))
+        return data
+    
+    def take_indexes(self, data: Dict) -> Optional[Tuple]:
+        loaded, self._loaded_indexes = self._loaded_indexes, None
+        if loaded and loaded[0] is data["transactions"]:
+            return loaded[1]
+        return None
+    
+    def bind_indexes(self, data: Dict, indexes: Tuple):
+        """Os dados principais viram a partição quente; as frias em cache eram dos dados anteriores"""
+        self.hot = Partition(self.hot_year, data, indexes[0], indexes[1])
+        self.rollups = indexes[2]
+        with self.cache_lock:
+            self.cache.clear()
+    
+    def partition(self, year: int) -> Partition:
+        """Partição do ano, lida do disco se não estiver no LRU"""
+        if year == self.hot_year:
+            return self.hot
+        with self.cache_lock:
+            partition = self.cache.get(year)
+            if partition is not None:
+                self.cache.move_to_end(year)
+                return partition
+            started = time.perf_counter()
+            with gc_paused():
+                partition = Partition(year, dict(self.hot.data, transactions=self._read_partition(year)))
+            metrics.observe("expense_operation_duration_seconds", time.perf_counter() - started,
+                            operation="load_partition")
+            self.cache[year] = partition
+            self._trim()
+            return partition
+    
+    def partition_of(self, transaction: Dict) -> Partition:
+        return self.partition(partition_year(transaction))
+    
+    def _trim(self):
+        """Descarta as partições menos usadas além da capacidade (chamar com cache_lock)"""
+        excess = len(self.cache) - self.cache_size
+        for year in [year for year, partition in self.cache.items() if not partition.dirty][:max(excess, 0)]:
+            del self.cache[year]
+    
+    def _known_years(self) -> set:
+        with self.cache_lock:
+            return set(self.partitions) | set(self.cache) | {self.hot_year}
+    
+    def years(self, start: int = None, end: int = None) -> List[int]:
+        """Anos com dados que cruzam o período [start, end) em dias ordinais, em ordem"""
+        return sorted(year for year in self._known_years()
+                      if (start is None or year_bounds(year)[1] > start)
+                      and (end is None or year_bounds(year)[0] < end))
+    
+    def years_with_trip(self, trip_id: str) -> List[int]:
+        with self.cache_lock:
+            cached = {year for year, partition in self.cache.items() if trip_id in partition.ids.by_trip}
+        listed = {year for year, info in self.partitions.items() if trip_id in info["trips"]}
+        return sorted(cached | listed | {self.hot_year})
+    
+    def years_with_id(self, transaction_id: int) -> List[int]:
+        with self.cache_lock:
+            cached = set(self.cache)
+        listed = {year for year, info in self.partitions.items()
+                  if info["count"] and info["min_id"] <= transaction_id <= info["max_id"]}
+        return sorted((cached | listed) - {self.hot_year})
+    
+    def _write_partition(self, partition: Partition, generation: int):
+        """Grava a partição em um arquivo da geração e atualiza a entrada dela no manifesto em memória
+        
+        O arquivo anterior não é tocado: até o manifesto novo ser gravado, é ele que vale.
+        """
+        transactions = partition.transactions
+        if transactions:
+            file_name = f"{partition.year}.{generation}.json"
+            with atomic_file(os.path.join(self.directory, file_name), 'w', encoding='utf-8') as f:
+                json.dump({"year": partition.year, "transactions": transactions}, f,
+                          ensure_ascii=False, default=json_default)
+            ids = list(partition.ids.positions)
+            self.partitions[partition.year] = {
+                "file": file_name,
+                "count": len(transactions),
+                "min_id": min(ids, default=0),
+                "max_id": max(ids, default=0),
+                "trips": sorted(partition.ids.by_trip)
+            }
+        else:
+            self.partitions.pop(partition.year, None)
+        partition.dirty = False
+    
+    def _write_manifest(self, data: Dict, rollups: Rollups, generation: int):
+        with atomic_file(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "generation": generation,
+                "settings": data["settings"],
+                "metadata": data["metadata"],
+                "trips": data["trips"],
+                "rollups": rollups.state(),
+                "partitions": {str(year): info for year, info in sorted(self.partitions.items())}
+            }, f, ensure_ascii=False, default=json_default)
+    
+    def _commit_partitions(self, data: Dict, partitions: List[Partition], rollups: Rollups):
+        """Grava as partições em arquivos novos e então o manifesto que aponta para eles"""
+        generation = self.generation + 1
+        for partition in partitions:
+            self._write_partition(partition, generation)
+        self._write_manifest(data, rollups, generation)
+        self.generation = generation
+        self._remove_unreferenced()
+    
+    def _referenced_files(self) -> set:
+        return {info["file"] for info in self.partitions.values()}
+    
+    def _remove_unreferenced(self):
+        """Apaga partições que nem o manifesto atual nem o anterior usam (inclusive restos de quedas)"""
+        current = self._referenced_files()
+        keep = current | self._previous_files | {os.path.basename(self.manifest_file)}
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and name not in keep:
+                os.remove(os.path.join(self.directory, name))
+        self._previous_files = current
+    
+    def _write_all(self, data: Dict):
+        """Regrava tudo a partir de dados completos (migração ou importação)"""
+        os.makedirs(self.directory, exist_ok=True)
+        groups = defaultdict(list)
+        for transaction in data["transactions"]:
+            groups[partition_year(transaction)].append(transaction)
+        partitions = [Partition(year, dict(data, transactions=groups.get(year, [])))
+                      for year in set(self.partitions) | set(groups)]
+        self._commit_partitions(data, partitions, Rollups(data["transactions"]))
+    
+    def save(self, data: Dict):
+        """Grava os dados do tracker (partições alteradas + a quente) ou regrava tudo a partir de dados completos"""
+        if self.hot is not None and data is self.hot.data:
+            self.hot.dirty = True
+            self.commit_many(data, [])
+        else:
+            self._write_all(data)
+    
+    def commit(self, data: Dict, op: str, payload: Dict):
+        self.commit_many(data, [(op, payload, data["metadata"]["last_updated"])])
+    
+    def commit_many(self, data: Dict, mutations: List[Tuple[str, Dict, str]]):
+        """Regrava as partições alteradas pelas mutações e o manifesto"""
+        with self.cache_lock:
+            dirty = [partition for partition in [self.hot, *self.cache.values()] if partition.dirty]
+        self._commit_partitions(data, dirty, self.rollups)
+        with self.cache_lock:
+            self._trim()
+    
+    def compact(self, data: Dict):
+        """Não há journal: só garante que o que está em memória foi gravado"""
+        self.commit_many(data, [])
+    
+    def close(self):
+        with self.cache_lock:
+            self.cache.clear()
+        self.hot = None
+        self._migration_lock.close()
+
+
+STORAGE_BACKENDS = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+    "sqlite": SQLiteStorage,
+    "binary": BinaryStorage,
+    "partitioned": PartitionedStorage
+}
+
+
+def create_storage(mode: str, data_file: str):
+    """Instancia o backend de armazenamento pelo nome"""
+    try:
+        return STORAGE_BACKENDS[mode.lower()](data_file)
+    except KeyError:
+        raise ValueError(f"Modo de armazenamento desconhecido: {mode}")
+
+
+def migrate_storage(target_mode: str = "sqlite", data_file: str = "expense_data_final.json",
+                    source_mode: str = "journal") -> int:
+    """Migração única entre backends; retorna o número de transações copiadas"""
+    source = create_storage(source_mode, data_file)
+    empty = ExpenseTracker.empty_data()
+    # Um backend particionado carrega só o ano corrente em load()
+    data = source.load_all(empty) if source.partitioned else source.load(empty)
+    create_storage(target_mode, data_file).save(data)
+    return len(data["transactions"])
+
+
+# ==================== CONCORRÊNCIA ====================
+
+class RWLock:
+    """Lock de leitores/escritor: leituras em paralelo, escrita exclusiva
+    
+    Reentrante por thread (leituras dentro de leituras ou da escrita). Escritores
+    em espera têm prioridade sobre novos leitores.
+    """
+    
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = None
+        self.waiting_writers = 0
+        self.local = threading.local()
+    
+    def held(self) -> bool:
+        """A thread atual já está dentro de uma leitura ou escrita?"""
+        return self.writer == threading.get_ident() or getattr(self.local, 'depth', 0) > 0
+    
+    @contextmanager
+    def read(self):
+        if self.held():
+            self.local.depth = getattr(self.local, 'depth', 0) + 1
+            try:
+                yield
+            finally:
+                self.local.depth -= 1
+            return
+        
+        with self.cond:
+            while self.writer is not None or self.waiting_writers:
+                self.cond.wait()
+            self.readers += 1
+        self.local.depth = 1
+        try:
+            yield
+        finally:
+            self.local.depth = 0
+            with self.cond:
+                self.readers -= 1
+                if not self.readers:
+                    self.cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self.writer == me:
+            yield
+            return
+        if getattr(self.local, 'depth', 0):
+            raise RuntimeError("Não é possível promover uma leitura a escrita")
+        
+        with self.cond:
+            self.waiting_writers += 1
+            while self.writer is not None or self.readers:
+                self.cond.wait()
+            self.waiting_writers -= 1
+            self.writer = me
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.writer = None
+                self.cond.notify_all()
+
+
+class ProcessLock:
+    """Lock exclusivo entre processos (fcntl.flock) com um contador de versão dos dados
+    
+    O contador fica no próprio arquivo de lock: cada escrita o incrementa e os
+    outros processos o comparam com a versão que carregaram para saber se devem recarregar.
+    """
+    
+    VERSION_WIDTH = 20
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = None
+        self.pid = None
+        self.depth = 0
+        self.io_lock = threading.Lock()
+    
+    def _fileno(self) -> int:
+        # Descritores herdados num fork compartilham o flock: cada processo abre o seu
+        if self.pid != os.getpid():
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self.pid = os.getpid()
+            self.depth = 0
+        return self.fd
+    
+    def __enter__(self):
+        fd = self._fileno()
+        if self.depth == 0 and fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        self.depth += 1
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0 and fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+    
+    def read_version(self) -> int:
+        with self.io_lock:
+            fd = self._fileno()
+            os.lseek(fd, 0, os.SEEK_SET)
+            raw = os.read(fd, self.VERSION_WIDTH)
+        try:
+            return int(raw)
+        except ValueError:
+            return 0
+    
+    def bump_version(self) -> int:
+        """Incrementa o contador (chamar com o lock adquirido)"""
+        version = self.read_version() + 1
+        with self.io_lock:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.write(self.fd, str(version).zfill(self.VERSION_WIDTH).encode())
+        return version
+    
+    def close(self):
+        """Fecha o descritor (o lock não pode estar retido); um novo uso reabre o arquivo"""
+        with self.io_lock:
+            if self.fd is not None and self.pid == os.getpid():
+                os.close(self.fd)
+            self.fd = self.pid = None
+            self.depth = 0
+
+
+def reader(method):
+    """Método de leitura do tracker: recarrega se outro processo gravou e lê sob lock compartilhado"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.lock.held():
+            self.sync()
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writer(method):
+    """Método de escrita do tracker: lock exclusivo na thread e no arquivo, sobre dados atualizados"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.ensure_loaded()
+        with self.lock.write(), self.process_lock:
+            self._reload_if_changed()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# ==================== CÂMBIO ====================
+
+class RateHistory:
+    """Histórico de taxas por par de moedas, indexado por dia (busca com bisect)
+    
+    Em memória cada par ocupa dois arrays compactos (dias ordinais e taxas);
+    em disco é um JSON {"EUR_BRL": {"days": [...], "rates": [...]}}.
+    """
+    
+    def __init__(self, history_file: str = None):
+        self.history_file = history_file
+        self.series = {}   # "EUR_BRL" -> (array de dias ordinais, array de taxas)
+        self.lock = threading.Lock()
+        if history_file and os.path.exists(history_file):
+            self.load(history_file)
+    
+    def load(self, path: str):
+        """Carrega um arquivo de histórico (também usado com fixtures offline)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        with self.lock:
+            for key, series in raw.items():
+                pairs = sorted(zip((date_ordinal(day) for day in series["days"]), series["rates"]))
+                self.series[key] = (array('q', (day for day, _ in pairs)), array('d', (rate for _, rate in pairs)))
+    
+    def save(self, path: str = None):
+        path = path or self.history_file
+        with self.lock:
+            raw = {key: {"days": [date.fromordinal(day).isoformat() for day in days], "rates": list(rates)}
+                   for key, (days, rates) in self.series.items()}
+        with atomic_file(path, 'w', encoding='utf-8') as f:
+            json.dump(raw, f)
+    
+    def record(self, key: str, day: Any, rate: float):
+        """Registra (ou substitui) a taxa de um dia"""
+        ordinal = day if isinstance(day, int) else date_ordinal(day)
+        with self.lock:
+            days, rates = self.series.setdefault(key, (array('q'), array('d')))
+            position = bisect_left(days, ordinal)
+            if position < len(days) and days[position] == ordinal:
+                rates[position] = rate
+            else:
+                days.insert(position, ordinal)
+                rates.insert(position, rate)
+    
+    def rate_on(self, key: str, day: Any) -> Optional[float]:
+        """Última taxa conhecida até o dia (a mais antiga, para dias anteriores ao histórico)"""
+        ordinal = day if isinstance(day, int) else date_ordinal(day)
+        with self.lock:
+            days, rates = self.series.get(key, ((), ()))
+            if not days:
+                return None
+            return rates[max(bisect_right(days, ordinal) - 1, 0)]
+    
+    def convert(self, key: str, amounts: List[float], ordinals: List[int]) -> List[float]:
+        """Converte um conjunto inteiro de valores, cada um pela taxa do próprio dia
+        
+        Com NumPy a busca é um único searchsorted vetorizado; sem ele, bisect por item.
+        """
+        with self.lock:
+            days, rates = self.series.get(key, ((), ()))
+            if not days:
+                return None
+            np = optional_numpy()
+            if np is not None:
+                day_array = np.frombuffer(days, dtype=np.int64)
+                rate_array = np.frombuffer(rates, dtype=np.float64)
+                positions = np.maximum(np.searchsorted(day_array, np.asarray(ordinals, dtype=np.int64),
+                                                       side='right') - 1, 0)
+                return (np.asarray(amounts, dtype=np.float64) * rate_array[positions]).tolist()
+            return [amount * rates[max(bisect_right(days, ordinal) - 1, 0)]
+                    for amount, ordinal in zip(amounts, ordinals)]
+
+
+# Histórico compartilhado; EXCHANGE_RATE_HISTORY permite apontar para uma fixture
+rate_history = RateHistory(os.environ.get('EXCHANGE_RATE_HISTORY', 'exchange_rate_history.json'))
+
+
+class ExchangeRateProvider:
+    """Fonte única de taxas de câmbio para o tracker e o conversor
+    
+    Cache em memória com TTL, renovação em segundo plano (stale-while-revalidate)
+    e no máximo uma busca em andamento por moeda base (single-flight): quem pede
+    uma taxa nunca espera pela rede.
+    """
+    
+    # Taxas usadas enquanto nenhuma cotação real foi obtida
+    FALLBACK_RATES = {
+        "EUR_BRL": {"rate": 6.15, "commercial_rate": 5.76},
+        "USD_BRL": {"rate": 5.45, "commercial_rate": 5.10},
+        "BRL_EUR": {"rate": 0.163, "commercial_rate": 0.152},
+        "BRL_USD": {"rate": 0.184, "commercial_rate": 0.172},
+        "EUR_USD": {"rate": 1.12, "commercial_rate": 1.10},
+        "USD_EUR": {"rate": 0.89, "commercial_rate": 0.87}
+    }
+    
+    def __init__(self, ttl: timedelta = timedelta(hours=1), timeout: float = 5,
+                 cache_dir: str = ".", background: bool = True, history: RateHistory = None):
+        self.base_url = "https://api.exchangerate-api.com/v4/latest"
+        self.history = history
+        self.ttl = ttl
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.background = background
+        self.rates = {}          # "EUR_BRL" -> {"rate", "timestamp", "source"}
+        self.pairs = set()       # pares já solicitados (mantidos aquecidos)
+        self.inflight = set()    # moedas base com busca em andamento
+        self.disk_checked = set()
+        self.lock = threading.Lock()
+        self.refresher = None
+    
+    def _cache_file(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"exchange_rate_{key}.json")
+    
+    def _load_disk_cache(self, key: str) -> Optional[Dict]:
+        """Aquece o cache em memória com o arquivo exchange_rate_<par>.json (uma vez por par)"""
+        self.disk_checked.add(key)
+        try:
+            with open(self._cache_file(key), 'r') as f:
+                cache_data = json.load(f)
+            quote = {
+                "rate": cache_data['rate'],
+                "timestamp": datetime.fromisoformat(cache_data['timestamp']),
+                "source": "live_api"
+            }
+        except (OSError, ValueError, KeyError):
+            return None
+        with self.lock:
+            self.rates.setdefault(key, quote)
+            return self.rates[key]
+    
+    def get_rate(self, from_currency: str, to_currency: str) -> Optional[Dict]:
+        """Cotação atual (possivelmente antiga) sem bloquear; agenda a renovação se expirada"""
+        key = f"{from_currency}_{to_currency}"
+        with self.lock:
+            self.pairs.add(key)
+            quote = self.rates.get(key)
+        if quote is None and key not in self.disk_checked:
+            quote = self._load_disk_cache(key)
+        
+        if quote is None or datetime.now() - quote["timestamp"] >= self.ttl:
+            self.refresh_async(from_currency)
+        self._ensure_refresher()
+        
+        if quote is None and key in self.FALLBACK_RATES:
+            quote = dict(self.FALLBACK_RATES[key], timestamp=datetime.now(), source="fallback")
+        return quote
+    
+    def refresh(self, base_currency: str) -> bool:
+        """Busca na API todas as taxas de uma moeda base (bloqueante)"""
+        started = time.perf_counter()
+        try:
+            response = requests.get(f"{self.base_url}/{base_currency}", timeout=self.timeout)
+            response.raise_for_status()
+            rates = response.json()["rates"]
+        except Exception as e:
+            logger.warning("⚠️ Erro ao obter taxa de câmbio: %s", e)
+            return False
+        finally:
+            metrics.observe("expense_operation_duration_seconds", time.perf_counter() - started,
+                            operation="exchange_rate_fetch")
+        
+        now = datetime.now()
+        with self.lock:
+            for currency, rate in rates.items():
+                self.rates[f"{base_currency}_{currency}"] = {"rate": rate, "timestamp": now, "source": "live_api"}
+            persisted = [key for key in self.pairs if key.startswith(f"{base_currency}_") and key in self.rates]
+        
+        # Mantém o cache em disco para aquecer o próximo processo
+        for key in persisted:
+            try:
+                with open(self._cache_file(key), 'w') as f:
+                    json.dump({'rate': self.rates[key]["rate"], 'timestamp': now.isoformat()}, f)
+            except OSError:
+                pass
+        
+        # Cada cotação obtida vira a taxa do dia no histórico
+        if self.history is not None and persisted:
+            for key in persisted:
+                self.history.record(key, now.date().toordinal(), self.rates[key]["rate"])
+            try:
+                self.history.save()
+            except (OSError, TypeError):
+                pass
+        return True
+    
+    def refresh_async(self, base_currency: str):
+        """Renova em segundo plano, ignorando pedidos enquanto já houver busca para a mesma base"""
+        with self.lock:
+            if base_currency in self.inflight:
+                return
+            self.inflight.add(base_currency)
+        
+        def worker():
+            try:
+                self.refresh(base_currency)
+            finally:
+                with self.lock:
+                    self.inflight.discard(base_currency)
+        
+        threading.Thread(target=worker, name=f"exchange-rate-{base_currency}", daemon=True).start()
+    
+    def _ensure_refresher(self):
+        """Inicia (uma vez) a thread que renova os pares usados antes de expirarem"""
+        if not self.background or self.refresher is not None:
+            return
+        with self.lock:
+            if self.refresher is not None:
+                return
+            self.refresher = threading.Thread(target=self._refresh_loop, name="exchange-rate-refresher",
+                                              daemon=True)
+        self.refresher.start()
+    
+    def _refresh_loop(self):
+        interval = self.ttl.total_seconds() / 2
+        while True:
+            time.sleep(interval)
+            with self.lock:
+                bases = {key.split("_")[0] for key in self.pairs}
+            for base_currency in bases:
+                self.refresh_async(base_currency)
+
+
+# Compartilhado por ExpenseTracker e CurrencyConverter
+exchange_rates = ExchangeRateProvider(history=rate_history)
+
+
+# ==================== CLASSIFICAÇÃO ====================
+
+# Padrões para extração de valor, em ordem de prioridade
+MONEY_PATTERNS = [re.compile(pattern) for pattern in (
+    r'€(\d+(?:[.,]\d{1,2})?)',
+    r'\$(\d+(?:[.,]\d{1,2})?)',
+    r'(\d+(?:[.,]\d{1,2})?)€',
+    r'(\d+(?:[.,]\d{1,2})?)(?:\s*euros?)',
+    r'(\d+(?:[.,]\d{1,2})?)(?:\s*reais?)',
+    r'r\$\s*(\d+(?:[.,]\d{1,2})?)',
+    r'(\d+(?:[.,]\d{1,2})?)\s*(?:eur|usd|brl)'
+)]
+
+# Palavras-chave por categoria (a ordem define o desempate)
+CATEGORY_KEYWORDS = {
+    "alimentação": [
+        "café", "restaurante", "comida", "pizza", "burger", "mercado", 
+        "supermercado", "padaria", "lanchonete", "delivery", "ifood",
+        "mcdonalds", "kfc", "subway", "starbucks", "açaí", "sorvete",
+        "jantar", "almoço", "café da manhã", "lanche", "bebida", "bar",
+        "cerveja", "vinho", "água", "refrigerante", "suco", "chocolate"
+    ],
+    "transporte": [
+        "uber", "taxi", "metro", "bus", "ônibus", "trem", "avião", 
+        "passagem", "combustível", "gasolina", "estacionamento",
+        "pedágio", "viagem", "bilhete", "cartão transporte", "99",
+        "cabify", "blablacar", "ryanair", "tap", "latam", "azul"
+    ],
+    "lazer": [
+        "cinema", "bar", "festa", "show", "museu", "teatro", "parque",
+        "netflix", "spotify", "jogo", "game", "diversão", "balada",
+        "praia", "turismo", "passeio", "ingresso", "evento", "concert",
+        "festival", "clube", "academia", "gym", "esporte"
+    ],
+    "moradia": [
+        "aluguel", "rent", "casa", "apartamento", "hotel", "hostel",
+        "condomínio", "água", "luz", "energia", "gás", "internet",
+        "wifi", "limpeza", "manutenção", "móveis", "airbnb", "booking"
+    ]
+}
+
+
+class KeywordClassifier:
+    """Autômato Aho-Corasick que pontua todas as categorias em uma única passada
+    
+    Mesma pontuação da versão anterior: +2 por palavra-chave contida no texto
+    e +5 quando ela aparece como palavra exata (delimitada por espaços).
+    """
+    
+    CONTAINS_SCORE = 2
+    EXACT_SCORE = 5
+    
+    def __init__(self, category_keywords: Dict[str, List[str]]):
+        self.categories = list(category_keywords)
+        self.keywords = []
+        # Cada palavra-chave pontua para as categorias que a listam (ex.: "bar", "água")
+        self.keyword_categories = []
+        keyword_ids = {}
+        for index, keywords in enumerate(category_keywords.values()):
+            for keyword in keywords:
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self.keyword_categories.append([])
+                self.keyword_categories[keyword_ids[keyword]].append(index)
+        self._build()
+    
+    def _build(self):
+        """Monta a trie com links de falha e saídas acumuladas"""
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for keyword_id, keyword in enumerate(self.keywords):
+            node = 0
+            for char in keyword:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.outputs[node].append((keyword_id, len(keyword)))
+        
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+    
+    def scores(self, text: str) -> List[int]:
+        """Pontuação por categoria (na ordem de self.categories) para um texto em minúsculas"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = {}
+        node = 0
+        last = len(text) - 1
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword_id, length in outputs[node]:
+                start = position - length + 1
+                exact = ((start == 0 or text[start - 1] == ' ') and
+                         (position == last or text[position + 1] == ' '))
+                found[keyword_id] = found.get(keyword_id, False) or exact
+        
+        category_scores = [0] * len(self.categories)
+        for keyword_id, exact in found.items():
+            score = self.CONTAINS_SCORE + (self.EXACT_SCORE if exact else 0)
+            for index in self.keyword_categories[keyword_id]:
+                category_scores[index] += score
+        return category_scores
+    
+    def classify(self, text: str) -> str:
+        """Categoria com maior pontuação ou "outros" se nenhuma palavra-chave aparecer"""
+        category_scores = self.scores(text)
+        best = max(category_scores)
+        return self.categories[category_scores.index(best)] if best > 0 else "outros"
+
+
+def extract_amount(text: str) -> float:
+    """Primeiro valor monetário encontrado, seguindo a prioridade de MONEY_PATTERNS"""
+    for pattern in MONEY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1).replace(',', '.'))
+    return 0.0
+
+
+# Construído uma única vez e compartilhado por todas as classificações
+DESCRIPTION_CLASSIFIER = KeywordClassifier(CATEGORY_KEYWORDS)
+
+
+# Gramática dos comandos de voz: [verbo [de]] [€|r$] valor [euros|reais] descrição
+VOICE_COMMAND = re.compile(
+    r'(?:(?P<verb>gravar|paguei|gastei|comprei|adicionar|gasto|registrar|anotar|despesa)\s+(?:de\s+)?)?'
+    r'(?:(?P<symbol>€|r\$)\s*)?'
+    r'(?P<amount>\d+(?:[.,]\d{1,2})?)'
+    r'(?:\s+(?P<currency>euros?|reais?))?'
+    r'\s+(?P<description>.+)'
+)
+
+# Símbolos e palavras de moeda reconhecidos na fala
+VOICE_CURRENCIES = {"€": "EUR", "euro": "EUR", "euros": "EUR", "r$": "BRL", "reai": "BRL", "reais": "BRL"}
+
+
+def parse_voice_command(command: str) -> Optional[Dict]:
+    """Interpreta um comando de voz (já em minúsculas) em uma única passada da gramática"""
+    match = VOICE_COMMAND.search(command)
+    if not match:
+        return None
+    
+    amount = float(match.group("amount").replace(',', '.'))
+    description = match.group("description").strip()
+    currency_word = match.group("currency")
+    if currency_word and len(description) < 2:
+        # "gravar 15 euros x": a palavra da moeda volta a fazer parte da descrição
+        description = command[match.end("amount"):].strip()
+        currency_word = None
+    
+    currency_token = currency_word or match.group("symbol")
+    return {
+        "amount": amount,
+        "description": description,
+        "currency": VOICE_CURRENCIES.get(currency_token),
+        "rule": " + ".join(part for part, present in (
+            (match.group("verb") or "", match.group("verb")),
+            ("símbolo", match.group("symbol")),
+            ("valor", True),
+            ("moeda", currency_word),
+            ("descrição", True)
+        ) if present)
+    }
+
+
+# ==================== GRÁFICOS ====================
+
+# Cores mais bonitas
+CHART_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8']
+
+# Renderizações simultâneas limitadas; matplotlib é pesado em CPU e memória
+CHART_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get('CHART_WORKERS', 2)),
+                                thread_name_prefix='chart')
+
+
+def render_pie_png(categories: List[str], amounts: List[float], title: str) -> str:
+    """Renderiza a pizza em PNG com a API orientada a objetos (sem o estado global do pyplot)"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    figure = Figure(figsize=(12, 8))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    wedges, texts, autotexts = axes.pie(amounts, labels=categories, autopct='%1.1f%%',
+                                        colors=CHART_COLORS, startangle=90, shadow=True)
+    
+    # Melhora a aparência
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+    
+    axes.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    axes.axis('equal')
+    
+    # Converte para base64
+    img_buffer = io.BytesIO()
+    figure.savefig(img_buffer, format='png', bbox_inches='tight', dpi=150)
+    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
+    return f"data:image/png;base64,{img_base64}"
+
+
+def render_pie_svg(categories: List[str], amounts: List[float], title: str) -> str:
+    """Renderiza a pizza como SVG puro (não depende de matplotlib)"""
+    width, height, radius = 480, 400, 140
+    cx, cy = 160, 220
+    total = sum(amounts)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif">',
+        f'<text x="{width / 2}" y="32" text-anchor="middle" font-size="18" '
+        f'font-weight="bold">{html_escape(title)}</text>'
+    ]
+    
+    # Fatias no sentido horário a partir do topo, como startangle=90 no PNG
+    angle = -math.pi / 2
+    for i, (category, amount) in enumerate(zip(categories, amounts)):
+        color = CHART_COLORS[i % len(CHART_COLORS)]
+        fraction = amount / total if total else 0
+        if fraction >= 1:
+            parts.append(f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="{color}"/>')
+        elif fraction > 0:
+            end = angle + fraction * 2 * math.pi
+            x1, y1 = cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+            x2, y2 = cx + radius * math.cos(end), cy + radius * math.sin(end)
+            large_arc = 1 if fraction > 0.5 else 0
+            parts.append(f'<path d="M{cx},{cy} L{x1:.2f},{y1:.2f} A{radius},{radius} 0 {large_arc},1 '
+                         f'{x2:.2f},{y2:.2f} Z" fill="{color}" stroke="white" stroke-width="2"/>')
+            angle = end
+        
+        # Legenda
+        y = 80 + i * 24
+        parts.append(f'<rect x="320" y="{y - 12}" width="14" height="14" fill="{color}"/>')
+        parts.append(f'<text x="340" y="{y}" font-size="13">{html_escape(str(category))} '
+                     f'({fraction * 100:.1f}%)</text>')
+    
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def svg_data_uri(svg: str) -> str:
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode('utf-8')).decode()
+
 
 class ExpenseTracker:
     """Classe principal com reconhecimento de voz melhorado"""
     
-    def __init__(self, data_file="expense_data_final.json"):
+    # Quando as mutações chegam ao disco: antes de responder ("immediate"), em grupo a cada
+    # flush_interval_ms ("grouped") ou só em flush()/save_data()/saída do processo ("shutdown").
+    # Com mutações pendentes o processo retém o lock de escrita entre processos: em "shutdown"
+    # os outros workers só gravam depois que ele sair (use com um único processo)
+    DURABILITY_MODES = ("immediate", "grouped", "shutdown")
+    
+    def __init__(self, data_file="expense_data_final.json", storage_mode: str = None,
+                 rate_provider: ExchangeRateProvider = None, history: RateHistory = None,
+                 preload: str = "eager", analytics: str = None, durability: str = None,
+                 flush_interval_ms: int = None):
         self.data_file = data_file
-        self.data = self.load_data()
+        self.rate_provider = rate_provider or exchange_rates
+        self.rate_history = history or rate_history
+        # "json" reescreve o arquivo inteiro, "journal" só acrescenta mutações, "sqlite" usa banco
+        # indexado, "binary" usa snapshot colunar mapeado em memória + journal, "partitioned"
+        # usa um arquivo por ano com só o ano corrente sempre em memória
+        self.storage_mode = (storage_mode or os.environ.get('STORAGE_MODE', 'json')).lower()
+        self.storage = create_storage(self.storage_mode, data_file)
+        # Dados e índices são carregados em ensure_loaded(): já ("eager"), em segundo plano
+        # ("background") ou no primeiro acesso ("lazy")
+        self._data = None
+        # "numpy" agrega pela visão colunar quando o NumPy está instalado; "python" sempre varre
+        self.analytics = (analytics or os.environ.get('ANALYTICS_ENGINE', 'numpy')).lower()
+        self._columns = None
+        self._columns_lock = threading.Lock()
+        self._search_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self.startup = {}
+        # Leitores em paralelo, um escritor por vez; entre processos, flock + versão no arquivo .lock
+        self.lock = RWLock()
+        self.process_lock = ProcessLock(f"{data_file}.lock")
+        self._seen_version = None
+        self.durability = (durability or os.environ.get('DURABILITY', 'immediate')).lower()
+        if self.durability not in self.DURABILITY_MODES:
+            raise ValueError(f"Modo de durabilidade desconhecido: {self.durability}")
+        if flush_interval_ms is None:
+            flush_interval_ms = int(os.environ.get('FLUSH_INTERVAL_MS', 50))
+        self.flush_interval = flush_interval_ms / 1000
+        # Mutações já aplicadas em memória aguardando o flush: (op, payload, timestamp)
+        self._pending = []
+        self._flush_lock = threading.Lock()
+        if self.durability != "immediate":
+            atexit.register(self.flush)
+        # Incrementada a cada mutação; invalida caches derivados dos dados
+        self.version = 0
+        self.chart_cache = OrderedDict()
+        self.chart_lock = threading.Lock()
         self.categories = ["alimentação", "transporte", "lazer", "moradia", "outros"]
         
-    def load_data(self) -> Dict:
-        """Carrega dados do arquivo JSON"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
+        self.start_loading(preload)
+    
+    def start_loading(self, preload: str):
+        """"eager" carrega agora, "background" em uma thread e "lazy" só no primeiro acesso"""
+        if preload == "eager":
+            self.ensure_loaded()
+        elif preload == "background":
+            threading.Thread(target=self.ensure_loaded, name="tracker-load", daemon=True).start()
+        elif preload != "lazy":
+            raise ValueError(f"Modo de carga desconhecido: {preload}")
+    
+    def ensure_loaded(self):
+        """Carrega os dados e constrói os índices uma única vez (bloqueia até terminar)"""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if self._loaded.is_set():
+                return
+            started = time.perf_counter()
+            # Lida antes dos dados: no pior caso o próximo sync recarrega à toa
+            self._seen_version = self.process_lock.read_version()
+            data, indexes = self._load_fresh()
+            loaded = time.perf_counter()
+            self._set_data(data, indexes)
+            self.startup["load_data_ms"] = round((loaded - started) * 1000, 1)
+            self.startup["build_indexes_ms"] = round((time.perf_counter() - loaded) * 1000, 1)
+            self._loaded.set()
+    
+    def _load_fresh(self) -> Tuple[Dict, Optional[Tuple]]:
+        """Carrega do backend e corrige IDs legados, persistindo a correção
+        
+        Retorna também os índices que o backend já traz prontos (snapshot binário,
+        só quando os IDs já são únicos), ou None.
+        """
+        data = self.load_data()
+        indexes = self.storage.take_indexes(data)
+        if indexes is not None:
+            # IDs já conferidos ao gravar o snapshot: só garante o contador
+            data["metadata"]["next_id"] = max(data["metadata"].get("next_id", 1),
+                                              max(indexes[0].positions, default=0) + 1)
+        elif assign_ids(data):
+            with self.process_lock:
+                self.storage.save(data)
+                self._seen_version = self.process_lock.bump_version()
+        return data, indexes
+    
+    def _set_data(self, data: Dict, indexes: Tuple = None):
+        if indexes is None:
+            compact_transactions(data["transactions"])
+            indexes = (IdIndex(data["transactions"]), TimeIndex(data["transactions"]),
+                       Rollups(data["transactions"]))
+        # A visão colunar é reconstruída sob demanda
+        self._columns = None
+        self._ids, self._time_index, self._rollups = indexes
+        self.storage.bind_indexes(data, indexes)
+        # As transações em memória como partição (a quente, no modo particionado)
+        self._resident = self.storage.hot if self.storage.partitioned else Partition(None, data, *indexes[:2])
+        self._data = data
+    
+    def _reload_if_changed(self) -> bool:
+        """Recarrega do disco se outro processo gravou (chamar com os locks de escrita)"""
+        current = self.process_lock.read_version()
+        if current == self._seen_version:
+            return False
+        self._seen_version = current
+        self._set_data(*self._load_fresh())
+        self.version += 1
+        return True
+    
+    def sync(self) -> bool:
+        """Detecta gravações de outros processos e recarrega (só uma leitura do contador se nada mudou)"""
+        if not self.is_loaded or self.process_lock.read_version() == self._seen_version:
+            return False
+        with self.lock.write(), self.process_lock:
+            return self._reload_if_changed()
+    
+    @property
+    def data_version(self) -> Optional[int]:
+        """Versão dos dados compartilhada entre processos (contador do arquivo .lock)
         
+        Avança a cada gravação, em qualquer worker; dois workers na mesma versão e sem
+        mutações pendentes têm os mesmos dados, então ela identifica as respostas HTTP (ETag).
+        """
+        return self._seen_version
+    
+    @property
+    def pending_mutations(self) -> int:
+        """Mutações aplicadas em memória que ainda não foram gravadas"""
+        return len(self._pending)
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded.is_set()
+    
+    @property
+    def data(self) -> Dict:
+        self.ensure_loaded()
+        return self._data
+    
+    @property
+    def ids(self) -> IdIndex:
+        self.ensure_loaded()
+        return self._ids
+    
+    @property
+    def columns(self) -> Optional[ColumnarView]:
+        """Visão colunar para agregações (None sem NumPy ou com analytics="python")"""
+        if self._columns is None and self.analytics == "numpy":
+            np = optional_numpy()
+            if np is not None:
+                with self._columns_lock:
+                    if self._columns is None:
+                        self._columns = ColumnarView(np, self.data["transactions"])
+        return self._columns
+    
+    @property
+    def time_index(self) -> TimeIndex:
+        self.ensure_loaded()
+        return self._time_index
+    
+    @property
+    def rollups(self) -> Rollups:
+        self.ensure_loaded()
+        return self._rollups
+    
+    @staticmethod
+    def empty_data() -> Dict:
+        """Estrutura inicial de dados"""
         return {
             "transactions": [],
             "trips": {},
@@ -52,62 +3139,416 @@ class ExpenseTracker:
                 "total_sessions": 0
             }
         }
+        
+    @metrics.timed("load_data")
+    def load_data(self) -> Dict:
+        """Carrega dados do backend de armazenamento"""
+        return self.storage.load(self.empty_data())
     
+    @writer
+    @metrics.timed("save_data")
     def save_data(self):
-        """Salva dados no arquivo JSON"""
+        """Salva o snapshot completo dos dados"""
+        self.data["metadata"]["last_updated"] = datetime.now().isoformat()
+        self.version += 1
+        self.storage.save(self.data)
+        self._seen_version = self.process_lock.bump_version()
+        # O snapshot já inclui as mutações pendentes
+        if self._pending:
+            self._pending = []
+            self.process_lock.__exit__(None, None, None)
+    
+    @writer
+    def compact(self):
+        """Compacta o armazenamento (incorpora o journal ao snapshot)"""
+        self._flush_pending()
+        self.storage.compact(self.data)
+    
+    def flush(self):
+        """Barreira: ao retornar, toda mutação feita antes da chamada está no disco"""
+        if self.is_loaded:
+            with self.lock.read():
+                self._flush_pending()
+    
+    def close(self):
+        """Grava as mutações pendentes e libera arquivos e conexões (o tracker não deve mais ser usado)"""
+        self.flush()
+        if self.durability != "immediate":
+            atexit.unregister(self.flush)
+        self.storage.close()
+        self.process_lock.close()
+    
+    def _defer(self, op: str, payload: Dict, ts: str):
+        """Enfileira a mutação para o próximo flush (chamar de um método @writer)"""
+        if not self._pending:
+            # Até o flush o lock entre processos fica retido: nenhum outro worker grava
+            # sobre um arquivo que ainda não tem estas mutações
+            self.process_lock.__enter__()
+            self._schedule_flush()
+        self._pending.append((op, payload, ts))
+    
+    def _schedule_flush(self):
+        if self.durability == "grouped":
+            timer = threading.Timer(self.flush_interval, self.flush)
+            timer.daemon = True
+            timer.start()
+    
+    def _flush_pending(self):
+        """Grava as mutações pendentes em um único commit (chamar sob lock de leitura ou escrita)"""
+        with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            started = time.perf_counter()
+            try:
+                self.storage.commit_many(self.data, batch)
+            except Exception:
+                logger.exception("❌ Falha ao gravar %d mutações pendentes", len(batch))
+                self._pending = batch
+                self._schedule_flush()
+                raise
+            metrics.observe("expense_operation_duration_seconds", time.perf_counter() - started, operation="flush")
+            metrics.inc("expense_flushed_mutations_total", len(batch))
+            self._seen_version = self.process_lock.bump_version()
+            self.process_lock.__exit__(None, None, None)
+    
+    def _commit(self, op: str, **payload) -> Any:
+        """Aplica a mutação em memória e a persiste no backend (chamar de um método @writer)"""
+        result = self._apply(op, payload)
+        self.version += 1
         self.data["metadata"]["last_updated"] = datetime.now().isoformat()
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        if self.durability != "immediate":
+            self._defer(op, payload, self.data["metadata"]["last_updated"])
+            return result
+        started = time.perf_counter()
+        self.storage.commit(self.data, op, payload)
+        metrics.observe("expense_operation_duration_seconds", time.perf_counter() - started, operation="commit")
+        self._seen_version = self.process_lock.bump_version()
+        return result
+    
+    def _apply(self, op: str, payload: Dict) -> Any:
+        """Aplica a mutação aos dados e índices em memória"""
+        if self.storage.partitioned:
+            return self._apply_partitioned(op, payload)
+        return self._apply_to(self._resident, op, payload)
+    
+    def _apply_to(self, partition: Partition, op: str, payload: Dict) -> Any:
+        """Aplica a mutação a uma partição (os rollups são os globais)"""
+        result, detached, position = apply_indexed_mutation(partition.data, op, payload, partition.ids,
+                                                            partition.time_index, self.rollups)
+        partition.dirty = True
+        if partition.search is not None:
+            partition.search.apply(op, result)
+        # A visão colunar cobre só as transações residentes
+        if partition is self._resident:
+            self._update_columns(op, result, detached, position)
+        return result
+    
+    def _apply_partitioned(self, op: str, payload: Dict) -> Any:
+        """Encaminha a mutação para a partição do ano de cada transação"""
+        storage = self.storage
+        if op == "add_transaction":
+            return self._apply_to(storage.partition_of(payload["transaction"]), op, payload)
+        if op == "add_transactions":
+            groups = defaultdict(list)
+            for transaction in payload["transactions"]:
+                groups[partition_year(transaction)].append(transaction)
+            added = {}
+            for year, transactions in groups.items():
+                for transaction in self._apply_to(storage.partition(year), op, {"transactions": transactions}):
+                    added[transaction["id"]] = transaction
+            return [added[transaction["id"]] for transaction in payload["transactions"]]
+        if op == "put_transaction":
+            transaction = payload["transaction"]
+            current = self._find_partition(transaction["id"])
+            target = storage.partition_of(transaction)
+            if current is target:
+                return self._apply_to(current, op, payload)
+            # A data mudou de ano: sai da partição antiga e entra na nova
+            self._apply_to(current, "delete_transaction", {"id": transaction["id"]})
+            return self._apply_to(target, "add_transaction", {"transaction": transaction})
+        if op == "delete_transaction":
+            return self._apply_to(self._find_partition(payload["id"]) or storage.hot, op, payload)
+        if op == "delete_trip":
+            trip_id = payload["trip_id"]
+            deleted_trip, count = self._apply_to(storage.hot, op, payload)
+            for year in storage.years_with_trip(trip_id):
+                if year != storage.hot_year:
+                    count += self._detach_trip(storage.partition(year), trip_id)
+            return deleted_trip, count
+        return self._apply_to(storage.hot, op, payload)
+    
+    def _detach_trip(self, partition: Partition, trip_id: str) -> int:
+        """Desassocia de uma partição fria as transações de uma viagem já removida"""
+        related = partition.ids.trip_transactions(trip_id)
+        for transaction in related:
+            self.rollups.remove(transaction)
+            transaction.pop('trip_id', None)
+            self.rollups.add(transaction)
+        partition.ids.by_trip.pop(trip_id, None)
+        partition.dirty = True
+        return len(related)
+    
+    def _find_partition(self, transaction_id: int) -> Optional[Partition]:
+        """Partição com o ID: a quente primeiro, depois os anos cuja faixa de IDs o inclui"""
+        if self.ids.get(transaction_id) is not None:
+            return self.storage.hot
+        for year in self.storage.years_with_id(transaction_id):
+            partition = self.storage.partition(year)
+            if partition.ids.get(transaction_id) is not None:
+                return partition
+        return None
+    
+    def _lookup(self, transaction_id: int) -> Optional[Dict]:
+        """Transação pelo ID, em qualquer partição"""
+        if not self.storage.partitioned:
+            return self.ids.get(transaction_id)
+        partition = self._find_partition(transaction_id)
+        return partition.ids.get(transaction_id) if partition else None
+    
+    def _partitions(self, start: int = None, end: int = None, trip_id: str = None) -> Iterator[Partition]:
+        """Partições que podem ter transações do período/viagem, em ordem de ano (carregadas sob demanda)"""
+        if not self.storage.partitioned:
+            self.ensure_loaded()
+            yield self._resident
+            return
+        years = self.storage.years(start, end)
+        if trip_id:
+            years = sorted(set(years) & set(self.storage.years_with_trip(trip_id)))
+        for year in years:
+            yield self.storage.partition(year)
+    
+    def _update_columns(self, op: str, result: Any, detached: List[Dict], position: Optional[int]):
+        """Atualiza a visão colunar (se já construída) na mesma ordem da lista"""
+        columns = self._columns
+        if columns is None:
+            return
+        if op == "add_transaction":
+            columns.extend([result])
+        elif op == "add_transactions":
+            columns.extend(result)
+        elif op == "put_transaction":
+            columns.write(position, result)
+        elif op == "delete_transaction":
+            columns.remove(position)
+        elif op == "delete_trip":
+            for transaction in detached:
+                columns.write(self.ids.positions[transaction["id"]], transaction)
+    
+    @reader
+    def list_transactions(self) -> List[Dict]:
+        """Cópia das transações (segura para serializar fora do lock) na ordem (dia, id) do cursor
+        
+        A lista interna não segue a ordem de inserção (IdIndex.remove); a ordem do índice
+        temporal é estável e é a mesma de page_transactions.
+        """
+        return self._all_transactions()
+    
+    def _all_transactions(self) -> List[Dict]:
+        return [transaction for partition in self._partitions() for transaction in partition.time_index.items]
+    
+    @reader
+    def list_trips(self) -> Dict:
+        return dict(self.data["trips"])
+    
+    @reader
+    def check_rollups(self) -> List[str]:
+        """Recalcula os rollups a partir das transações e devolve as divergências"""
+        return self.rollups.diff(Rollups(self.list_transactions()))
+    
+    @property
+    def transaction_count(self) -> int:
+        """Total de transações (pelos rollups, sem carregar partições frias)"""
+        return sum(count for _, count in list(self.rollups.by_type.values()))
+    
+    def _queries_in_storage(self) -> bool:
+        """Consultas vão ao backend (SQL) só sem mutações pendentes: ele ainda não as tem
+        
+        Com mutações pendentes os índices em memória respondem, como nos outros backends.
+        """
+        return self.storage.supports_queries and not self._pending
+    
+    @reader
+    def query_transactions(self, year: int = None, month: int = None, date_from: str = None,
+                           date_to: str = None, trip_id: str = None, has_trip: bool = None,
+                           **columns) -> List[Dict]:
+        """Filtra transações por período, viagem e colunas (type, category, source...)"""
+        if self._queries_in_storage():
+            return self.storage.query_transactions(year=year, month=month, date_from=date_from,
+                                                   date_to=date_to, trip_id=trip_id,
+                                                   has_trip=has_trip, **columns)
+        
+        # Filtros de período viram uma fatia do índice temporal (bisect); sem período,
+        # o índice por viagem evita varrer todas as transações
+        start, end = date_bounds(year, month, date_from, date_to)
+        columns = {column: value for column, value in columns.items() if value is not None}
+        return [transaction for partition in self._partitions(start, end, trip_id)
+                for transaction in partition.candidates(start, end, trip_id)
+                if self._matches(transaction, trip_id, has_trip, columns)]
+    
+    @staticmethod
+    def _matches(transaction: Dict, trip_id: Optional[str], has_trip: Optional[bool], columns: Dict) -> bool:
+        """Filtros de viagem e de colunas aplicados em memória"""
+        if trip_id and transaction.get('trip_id') != trip_id:
+            return False
+        if has_trip is not None and bool(transaction.get('trip_id')) != has_trip:
+            return False
+        return all(transaction.get(column, COLUMN_DEFAULTS.get(column)) == value
+                   for column, value in columns.items())
+    
+    @reader
+    def page_transactions(self, limit: int, after: Tuple[int, int] = None, year: int = None,
+                          month: int = None, date_from: str = None, date_to: str = None,
+                          trip_id: str = None, has_trip: bool = None,
+                          **columns) -> Tuple[List[Dict], Optional[Tuple[int, int]]]:
+        """Página de transações em ordem cronológica com cursor estável (dia, id)
+        
+        Devolve a página e o cursor da próxima (None quando não há mais resultados).
+        """
+        filters = dict(year=year, month=month, date_from=date_from, date_to=date_to,
+                       trip_id=trip_id, has_trip=has_trip, **columns)
+        if self._queries_in_storage():
+            rows = self.storage.page_transactions(limit + 1, after, **filters)
+        else:
+            start, end = date_bounds(year, month, date_from, date_to)
+            if after:
+                start = after[0] if start is None else max(start, after[0])
+            columns = {column: value for column, value in columns.items() if value is not None}
+            rows = []
+            # O cursor também pula as partições de anos anteriores a ele
+            for partition in self._partitions(start, end, trip_id):
+                for day, transaction in partition.time_index.iter_range(start, end):
+                    if after and day == after[0] and order_id(transaction) <= after[1]:
+                        continue
+                    if self._matches(transaction, trip_id, has_trip, columns):
+                        rows.append((day, transaction))
+                        if len(rows) > limit:
+                            break
+                if len(rows) > limit:
+                    break
+        
+        page = [transaction for _, transaction in rows[:limit]]
+        if len(rows) <= limit:
+            return page, None
+        last_day, last = rows[limit - 1]
+        return page, (last_day, order_id(last))
+    
+    @reader
+    def aggregate_transactions(self, group_by: str = None, **filters) -> Dict[Any, Tuple[float, int]]:
+        """Soma e contagem de `amount` por grupo (None agrega tudo em uma chave None)"""
+        groups = self.rollups.aggregate(group_by, **filters)
+        if groups is not None:
+            return groups
+        if self._queries_in_storage():
+            return self.storage.aggregate_transactions(group_by, **filters)
+        if not self.storage.partitioned:
+            return self._aggregate_partition(self._resident, group_by, filters)
+        
+        # Os rollups já são globais; aqui só chegam filtros que eles não cobrem
+        start, end = date_bounds(filters.get("year"), filters.get("month"),
+                                 filters.get("date_from"), filters.get("date_to"))
+        merged = {}
+        for partition in self._partitions(start, end, filters.get("trip_id")):
+            for key, (total, count) in self._aggregate_partition(partition, group_by, filters).items():
+                previous_total, previous_count = merged.get(key, (0, 0))
+                merged[key] = (previous_total + total, previous_count + count)
+        return merged
+    
+    def _aggregate_partition(self, partition: Partition, group_by: Optional[str],
+                             filters: Dict) -> Dict[Any, Tuple[float, int]]:
+        """Agregação das transações residentes de uma partição"""
+        if partition.data is self.data:
+            columns = self.columns
+            if columns is not None:
+                return columns.aggregate(group_by, **filters)
+        
+        # Sem NumPy: candidatas pelo índice temporal, somadas na ordem da lista (como a visão colunar)
+        start, end = date_bounds(filters.get("year"), filters.get("month"),
+                                 filters.get("date_from"), filters.get("date_to"))
+        if start is None and end is None:
+            candidates = partition.transactions
+        else:
+            positions = partition.ids.positions
+            candidates = sorted(partition.time_index.range(start, end), key=lambda t: positions[t["id"]])
+        return aggregate_scan(candidates, group_by, **filters)
+    
+    @reader
+    def search_transactions(self, query: str, limit: int = 20, offset: int = 0, year: int = None,
+                            month: int = None, date_from: str = None, date_to: str = None,
+                            trip_id: str = None, has_trip: bool = None,
+                            **columns) -> Tuple[List[Tuple[float, Dict]], int]:
+        """Busca por palavras ou prefixos da descrição e da categoria, ignorando acentos
+        
+        Todas as palavras da busca precisam aparecer. Resultados em ordem de pontuação
+        e, no empate, dos mais recentes (maior ID); devolve a página de (pontuação,
+        transação) e o total de resultados.
+        """
+        terms = list(dict.fromkeys(search_tokens(query)))
+        if not terms:
+            return [], 0
+        start, end = date_bounds(year, month, date_from, date_to)
+        columns = {column: value for column, value in columns.items() if value is not None}
+        
+        total, ranked = 0, []
+        for partition in self._partitions(start, end, trip_id):
+            index = self._search_index(partition)
+            scores = index.match(terms)
+            candidates = scores.keys() & partition.ids.by_trip.get(trip_id, set()) if trip_id else scores
+            if start is not None or end is not None:
+                candidates = index.in_period(candidates, start, end)
+            if has_trip is not None or columns:
+                get = partition.ids.get
+                candidates = [transaction_id for transaction_id in candidates
+                              if self._matches(get(transaction_id), None, has_trip, columns)]
+            total += len(candidates)
+            ranked.extend((score, transaction_id, partition)
+                          for score, transaction_id in index.top(scores, candidates, offset + limit))
+        
+        page = nlargest(offset + limit, ranked, key=itemgetter(0, 1))[offset:]
+        return [(score, partition.ids.get(transaction_id)) for score, transaction_id, partition in page], total
+    
+    def _search_index(self, partition: Partition) -> SearchIndex:
+        """Índice textual da partição, construído no primeiro uso"""
+        if partition.search is None:
+            with self._search_lock:
+                if partition.search is None:
+                    started = time.perf_counter()
+                    partition.search = SearchIndex(partition.transactions)
+                    metrics.observe("expense_operation_duration_seconds", time.perf_counter() - started,
+                                    operation="build_search_index")
+        return partition.search
     
     def get_exchange_rate(self, from_currency: str = "EUR", to_currency: str = "BRL") -> float:
-        """Obtém taxa de câmbio atual"""
-        try:
-            # Cache da taxa de câmbio por 1 hora
-            cache_key = f"{from_currency}_{to_currency}"
-            cache_file = f"exchange_rate_{cache_key}.json"
-            
-            # Verificar cache
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    cache_time = datetime.fromisoformat(cache_data['timestamp'])
-                    if datetime.now() - cache_time < timedelta(hours=1):
-                        return cache_data['rate']
-            
-            # Buscar taxa atual
-            url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                rate = data['rates'].get(to_currency, 5.5)  # Fallback para 5.5
-                
-                # Salvar no cache
-                cache_data = {
-                    'rate': rate,
-                    'timestamp': datetime.now().isoformat()
-                }
-                with open(cache_file, 'w') as f:
-                    json.dump(cache_data, f)
-                
-                return rate
-            else:
-                return 5.5  # Taxa padrão
-                
-        except Exception as e:
-            print(f"⚠️ Erro ao obter taxa de câmbio: {e}")
-            return 5.5  # Taxa padrão
+        """Obtém taxa de câmbio atual (do cache compartilhado, sem esperar pela rede)"""
+        return self.rate_provider.get_rate(from_currency, to_currency)["rate"]
     
     def add_transaction(self, amount: float, transaction_type: str, category: str, 
                        description: str = "", trip_id: str = None, currency: str = None,
                        source: str = "web", custom_date: str = None) -> Dict:
         """Adiciona transação com conversão automática de moeda"""
+        # Obter taxa de câmbio atual (antes do lock de escrita: pode ler o cache em disco)
+        exchange_rate = self.get_exchange_rate("EUR", "BRL")
+        return self._add_converted(amount, transaction_type, category, description, trip_id,
+                                   currency, source, custom_date, exchange_rate)
+    
+    @writer
+    def _add_converted(self, amount: float, transaction_type: str, category: str, description: str,
+                       trip_id: Optional[str], currency: Optional[str], source: str,
+                       custom_date: Optional[str], exchange_rate: float) -> Dict:
         if currency is None:
             currency = self.data["settings"]["currency"]
         
-        # Obter taxa de câmbio atual
-        exchange_rate = self.get_exchange_rate("EUR", "BRL")
-        
+        transaction = self._build_transaction(
+            self.data["metadata"]["next_id"], amount, transaction_type, category, description,
+            trip_id, currency, source, custom_date, exchange_rate
+        )
+        return self._commit("add_transaction", transaction=transaction)
+    
+    @staticmethod
+    def _build_transaction(transaction_id: int, amount: float, transaction_type: str, category: str,
+                           description: str, trip_id: Optional[str], currency: str, source: str,
+                           custom_date: Optional[str], exchange_rate: float) -> Dict:
+        """Monta o registro da transação com os valores em EUR e BRL"""
         # Calcular valores em ambas as moedas
         if currency == "EUR":
             amount_eur = amount
@@ -119,8 +3560,8 @@ class ExpenseTracker:
         # Usar data customizada se fornecida, senão usar data atual
         transaction_date = custom_date if custom_date else datetime.now().isoformat()
             
-        transaction = {
-            "id": len(self.data["transactions"]) + 1,
+        return {
+            "id": transaction_id,
             "date": transaction_date,
             "amount": float(amount_eur),  # Manter compatibilidade (sempre EUR)
             "amount_eur": round(amount_eur, 2),
@@ -130,171 +3571,230 @@ class ExpenseTracker:
             "description": description,
             "trip_id": trip_id,
             "currency": currency,
-            "exchange_rate": exchange_rate,
-            "source": source
+            "exchange_rate": exchange_rate,
+            "source": source
+        }
+    
+    # Linhas validadas e classificadas por lote na importação
+    BULK_BATCH_SIZE = 1000
+    
+    def _validate_row(self, row: Any) -> Dict:
+        """Valida uma linha de importação e devolve os campos normalizados"""
+        if isinstance(row, Exception):
+            raise row
+        if not isinstance(row, dict):
+            raise ValueError("Cada linha deve ser um objeto")
+        if row.get("amount") in (None, ""):
+            raise ValueError("Campo 'amount' é obrigatório")
+        
+        amount = float(str(row["amount"]).replace(',', '.'))
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError(f"Valor inválido: {row['amount']}")
+        
+        transaction_type = str(row.get("type") or "despesa").lower()
+        if transaction_type not in ("despesa", "ganho"):
+            raise ValueError(f"Tipo inválido: {transaction_type}")
+        
+        currency = str(row.get("currency") or self.data["settings"]["currency"]).upper()
+        if currency not in ("EUR", "BRL"):
+            raise ValueError(f"Moeda não suportada: {currency}")
+        
+        custom_date = row.get("date") or None
+        if custom_date and not date_ordinal(custom_date):
+            raise ValueError(f"Data inválida: {custom_date}")
+        
+        trip_id = row.get("trip_id") or None
+        if trip_id and trip_id not in self.data["trips"]:
+            raise ValueError(f"Viagem não encontrada: {trip_id}")
+        
+        return {
+            "amount": amount,
+            "transaction_type": transaction_type,
+            "category": str(row.get("category") or ""),
+            "description": str(row.get("description") or ""),
+            "trip_id": trip_id,
+            "currency": currency,
+            "custom_date": custom_date
         }
-        
-        self.data["transactions"].append(transaction)
-        self.save_data()
-        return transaction
     
-    def classify_description(self, description: str) -> Tuple[str, float, str]:
-        """IA avançada para classificação automática"""
-        description = description.lower()
+    def add_transactions(self, rows: Any, source: str = "import") -> Tuple[List[Dict], List[Dict]]:
+        """Importa várias transações com uma única taxa de câmbio e um único commit
         
-        # Padrões melhorados para extração de valor
-        money_patterns = [
-            r'€(\d+(?:[.,]\d{1,2})?)',
-            r'\$(\d+(?:[.,]\d{1,2})?)',
-            r'(\d+(?:[.,]\d{1,2})?)€',
-            r'(\d+(?:[.,]\d{1,2})?)(?:\s*euros?)',
-            r'(\d+(?:[.,]\d{1,2})?)(?:\s*reais?)',
-            r'r\$\s*(\d+(?:[.,]\d{1,2})?)',
-            r'(\d+(?:[.,]\d{1,2})?)\s*(?:eur|usd|brl)'
-        ]
+        Linhas inválidas não interrompem o lote: voltam em `errors` com o número da linha.
+        As linhas (que podem vir em streaming do corpo da requisição) são lidas e validadas
+        fora do lock de escrita; ele só cobre a geração dos IDs e o commit.
+        """
+        self.ensure_loaded()
+        self.sync()
+        exchange_rate = self.get_exchange_rate("EUR", "BRL")
+        valid, errors = [], []
         
-        amount = 0.0
-        for pattern in money_patterns:
-            match = re.search(pattern, description)
-            if match:
-                amount_str = match.group(1).replace(',', '.')
-                amount = float(amount_str)
+        numbered_rows = enumerate(rows, 1)
+        while True:
+            batch = list(islice(numbered_rows, self.BULK_BATCH_SIZE))
+            if not batch:
                 break
+            
+            batch_valid = []
+            for row_number, row in batch:
+                try:
+                    batch_valid.append((row_number, self._validate_row(row)))
+                except (ValueError, TypeError) as e:
+                    errors.append({"row": row_number, "error": str(e)})
+            
+            # Classifica de uma vez as linhas que vieram sem categoria
+            unclassified = [fields for _, fields in batch_valid if not fields["category"]]
+            classifications = self.classify_descriptions([fields["description"] for fields in unclassified])
+            for fields, (category, _, _) in zip(unclassified, classifications):
+                fields["category"] = category
+            valid.extend(batch_valid)
         
-        # IA melhorada para classificação por categoria
-        category_keywords = {
-            "alimentação": [
-                "café", "restaurante", "comida", "pizza", "burger", "mercado", 
-                "supermercado", "padaria", "lanchonete", "delivery", "ifood",
-                "mcdonalds", "kfc", "subway", "starbucks", "açaí", "sorvete",
-                "jantar", "almoço", "café da manhã", "lanche", "bebida", "bar",
-                "cerveja", "vinho", "água", "refrigerante", "suco", "chocolate"
-            ],
-            "transporte": [
-                "uber", "taxi", "metro", "bus", "ônibus", "trem", "avião", 
-                "passagem", "combustível", "gasolina", "estacionamento",
-                "pedágio", "viagem", "bilhete", "cartão transporte", "99",
-                "cabify", "blablacar", "ryanair", "tap", "latam", "azul"
-            ],
-            "lazer": [
-                "cinema", "bar", "festa", "show", "museu", "teatro", "parque",
-                "netflix", "spotify", "jogo", "game", "diversão", "balada",
-                "praia", "turismo", "passeio", "ingresso", "evento", "concert",
-                "festival", "clube", "academia", "gym", "esporte"
-            ],
-            "moradia": [
-                "aluguel", "rent", "casa", "apartamento", "hotel", "hostel",
-                "condomínio", "água", "luz", "energia", "gás", "internet",
-                "wifi", "limpeza", "manutenção", "móveis", "airbnb", "booking"
-            ]
-        }
+        created = self._commit_import(valid, errors, source, exchange_rate)
+        return created, errors
+    
+    @writer
+    def _commit_import(self, valid: List[Tuple[int, Dict]], errors: List[Dict], source: str,
+                       exchange_rate: float) -> List[Dict]:
+        """Gera os IDs das linhas já validadas e as grava em um único commit"""
+        next_id = self.data["metadata"]["next_id"]
+        created = []
+        for row_number, fields in valid:
+            # A viagem pode ter sido removida enquanto as linhas eram lidas
+            if fields["trip_id"] and fields["trip_id"] not in self.data["trips"]:
+                errors.append({"row": row_number, "error": f"Viagem não encontrada: {fields['trip_id']}"})
+                continue
+            created.append(self._build_transaction(
+                next_id, fields["amount"], fields["transaction_type"], fields["category"],
+                fields["description"], fields["trip_id"], fields["currency"], source,
+                fields["custom_date"], exchange_rate
+            ))
+            next_id += 1
+        errors.sort(key=lambda error: error["row"])
+        
+        if created:
+            self._commit("add_transactions", transactions=created)
+        return created
+    
+    @writer
+    def add_raw_transaction(self, transaction: Dict) -> Dict:
+        """Acrescenta uma transação já montada (sem conversão de moeda); o ID é gerado aqui"""
+        transaction = dict(transaction, id=self.data["metadata"]["next_id"])
+        return self._commit("add_transaction", transaction=transaction)
+    
+    @writer
+    def delete_transaction(self, index: int) -> Dict:
+        """Remove a transação na posição informada (legado; prefira delete_transaction_by_id)
+        
+        A posição é a da ordem de list_transactions(), resolvida sob o mesmo lock da remoção.
+        """
+        transactions = self._all_transactions()
+        if index < 0 or index >= len(transactions):
+            raise IndexError(f"Índice inválido. Deve estar entre 0 e {len(transactions) - 1}")
+        return self._commit("delete_transaction", id=transactions[index]["id"])
+    
+    @reader
+    def get_transaction(self, transaction_id: int) -> Optional[Dict]:
+        return self._lookup(transaction_id)
+    
+    @writer
+    def delete_transaction_by_id(self, transaction_id: int) -> Optional[Dict]:
+        """Remove a transação pelo ID (None se não existir)"""
+        if self._lookup(transaction_id) is None:
+            return None
+        return self._commit("delete_transaction", id=transaction_id)
+    
+    # Campos que PATCH /api/transactions/<id> pode alterar
+    EDITABLE_FIELDS = ("amount", "currency", "type", "category", "description", "date", "trip_id")
+    
+    @writer
+    def update_transaction(self, transaction_id: int, changes: Dict) -> Optional[Dict]:
+        """Altera campos de uma transação (None se não existir)
         
-        # Algoritmo de pontuação para melhor classificação
-        category_scores = {}
-        for cat, keywords in category_keywords.items():
-            score = sum(2 if keyword in description else 0 for keyword in keywords)
-            # Bonus para palavras exatas
-            score += sum(5 for keyword in keywords if f" {keyword} " in f" {description} ")
-            category_scores[cat] = score
+        Os valores em EUR/BRL são recalculados com a taxa gravada na transação.
+        """
+        current = self._lookup(transaction_id)
+        if current is None:
+            return None
+        unknown = sorted(set(changes) - set(self.EDITABLE_FIELDS))
+        if unknown:
+            raise ValueError(f"Campos não editáveis: {', '.join(unknown)}")
         
-        # Seleciona categoria com maior pontuação
-        category = max(category_scores.items(), key=lambda x: x[1])[0] if max(category_scores.values()) > 0 else "outros"
+        currency = current.get("currency") or self.data["settings"]["currency"]
+        original_amount = current.get("amount_brl" if currency == "BRL" else "amount_eur", current.get("amount"))
+        row = {
+            "amount": original_amount,
+            "type": current.get("type"),
+            "category": current.get("category"),
+            "description": current.get("description"),
+            "trip_id": current.get("trip_id"),
+            "currency": currency,
+            "date": current.get("date")
+        }
+        row.update(changes)
+        fields = self._validate_row(row)
+        if not fields["category"]:
+            fields["category"] = self.classify_description(fields["description"])[0]
         
-        return category, amount, "despesa"
+        transaction = self._build_transaction(
+            transaction_id, fields["amount"], fields["transaction_type"], fields["category"],
+            fields["description"], fields["trip_id"], fields["currency"], current.get("source", "manual"),
+            fields["custom_date"], current.get("exchange_rate") or self.get_exchange_rate("EUR", "BRL")
+        )
+        # Campos extras gravados por versões anteriores são preservados
+        return self._commit("put_transaction", transaction={**current, **transaction})
+    
+    @metrics.timed("classify")
+    def classify_description(self, description: str) -> Tuple[str, float, str]:
+        """IA avançada para classificação automática"""
+        description = description.lower()
+        return DESCRIPTION_CLASSIFIER.classify(description), extract_amount(description), "despesa"
+    
+    @metrics.timed("classify_batch")
+    def classify_descriptions(self, descriptions: List[str]) -> List[Tuple[str, float, str]]:
+        """Classifica vários textos de uma vez (importações em lote)"""
+        classify = DESCRIPTION_CLASSIFIER.classify
+        return [(classify(text), extract_amount(text), "despesa")
+                for text in (description.lower() for description in descriptions)]
     
     def voice_shortcut(self, command: str, custom_date: str = None) -> Dict:
         """Processamento MELHORADO de comandos de voz em português natural"""
         command = command.lower().strip()
         
-        print(f"🎤 Processando comando: '{command}'")
+        logger.debug("🎤 Processando comando: %r", command)
         
-        # Padrões melhorados para português natural
-        patterns = [
-            # Formato: "gravar X euros/reais descrição"
-            r'gravar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'gravar\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            
-            # Formato: "paguei X euros/reais descrição"  
-            r'paguei\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'paguei\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            
-            # Formato: "gastei X euros/reais descrição"
-            r'gastei\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'gastei\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            
-            # Formato: "comprei X euros/reais descrição"
-            r'comprei\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'comprei\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            
-            # Formato: "adicionar X euros/reais descrição"
-            r'adicionar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'adicionar\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            
-            # Formato: "gasto X euros/reais descrição"
-            r'gasto\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'gasto\s+(\d+(?:[.,]\d{1,2})?)\s+(.+)',
+        parsed = parse_voice_command(command)
+        if parsed:
+            amount = parsed["amount"]
+            description = parsed["description"]
             
-            # Formato com símbolo €
-            r'gravar\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            r'paguei\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            r'gastei\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            r'comprei\s+€?(\d+(?:[.,]\d{1,2})?)\s+(.+)',
-            
-            # Formatos alternativos
-            r'registrar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)?\s*(.+)',
-            r'anotar\s+(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)?\s*(.+)',
-            r'despesa\s+(?:de\s+)?(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)?\s*(.+)',
-            
-            # Formato mais flexível - número + descrição
-            r'(\d+(?:[.,]\d{1,2})?)\s+(?:euros?|reais?)\s+(.+)',
-            r'(\d+(?:[.,]\d{1,2})?)\s+(.+)'
-        ]
-        
-        for i, pattern in enumerate(patterns):
-            match = re.search(pattern, command)
-            if match:
-                try:
-                    amount_str = match.group(1).replace(',', '.')
-                    amount = float(amount_str)
-                    description = match.group(2).strip()
-                    
-                    print(f"✅ Padrão {i+1} funcionou: valor={amount}, descrição='{description}'")
-                    
-                    # Valida se é um valor razoável
-                    if amount <= 0 or amount > 10000:
-                        print(f"⚠️ Valor fora do range: {amount}")
-                        continue
-                        
-                    # Valida se a descrição não é muito curta
-                    if len(description) < 2:
-                        print(f"⚠️ Descrição muito curta: '{description}'")
-                        continue
-                    
-                    category, _, _ = self.classify_description(description)
-                    
-                    transaction = self.add_transaction(
-                        amount, "despesa", category, description, source="voice", custom_date=custom_date
-                    )
-                    
-                    print(f"🎉 Transação criada: ID {transaction['id']}")
-                    
-                    return {
-                        "success": True,
-                        "transaction": transaction,
-                        "message": f"🎤 Comando de voz processado: €{amount:.2f} - {category}",
-                        "classification": {
-                            "original_command": command,
-                            "detected_amount": amount,
-                            "detected_category": category,
-                            "confidence": "high",
-                            "pattern_used": f"Padrão {i+1}: {pattern}"
-                        }
+            # Valida se é um valor razoável e se a descrição não é muito curta
+            if 0 < amount <= 10000 and len(description) >= 2:
+                category = DESCRIPTION_CLASSIFIER.classify(description)
+                currency = parsed["currency"] or self.data["settings"]["currency"]
+                
+                transaction = self.add_transaction(
+                    amount, "despesa", category, description, currency=currency,
+                    source="voice", custom_date=custom_date
+                )
+                
+                logger.info("🎉 Transação criada por voz: ID %s", transaction['id'])
+                
+                symbol = "R$" if currency == "BRL" else "€"
+                return {
+                    "success": True,
+                    "transaction": transaction,
+                    "message": f"🎤 Comando de voz processado: {symbol}{amount:.2f} - {category}",
+                    "classification": {
+                        "original_command": command,
+                        "detected_amount": amount,
+                        "detected_currency": currency,
+                        "detected_category": category,
+                        "confidence": "high",
+                        "pattern_used": f"Gramática: {parsed['rule']}"
                     }
-                except (ValueError, IndexError) as e:
-                    print(f"❌ Erro no padrão {i+1}: {e}")
-                    continue
+                }
         
-        print(f"❌ Nenhum padrão funcionou para: '{command}'")
+        logger.info("❌ Comando não reconhecido: %r", command)
         
         return {
             "success": False,
@@ -311,32 +3811,73 @@ class ExpenseTracker:
             "debug": {
                 "command_length": len(command),
                 "has_numbers": bool(re.search(r'\d+', command)),
-                "patterns_tested": len(patterns)
+                "parsed": parsed
             }
         }
     
-    def get_monthly_summary(self, year: int = None, month: int = None) -> Dict:
-        """Resumo mensal com analytics avançados - CORRIGIDO"""
+    def revalue(self, transactions: List[Dict], valuation: str,
+                from_currency: str = "EUR", to_currency: str = "BRL") -> Dict:
+        """Reavalia um conjunto de transações em outra moeda
+        
+        valuation="transaction_date" usa a taxa histórica do dia de cada transação;
+        uma data ISO usa a taxa daquele dia para todas.
+        """
+        key = f"{from_currency}_{to_currency}"
+        amounts = [t.get("amount", 0) for t in transactions]
+        current_rate = self.get_exchange_rate(from_currency, to_currency)
+        
+        if valuation == "transaction_date":
+            converted = self.rate_history.convert(key, amounts, [date_ordinal(t.get("date")) for t in transactions])
+            if converted is None:
+                converted = [amount * current_rate for amount in amounts]
+        else:
+            if not date_ordinal(valuation):
+                raise ValueError(f"Valoração inválida: {valuation}")
+            rate = self.rate_history.rate_on(key, valuation) or current_rate
+            converted = [amount * rate for amount in amounts]
+        
+        totals = {"despesa": 0, "ganho": 0}
+        category_totals = {}
+        for transaction, value in zip(transactions, converted):
+            transaction_type = transaction.get("type")
+            if transaction_type in totals:
+                totals[transaction_type] += value
+            if transaction_type == "despesa":
+                category = transaction.get("category")
+                category_totals[category] = category_totals.get(category, 0) + value
+        
+        return {
+            "mode": "transaction_date" if valuation == "transaction_date" else "date",
+            "date": None if valuation == "transaction_date" else valuation,
+            "currency": to_currency,
+            "total_expenses": totals["despesa"],
+            "total_income": totals["ganho"],
+            "category_distribution": category_totals
+        }
+    
+    @reader
+    def get_monthly_summary(self, year: int = None, month: int = None, valuation: str = None) -> Dict:
+        """Resumo mensal com analytics avançados - CORRIGIDO
+        
+        `valuation` ("transaction_date" ou uma data ISO) acrescenta os totais reavaliados em BRL.
+        """
         if not year:
             year = datetime.now().year
         if not month:
             month = datetime.now().month
         
-        monthly_transactions = []
-        for transaction in self.data["transactions"]:
-            trans_date = datetime.fromisoformat(transaction["date"])
-            if trans_date.year == year and trans_date.month == month:
-                monthly_transactions.append(transaction)
+        monthly_transactions = self.query_transactions(year=year, month=month)
         
-        total_expenses = sum(t["amount"] for t in monthly_transactions if t["type"] == "despesa")
-        total_income = sum(t["amount"] for t in monthly_transactions if t["type"] == "ganho")
+        totals_by_type = self.aggregate_transactions("type", year=year, month=month)
+        total_expenses = totals_by_type.get("despesa", (0, 0))[0]
+        total_income = totals_by_type.get("ganho", (0, 0))[0]
         balance = total_income - total_expenses
         
         # Distribuição por categoria
-        category_expenses = defaultdict(float)
-        for transaction in monthly_transactions:
-            if transaction["type"] == "despesa":
-                category_expenses[transaction["category"]] += transaction["amount"]
+        category_expenses = {
+            category: total for category, (total, _) in
+            self.aggregate_transactions("category", year=year, month=month, type="despesa").items()
+        }
         
         # Analytics avançados - CORRIGIDOS para evitar valores infinitos
         avg_daily_expense = total_expenses / 30 if total_expenses > 0 else 0
@@ -350,24 +3891,23 @@ class ExpenseTracker:
             savings_rate = 0
         
         # Análise por fonte
-        source_analysis = defaultdict(lambda: {"count": 0, "amount": 0})
-        for transaction in monthly_transactions:
-            source = transaction.get("source", "manual")
-            source_analysis[source]["count"] += 1
-            if transaction["type"] == "despesa":
-                source_analysis[source]["amount"] += transaction["amount"]
+        source_expenses = self.aggregate_transactions("source", year=year, month=month, type="despesa")
+        source_analysis = {
+            source: {"count": count, "amount": source_expenses.get(source, (0, 0))[0]}
+            for source, (_, count) in self.aggregate_transactions("source", year=year, month=month).items()
+        }
         
         # Maior gasto
-        expenses = [t for t in monthly_transactions if t["type"] == "despesa"]
+        expenses = [t for t in monthly_transactions if t.get("type") == "despesa"]
         biggest_expense = max(expenses, key=lambda x: x["amount"]) if expenses else None
         
-        return {
+        summary = {
             "year": year,
             "month": month,
             "total_expenses": total_expenses,
             "total_income": total_income,
             "balance": balance,
-            "category_distribution": dict(category_expenses),
+            "category_distribution": category_expenses,
             "transactions": monthly_transactions,
             "analytics": {
                 "avg_daily_expense": avg_daily_expense,
@@ -375,10 +3915,14 @@ class ExpenseTracker:
                 "savings_rate": savings_rate,
                 "transaction_count": len(monthly_transactions),
                 "biggest_expense": biggest_expense,
-                "source_analysis": dict(source_analysis)
+                "source_analysis": source_analysis
             }
         }
+        if valuation:
+            summary["valuation"] = self.revalue(monthly_transactions, valuation)
+        return summary
     
+    @writer
     def create_trip(self, name: str, start_date: str, end_date: str, budget: float = 0) -> Dict:
         """Cria viagem com validação"""
         trip_id = f"trip_{len(self.data['trips']) + 1}"
@@ -393,22 +3937,39 @@ class ExpenseTracker:
             "status": "planned"
         }
         
-        self.data["trips"][trip_id] = trip
-        self.save_data()
-        return trip
+        return self._commit("put_trip", trip=trip)
     
-    def get_trip_summary(self, trip_id: str) -> Optional[Dict]:
-        """Resumo detalhado da viagem"""
+    @writer
+    def update_trip(self, trip_id: str, changes: Dict) -> Dict:
+        """Atualiza os campos de uma viagem existente"""
+        trip = dict(self.data["trips"][trip_id])
+        trip.update({
+            "name": changes.get('name', trip['name']),
+            "start_date": changes.get('start_date', trip['start_date']),
+            "end_date": changes.get('end_date', trip['end_date']),
+            "budget": float(changes.get('budget', trip['budget'])),
+            "updated_at": datetime.now().isoformat()
+        })
+        return self._commit("put_trip", trip=trip)
+    
+    @writer
+    def delete_trip(self, trip_id: str) -> Tuple[Dict, int]:
+        """Remove a viagem e desassocia suas transações"""
+        return self._commit("delete_trip", trip_id=trip_id)
+    
+    @reader
+    def get_trip_summary(self, trip_id: str, include_transactions: bool = True,
+                         valuation: str = None) -> Optional[Dict]:
+        """Resumo detalhado da viagem (`valuation` como em get_monthly_summary)"""
         if trip_id not in self.data["trips"]:
             return None
         
         trip = self.data["trips"][trip_id]
-        trip_transactions = [
-            t for t in self.data["transactions"] 
-            if t.get("trip_id") == trip_id
-        ]
+        trip_transactions = None
+        if include_transactions or valuation:
+            trip_transactions = self.query_transactions(trip_id=trip_id)
         
-        total_spent = sum(t["amount"] for t in trip_transactions if t["type"] == "despesa")
+        total_spent = self.aggregate_transactions(trip_id=trip_id, type="despesa").get(None, (0, 0))[0]
         
         # Calcula duração
         start_date = datetime.fromisoformat(trip["start_date"])
@@ -420,136 +3981,399 @@ class ExpenseTracker:
         budget_percentage = (total_spent / trip["budget"]) * 100 if trip["budget"] > 0 else 0
         
         # Distribuição por categoria
-        category_expenses = defaultdict(float)
-        for transaction in trip_transactions:
-            if transaction["type"] == "despesa":
-                category_expenses[transaction["category"]] += transaction["amount"]
+        category_expenses = {
+            category: total for category, (total, _) in
+            self.aggregate_transactions("category", trip_id=trip_id, type="despesa").items()
+        }
         
-        return {
+        summary = {
             "trip": trip,
             "total_spent": total_spent,
             "daily_average": daily_average,
             "duration": duration,
             "budget_comparison": budget_comparison,
             "budget_percentage": budget_percentage,
-            "category_distribution": dict(category_expenses),
-            "transactions": trip_transactions,
+            "category_distribution": category_expenses,
+            "transactions": trip_transactions if include_transactions else None,
             "status": "over_budget" if budget_comparison < 0 else "on_track"
         }
+        if valuation:
+            summary["valuation"] = self.revalue(trip_transactions, valuation)
+        return summary
     
-    def create_pie_chart(self) -> str:
-        """Gera gráfico de pizza melhorado"""
-        summary = self.get_monthly_summary()
-        
-        if not summary['category_distribution']:
-            return None
-        
-        categories = list(summary['category_distribution'].keys())
-        amounts = list(summary['category_distribution'].values())
-        
-        # Cores mais bonitas
-        colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8']
-        
-        plt.figure(figsize=(12, 8))
-        wedges, texts, autotexts = plt.pie(amounts, labels=categories, autopct='%1.1f%%', 
-                                          colors=colors, startangle=90, shadow=True)
+    # Quantidade de gráficos renderizados mantidos em memória
+    CHART_CACHE_SIZE = 32
+    
+    def create_pie_chart(self, year: int = None, month: int = None, fmt: str = "png") -> Optional[str]:
+        """Gráfico de pizza dos gastos do mês, em PNG (data URI) ou SVG
         
-        # Melhora a aparência
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
+        O resultado fica em cache por (ano, mês, formato, versão dos dados).
+        """
+        year = year or datetime.now().year
+        month = month or datetime.now().month
+        if fmt not in ("png", "svg"):
+            raise ValueError(f"Formato inválido: {fmt}")
         
-        plt.title(f'💰 Distribuição de Gastos - {summary["month"]:02d}/{summary["year"]}', 
-                 fontsize=16, fontweight='bold', pad=20)
-        plt.axis('equal')
+        key = (year, month, fmt, self.version)
+        with self.chart_lock:
+            if key in self.chart_cache:
+                self.chart_cache.move_to_end(key)
+                return self.chart_cache[key]
         
-        # Converte para base64
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', bbox_inches='tight', dpi=150)
-        img_buffer.seek(0)
-        img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-        plt.close()
+        distribution = self.aggregate_transactions("category", year=year, month=month, type="despesa")
+        if not distribution:
+            chart = None
+        else:
+            categories = list(distribution.keys())
+            amounts = [total for total, _ in distribution.values()]
+            title = f'💰 Distribuição de Gastos - {month:02d}/{year}'
+            started = time.perf_counter()
+            if fmt == "svg":
+                chart = render_pie_svg(categories, amounts, title)
+            else:
+                chart = CHART_POOL.submit(render_pie_png, categories, amounts, title).result()
+            metrics.observe("expense_operation_duration_seconds", time.perf_counter() - started,
+                            operation=f"chart_render_{fmt}")
         
-        return f"data:image/png;base64,{img_base64}"
+        with self.chart_lock:
+            self.chart_cache[key] = chart
+            while len(self.chart_cache) > self.CHART_CACHE_SIZE:
+                self.chart_cache.popitem(last=False)
+        return chart
 
 class CurrencyConverter:
     """Conversor de moeda avançado"""
     
-    def __init__(self):
+    def __init__(self, rate_provider: ExchangeRateProvider = None):
         self.api_key = os.environ.get('EXCHANGE_API_KEY', 'demo_key')
-        self.base_url = "https://api.exchangerate-api.com/v4/latest"
-        self.cache = {}
-        self.cache_time = {}
+        self.rate_provider = rate_provider or exchange_rates
         
     def get_exchange_rate(self, from_currency: str, to_currency: str) -> Dict:
         """Obtém taxa com fallback inteligente"""
-        cache_key = f"{from_currency}_{to_currency}"
+        quote = self.rate_provider.get_rate(from_currency, to_currency)
+        if quote is None:
+            return {"error": f"Taxa não disponível para {from_currency} -> {to_currency}"}
         
-        # Verifica cache
-        if (cache_key in self.cache and 
-            cache_key in self.cache_time and
-            datetime.now() - self.cache_time[cache_key] < timedelta(hours=1)):
-            return self.cache[cache_key]
-        
-        try:
-            # Tenta API real
-            response = requests.get(f"{self.base_url}/{from_currency}", timeout=5)
-            data = response.json()
-            
-            if to_currency in data["rates"]:
-                rate = data["rates"][to_currency]
-                commercial_rate = rate * 0.9362 if to_currency == "BRL" else rate * 0.98
-                
-                result = {
-                    "rate": rate,
-                    "commercial_rate": commercial_rate,
-                    "spread": rate - commercial_rate,
-                    "timestamp": datetime.now().isoformat(),
-                    "from_currency": from_currency,
-                    "to_currency": to_currency,
-                    "source": "live_api"
-                }
-                
-                self.cache[cache_key] = result
-                self.cache_time[cache_key] = datetime.now()
-                return result
-                
-        except Exception:
-            pass
-        
-        # Fallback com taxas atualizadas
-        fallback_rates = {
-            "EUR_BRL": {"rate": 6.15, "commercial_rate": 5.76},
-            "USD_BRL": {"rate": 5.45, "commercial_rate": 5.10},
-            "BRL_EUR": {"rate": 0.163, "commercial_rate": 0.152},
-            "BRL_USD": {"rate": 0.184, "commercial_rate": 0.172},
-            "EUR_USD": {"rate": 1.12, "commercial_rate": 1.10},
-            "USD_EUR": {"rate": 0.89, "commercial_rate": 0.87}
+        rate = quote["rate"]
+        commercial_rate = quote.get("commercial_rate") or (rate * 0.9362 if to_currency == "BRL" else rate * 0.98)
+        return {
+            "rate": rate,
+            "commercial_rate": commercial_rate,
+            "spread": rate - commercial_rate,
+            "timestamp": quote["timestamp"].isoformat(),
+            "from_currency": from_currency,
+            "to_currency": to_currency,
+            "source": quote["source"]
         }
+
+# ==================== MULTI-TENANT ====================
+
+class TenantRegistry:
+    """Um ExpenseTracker, com o próprio arquivo de dados, por tenant (usuário ou conta)
+    
+    Os trackers carregados ficam em um LRU: além de max_loaded, ou ociosos há mais de
+    idle_seconds, são descarregados depois de gravar as mutações pendentes, e a
+    próxima requisição do tenant os recarrega do disco. Assim a memória acompanha os
+    tenants ativos, não o total. Um tracker em uso por uma requisição nunca é descarregado.
+    """
+    
+    # A chave vira nome de arquivo: nada de separadores de caminho
+    KEY_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+    
+    def __init__(self, directory: str, max_loaded: int = None, idle_seconds: float = None, **tracker_options):
+        self.directory = directory
+        if max_loaded is None:
+            max_loaded = int(os.environ.get('TENANT_CACHE_SIZE', 64))
+        if idle_seconds is None:
+            idle_seconds = float(os.environ.get('TENANT_IDLE_SECONDS', 300))
+        self.max_loaded = max_loaded
+        self.idle_seconds = idle_seconds
+        self.tracker_options = tracker_options
+        # tenant -> [tracker, requisições em andamento, último uso]; do menos ao mais recente
+        self.entries = OrderedDict()
+        # Tenants sendo descarregados: a recarga espera o flush terminar
+        self.closing = set()
+        self.condition = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+        if idle_seconds > 0:
+            threading.Thread(target=self._sweep_loop, name="tenant-sweeper", daemon=True).start()
+    
+    def data_file(self, key: str) -> str:
+        if not self.KEY_PATTERN.fullmatch(key or ""):
+            raise ValueError(f"Chave de tenant inválida: {key!r}")
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def acquire(self, key: str) -> ExpenseTracker:
+        """Tracker do tenant, criado se preciso (os dados só são lidos no primeiro acesso)
         
-        fallback_key = f"{from_currency}_{to_currency}"
-        if fallback_key in fallback_rates:
-            result = fallback_rates[fallback_key].copy()
-            result.update({
-                "spread": result["rate"] - result["commercial_rate"],
-                "timestamp": datetime.now().isoformat(),
-                "from_currency": from_currency,
-                "to_currency": to_currency,
-                "source": "fallback"
-            })
-            return result
-        
-        return {"error": f"Taxa não disponível para {from_currency} -> {to_currency}"}
+        Cada acquire() deve ser seguido de um release() com a mesma chave.
+        """
+        data_file = self.data_file(key)
+        with self.condition:
+            while key in self.closing:
+                self.condition.wait()
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = [ExpenseTracker(data_file, preload="lazy", **self.tracker_options), 0, 0]
+                metrics.inc("expense_tenant_loads_total")
+            else:
+                self.entries.move_to_end(key)
+            entry[1] += 1
+            entry[2] = time.monotonic()
+            victims = self._take_victims()
+        self._evict(victims)
+        return entry[0]
+    
+    def release(self, key: str):
+        with self.condition:
+            entry = self.entries[key]
+            entry[1] -= 1
+            entry[2] = time.monotonic()
+            self.entries.move_to_end(key)
+    
+    def _take_victims(self) -> List[Tuple[str, ExpenseTracker]]:
+        """Retira do LRU os trackers a descarregar (chamar com o lock)"""
+        idle_before = time.monotonic() - self.idle_seconds if self.idle_seconds > 0 else None
+        excess = len(self.entries) - self.max_loaded
+        victims = []
+        for key, (tracker, active, last_used) in list(self.entries.items()):
+            idle = idle_before is not None and last_used < idle_before
+            if excess <= 0 and not idle:
+                break
+            if active:
+                continue
+            del self.entries[key]
+            self.closing.add(key)
+            victims.append((key, tracker))
+            excess -= 1
+        return victims
+    
+    def _evict(self, victims: List[Tuple[str, ExpenseTracker]]):
+        """Grava e fecha os trackers retirados do LRU (fora do lock: o flush faz I/O)"""
+        for key, tracker in victims:
+            try:
+                tracker.close()
+                metrics.inc("expense_tenant_evictions_total")
+            except Exception:
+                # O tracker volta ao LRU com as mutações pendentes; a próxima varredura tenta de novo
+                logger.exception("❌ Falha ao descarregar o tenant %s", key)
+                with self.condition:
+                    self.entries[key] = [tracker, 0, time.monotonic()]
+            finally:
+                with self.condition:
+                    self.closing.discard(key)
+                    self.condition.notify_all()
+    
+    def sweep(self):
+        """Descarrega os trackers ociosos ou além da capacidade"""
+        with self.condition:
+            victims = self._take_victims()
+        self._evict(victims)
+    
+    def _sweep_loop(self):
+        while True:
+            time.sleep(max(self.idle_seconds / 2, 1))
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("❌ Falha na varredura de tenants ociosos")
+    
+    def close_all(self):
+        """Grava e fecha todos os trackers carregados (desligamento)"""
+        with self.condition:
+            victims = [(key, entry[0]) for key, entry in self.entries.items()]
+            self.entries.clear()
+            self.closing.update(key for key, _ in victims)
+        self._evict(victims)
+    
+    def stats(self) -> Dict:
+        with self.condition:
+            return {
+                "loaded": len(self.entries),
+                "active": sum(1 for entry in self.entries.values() if entry[1]),
+                "capacity": self.max_loaded
+            }
+
+
+metrics.describe("expense_tenant_loads_total", "Trackers de tenant criados (primeiro acesso ou recarga após descarte)")
+metrics.describe("expense_tenant_evictions_total", "Trackers de tenant descarregados (LRU ou ociosidade)")
+metrics.describe("expense_tenants_loaded", "Trackers de tenant em memória")
 
 # Instâncias globais
-tracker = ExpenseTracker()
+# TENANT_MODE=multi: cada requisição informa o tenant (cabeçalho X-Tenant-Key, ?tenant= ou
+# cookie) e `tracker` aponta para o tracker dele durante a requisição. A chave só separa
+# os dados; não é autenticação
+TENANT_MODE = os.environ.get('TENANT_MODE', 'single').lower()
+if TENANT_MODE == "multi":
+    tenants = TenantRegistry(os.environ.get('TENANT_DATA_DIR', 'tenants'))
+    atexit.register(tenants.close_all)
+    tracker = LocalProxy(lambda: g.tracker)
+else:
+    tenants = None
+    # Importar o módulo não lê o arquivo de dados: a carga começa em create_app()
+    tracker = ExpenseTracker(preload="lazy")
 converter = CurrencyConverter()
 
+class RecordJSONProvider(DefaultJSONProvider):
+    """jsonify() que também serializa os registros Transaction"""
+    
+    @staticmethod
+    def default(value: Any) -> Any:
+        if isinstance(value, Transaction):
+            return value.to_dict()
+        return DefaultJSONProvider.default(value)
+
+
 # Aplicação Flask
 app = Flask(__name__)
-CORS(app)
+app.json = RecordJSONProvider(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'expense-tracker-voice-fixed')
 
+# Cabeçalho, parâmetro e cookie que identificam o tenant em TENANT_MODE=multi
+TENANT_HEADER = 'X-Tenant-Key'
+TENANT_COOKIE = 'tenant'
+# Rotas da API que não dependem dos dados de um tenant
+TENANT_FREE_ENDPOINTS = {'health_check', 'metrics_endpoint'}
+
+
+def bind_tenant() -> Optional[Response]:
+    """Associa a requisição ao tracker do tenant (resposta de erro se a chave faltar)"""
+    if not request.path.startswith('/api/') or request.endpoint in TENANT_FREE_ENDPOINTS:
+        return None
+    key = (request.headers.get(TENANT_HEADER) or request.args.get('tenant')
+           or request.cookies.get(TENANT_COOKIE))
+    if not key:
+        return jsonify({"error": f"Informe o tenant ({TENANT_HEADER}, ?tenant= ou cookie)"}), 400
+    try:
+        g.tracker = tenants.acquire(key)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    g.tenant = key
+    return None
+
+
+@app.before_request
+def sync_tracker():
+    """Cada requisição enxerga as gravações feitas por outros workers"""
+    request.environ['metrics.started'] = time.perf_counter()
+    if tenants is not None:
+        error = bind_tenant()
+        if error is not None or 'tracker' not in g:
+            return error
+    tracker.sync()
+
+
+@app.teardown_request
+def release_tenant(exc):
+    """Libera o tracker do tenant (só então ele pode ser descarregado)"""
+    if 'tenant' in g:
+        tenants.release(g.pop('tenant'))
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Latência e contagem por rota (o padrão da rota, não a URL, para limitar as séries)"""
+    started = request.environ.get('metrics.started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("expense_http_request_duration_seconds", time.perf_counter() - started,
+                        method=request.method, route=route)
+        metrics.inc("expense_http_requests_total", method=request.method, route=route,
+                    status=response.status_code)
+    # As páginas abertas com ?tenant= passam a chave às chamadas da API por cookie
+    if tenants is not None and request.args.get('tenant') and not request.path.startswith('/api/'):
+        response.set_cookie(TENANT_COOKIE, request.args['tenant'], samesite='Lax')
+    return response
+
+
+# ==================== CACHE DE RESPOSTAS ====================
+
+class ResponseCache:
+    """LRU de corpos JSON já serializados, por (rota, query string, versão dos dados)"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: Tuple) -> Optional[Tuple[bytes, Dict]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: Tuple, entry: Tuple[bytes, Dict]):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_SIZE', 128)))
+metrics.describe("expense_response_cache_total", "Respostas de leitura por resultado do cache (hit, miss, not_modified)")
+
+# Cabeçalhos das respostas guardados junto com o corpo
+CACHED_HEADERS = ('X-Next-Cursor',)
+
+
+def data_etag() -> str:
+    """ETag da versão atual dos dados
+    
+    Inclui o dia: sem ano/mês explícitos, várias rotas respondem sobre o mês corrente.
+    Em TENANT_MODE=multi inclui o tenant, que entra assim também na chave do cache.
+    """
+    etag = f"v{tracker.data_version}.{tracker.pending_mutations}-{date.today().toordinal()}"
+    return f"{g.tenant}.{etag}" if 'tenant' in g else etag
+
+
+def cached_json(view):
+    """Rota de leitura com ETag/304 e corpo serializado em cache até a próxima mutação
+    
+    Respostas com ?valuation= dependem do câmbio do momento e não passam pelo cache.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if 'valuation' in request.args:
+            return view(*args, **kwargs)
+        tracker.ensure_loaded()
+        etag = data_etag()
+        route = request.url_rule.rule if request.url_rule else request.path
+        
+        if etag in request.if_none_match:
+            metrics.inc("expense_response_cache_total", route=route, result="not_modified")
+            response = Response(status=304)
+        else:
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                # Erros não vão para o cache nem recebem ETag
+                if response.status_code != 200:
+                    return response
+                entry = (response.get_data(), {name: response.headers[name]
+                                               for name in CACHED_HEADERS if name in response.headers})
+                response_cache.put(key, entry)
+                metrics.inc("expense_response_cache_total", route=route, result="miss")
+            else:
+                metrics.inc("expense_response_cache_total", route=route, result="hit")
+                response = Response(entry[0], mimetype='application/json', headers=entry[1])
+        
+        response.set_etag(etag)
+        # O navegador sempre revalida; a revalidação custa só a comparação do ETag
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+
+STARTUP_TIMINGS["module_ms"] = round((time.perf_counter() - STARTUP_STARTED) * 1000, 1)
+
 # ==================== ROUTES PRINCIPAIS ====================
 
 @app.route('/')
@@ -573,37 +4397,25 @@ def dashboard_old():
     return render_template('dashboard_final.html')
 
 @app.route('/api/dashboard/stats')
+@cached_json
 def dashboard_stats():
     """Estatísticas para o dashboard principal"""
     try:
         current_month = datetime.now().month
         current_year = datetime.now().year
         
-        # Separar transações mensais (sem trip_id) e de viagens (com trip_id)
-        monthly_transactions = [
-            t for t in tracker.data["transactions"] 
-            if not t.get('trip_id') and t.get('type') == 'despesa'
-        ]
-        
-        trip_transactions = [
-            t for t in tracker.data["transactions"] 
-            if t.get('trip_id') and t.get('type') == 'despesa'
-        ]
-        
-        # Calcular gastos do mês atual (apenas transações mensais)
-        monthly_expenses = sum(
-            t['amount'] for t in monthly_transactions
-            if datetime.fromisoformat(t['date']).month == current_month and
-               datetime.fromisoformat(t['date']).year == current_year
-        )
+        # Calcular gastos do mês atual (apenas transações mensais, sem trip_id)
+        monthly_expenses = tracker.aggregate_transactions(
+            year=current_year, month=current_month, has_trip=False, type='despesa'
+        ).get(None, (0, 0))[0]
         
-        # Calcular gastos totais em viagens
-        trip_expenses = sum(
-            t['amount'] for t in trip_transactions
-        )
+        # Calcular gastos totais em viagens (transações com trip_id)
+        trip_expenses = tracker.aggregate_transactions(
+            has_trip=True, type='despesa'
+        ).get(None, (0, 0))[0]
         
         # Contar transações totais
-        total_transactions = len(tracker.data["transactions"])
+        total_transactions = tracker.transaction_count
         
         return jsonify({
             "total_transactions": total_transactions,
@@ -616,6 +4428,7 @@ def dashboard_stats():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/monthly/stats')
+@cached_json
 def monthly_stats():
     """Estatísticas mensais com validação de ano"""
     try:
@@ -629,15 +4442,10 @@ def monthly_stats():
             year = current_date.year
         
         # Filtrar transações mensais do período especificado
-        monthly_transactions = [
-            t for t in tracker.data["transactions"] 
-            if not t.get('trip_id') and 
-               t.get('type') == 'despesa' and
-               datetime.fromisoformat(t['date']).month == month and
-               datetime.fromisoformat(t['date']).year == year
-        ]
+        filters = dict(year=year, month=month, has_trip=False, type='despesa')
+        monthly_transactions = tracker.query_transactions(**filters)
         
-        total_spent = sum(t['amount'] for t in monthly_transactions)
+        total_spent = tracker.aggregate_transactions(**filters).get(None, (0, 0))[0]
         transaction_count = len(monthly_transactions)
         
         # Calcular média por dia
@@ -646,10 +4454,10 @@ def monthly_stats():
         average_per_day = total_spent / days_in_month if days_in_month > 0 else 0
         
         # Distribuição por categoria
-        category_distribution = {}
-        for transaction in monthly_transactions:
-            category = transaction['category']
-            category_distribution[category] = category_distribution.get(category, 0) + transaction['amount']
+        category_distribution = {
+            category: total for category, (total, _) in
+            tracker.aggregate_transactions("category", **filters).items()
+        }
         
         return jsonify({
             "month": month,
@@ -665,15 +4473,214 @@ def monthly_stats():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/dashboard')
+@cached_json
 def api_dashboard():
     """API do dashboard"""
-    summary = tracker.get_monthly_summary()
+    try:
+        summary = tracker.get_monthly_summary(
+            year=request.args.get('year', type=int),
+            month=request.args.get('month', type=int),
+            valuation=request.args.get('valuation')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(summary)
 
+# Parâmetros de filtro aceitos por GET /api/transactions
+TRANSACTION_FILTERS = ("year", "month", "from", "to", "trip_id", "category", "type", "source", "limit", "cursor")
+
+# Maior página permitida em GET /api/transactions
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(after: Tuple[int, int]) -> str:
+    """Cursor opaco a partir da posição (dia ordinal, id)"""
+    return base64.urlsafe_b64encode(f"{after[0]}:{after[1]}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        day, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(day), int(transaction_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+def transaction_filters_from_request() -> Dict:
+    """Converte a query string nos filtros de query_transactions/page_transactions"""
+    args = request.args
+    filters = {
+        "year": args.get('year', type=int),
+        "month": args.get('month', type=int),
+        "date_from": args.get('from'),
+        "date_to": args.get('to'),
+        "category": args.get('category'),
+        "type": args.get('type'),
+        "source": args.get('source')
+    }
+    if filters["month"] and not filters["year"]:
+        raise ValueError("Informe 'year' junto com 'month'")
+    for key in ("date_from", "date_to"):
+        if filters[key] and not date_ordinal(filters[key]):
+            raise ValueError(f"Data inválida: {filters[key]}")
+    
+    # trip_id=none seleciona os gastos mensais (sem viagem)
+    trip_id = args.get('trip_id')
+    if trip_id and trip_id.lower() in ('none', 'null'):
+        filters["has_trip"] = False
+    elif trip_id:
+        filters["trip_id"] = trip_id
+    return filters
+
 @app.route('/api/transactions', methods=['GET'])
+@cached_json
 def get_transactions():
-    """Lista transações"""
-    return jsonify(tracker.data["transactions"])
+    """Lista transações (com filtros opcionais e paginação por cursor)"""
+    if not any(key in request.args for key in TRANSACTION_FILTERS):
+        return jsonify(tracker.list_transactions())
+    
+    try:
+        filters = transaction_filters_from_request()
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        if limit is None and cursor is None:
+            return jsonify(tracker.query_transactions(**filters))
+        
+        limit = min(max(limit or MAX_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        after = decode_cursor(cursor) if cursor else None
+        page, next_after = tracker.page_transactions(limit, after, **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # O corpo continua sendo uma lista; a próxima página vem no cabeçalho
+    response = jsonify(page)
+    if next_after:
+        response.headers['X-Next-Cursor'] = encode_cursor(next_after)
+    return response
+
+# Resultados por página na busca textual
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 200
+
+@app.route('/api/search')
+@cached_json
+def search_transactions():
+    """Busca textual nas descrições e categorias (?q=uber, com prefixos e filtros de período/viagem)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Parâmetro 'q' é obrigatório"}), 400
+    try:
+        filters = transaction_filters_from_request()
+        limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), MAX_SEARCH_PAGE_SIZE)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        results, total = tracker.search_transactions(query, limit, offset, **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "query": query,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "results": [{"score": score, "transaction": transaction} for score, transaction in results]
+    })
+
+@app.route('/api/transactions/<int:transaction_id>', methods=['GET'])
+def get_transaction(transaction_id):
+    """Transação pelo ID"""
+    transaction = tracker.get_transaction(transaction_id)
+    if transaction is None:
+        return jsonify({"error": "Transação não encontrada"}), 404
+    return jsonify(transaction)
+
+@app.route('/api/transactions/<int:transaction_id>', methods=['PATCH'])
+def update_transaction(transaction_id):
+    """Altera campos de uma transação"""
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({"success": False, "error": "Corpo JSON inválido"}), 400
+    try:
+        transaction = tracker.update_transaction(transaction_id, changes)
+    except (ValueError, TypeError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if transaction is None:
+        return jsonify({"success": False, "error": "Transação não encontrada"}), 404
+    return jsonify({"success": True, "transaction": transaction})
+
+@app.route('/api/transactions/<int:transaction_id>', methods=['DELETE'])
+def delete_transaction_by_id(transaction_id):
+    """Remove uma transação pelo ID"""
+    removed_transaction = tracker.delete_transaction_by_id(transaction_id)
+    if removed_transaction is None:
+        return jsonify({"success": False, "error": "Transação não encontrada"}), 404
+    logger.info("✅ Transação %s removida: %s - €%s", transaction_id,
+                removed_transaction.get('description', 'N/A'), removed_transaction.get('amount', 0))
+    return jsonify({"success": True, "removed_transaction": removed_transaction})
+
+# Colunas do export, na ordem do CSV
+EXPORT_COLUMNS = ("id", "date", "type", "category", "description", "trip_id", "currency",
+                  "source", "amount_eur", "amount_brl", "exchange_rate")
+
+# Transações lidas por página durante o export (mantém a memória constante)
+EXPORT_PAGE_SIZE = 500
+
+def export_row(transaction: Dict, fallback_rate: float) -> Dict:
+    """Linha do export com os valores em EUR e BRL sempre preenchidos"""
+    rate = transaction.get("exchange_rate") or fallback_rate
+    amount_eur = transaction.get("amount_eur")
+    amount_brl = transaction.get("amount_brl")
+    if amount_eur is None or amount_brl is None:
+        # Registros antigos (ex.: /api/voz) só têm `amount` na moeda original
+        amount = transaction.get("amount", 0)
+        if transaction.get("currency") == "BRL":
+            amount_eur, amount_brl = round(amount / rate, 2), round(amount, 2)
+        else:
+            amount_eur, amount_brl = round(amount, 2), round(amount * rate, 2)
+    
+    row = {column: transaction.get(column) for column in EXPORT_COLUMNS}
+    row.update({"amount_eur": amount_eur, "amount_brl": amount_brl, "exchange_rate": rate})
+    return row
+
+def iter_export_pages(filters: Dict):
+    """Percorre as transações filtradas página a página pelo cursor"""
+    after = None
+    while True:
+        page, after = tracker.page_transactions(EXPORT_PAGE_SIZE, after, **filters)
+        yield page
+        if not after:
+            break
+
+@app.route('/api/export')
+def export_transactions():
+    """Exporta transações em CSV ou NDJSON (streaming)"""
+    data_format = request.args.get('format', 'csv').lower()
+    if data_format not in ('csv', 'ndjson'):
+        return jsonify({"error": f"Formato não suportado: {data_format}"}), 400
+    try:
+        filters = transaction_filters_from_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    fallback_rate = tracker.get_exchange_rate("EUR", "BRL")
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        if data_format == 'csv':
+            writer.writeheader()
+        
+        for page in iter_export_pages(filters):
+            for transaction in page:
+                row = export_row(transaction, fallback_rate)
+                if data_format == 'csv':
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(row, ensure_ascii=False) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    mimetype = "text/csv" if data_format == 'csv' else "application/x-ndjson"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="transacoes.{data_format}"'
+    return response
 
 @app.route('/api/transactions', methods=['POST'])
 def add_transaction():
@@ -694,6 +4701,55 @@ def add_transaction():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
+def iter_bulk_rows():
+    """Linhas da importação em lote: array JSON, NDJSON ou CSV (lidos em streaming)"""
+    formats = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/ndjson": "ndjson"}
+    data_format = request.args.get('format') or formats.get(request.mimetype, "json")
+    
+    if data_format == "json":
+        data = request.get_json()
+        rows = data.get("transactions") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("Envie um array JSON de transações")
+        return iter(rows)
+    
+    lines = (line.decode('utf-8') for line in request.stream)
+    if data_format == "csv":
+        return csv.DictReader(lines)
+    if data_format == "ndjson":
+        return parse_ndjson(lines)
+    raise ValueError(f"Formato não suportado: {data_format}")
+
+def parse_ndjson(lines):
+    """Um objeto JSON por linha; linhas inválidas viram erros da própria linha"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"JSON inválido: {e}")
+
+@app.route('/api/transactions/bulk', methods=['POST'])
+def add_transactions_bulk():
+    """Importa transações em lote (um único commit)"""
+    try:
+        rows = iter_bulk_rows()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    try:
+        created, errors = tracker.add_transactions(rows, source=request.args.get('source', 'import'))
+        return jsonify({
+            "success": True,
+            "created": len(created),
+            "failed": len(errors),
+            "ids": [transaction["id"] for transaction in created],
+            "errors": errors
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/transaction/delete', methods=['POST'])
 def delete_transaction():
     """Deleta transação"""
@@ -710,17 +4766,13 @@ def delete_transaction():
         except (ValueError, TypeError):
             return jsonify({"success": False, "error": "Índice deve ser um número"}), 400
         
-        # Verifica se o índice é válido
-        transactions = tracker.data["transactions"]
-        if index < 0 or index >= len(transactions):
-            return jsonify({"success": False, "error": f"Índice inválido. Deve estar entre 0 e {len(transactions)-1}"}), 400
-        
-        # Remove a transação
-        removed_transaction = transactions.pop(index)
-        print(f"✅ Transação removida no índice {index}: {removed_transaction.get('description', 'N/A')} - €{removed_transaction.get('amount', 0)}")
-        
-        # Salva os dados
-        tracker.save_data()
+        # Remove a transação e persiste (o índice é validado sob o lock de escrita)
+        try:
+            removed_transaction = tracker.delete_transaction(index)
+        except IndexError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        logger.info("✅ Transação removida no índice %s: %s - €%s", index,
+                    removed_transaction.get('description', 'N/A'), removed_transaction.get('amount', 0))
         
         return jsonify({
             "success": True, 
@@ -730,17 +4782,18 @@ def delete_transaction():
                 "amount": removed_transaction.get('amount', 0),
                 "category": removed_transaction.get('category', 'outros')
             },
-            "remaining_count": len(tracker.data["transactions"])
+            "remaining_count": tracker.transaction_count
         })
         
     except Exception as e:
-        print(f"❌ Erro ao deletar transação: {e}")
+        logger.exception("❌ Erro ao deletar transação: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/api/trips', methods=['GET'])
+@cached_json
 def get_trips():
     """Lista viagens"""
-    return jsonify(tracker.data["trips"])
+    return jsonify(tracker.list_trips())
 
 @app.route('/api/trips', methods=['POST'])
 def create_trip():
@@ -767,16 +4820,7 @@ def update_trip(trip_id):
             return jsonify({"success": False, "error": "Viagem não encontrada"}), 404
         
         # Atualizar dados da viagem
-        trip = tracker.data["trips"][trip_id]
-        trip.update({
-            "name": data.get('name', trip['name']),
-            "start_date": data.get('start_date', trip['start_date']),
-            "end_date": data.get('end_date', trip['end_date']),
-            "budget": float(data.get('budget', trip['budget'])),
-            "updated_at": datetime.now().isoformat()
-        })
-        
-        tracker.save_data()
+        trip = tracker.update_trip(trip_id, data)
         return jsonify({"success": True, "trip": trip})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
@@ -796,24 +4840,11 @@ def delete_trip():
         if trip_id not in trips:
             return jsonify({"success": False, "error": "Viagem não encontrada"}), 404
         
-        # Guarda informações da viagem antes de deletar
-        deleted_trip = trips[trip_id]
+        # Remove a viagem e a associação trip_id das transações relacionadas
+        deleted_trip, transactions_updated = tracker.delete_trip(trip_id)
         
-        # Remove a viagem
-        del trips[trip_id]
-        
-        # Remove a associação trip_id das transações relacionadas
-        transactions_updated = 0
-        for transaction in tracker.data["transactions"]:
-            if transaction.get('trip_id') == trip_id:
-                transaction.pop('trip_id', None)
-                transactions_updated += 1
-        
-        # Salva os dados
-        tracker.save_data()
-        
-        print(f"✅ Viagem '{deleted_trip.get('name', 'N/A')}' deletada com sucesso")
-        print(f"📝 {transactions_updated} transações tiveram a associação com a viagem removida")
+        logger.info("✅ Viagem '%s' deletada; %s transações desassociadas",
+                    deleted_trip.get('name', 'N/A'), transactions_updated)
         
         return jsonify({
             "success": True, 
@@ -827,13 +4858,20 @@ def delete_trip():
         })
         
     except Exception as e:
-        print(f"❌ Erro ao deletar viagem: {e}")
+        logger.exception("❌ Erro ao deletar viagem: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/api/trips/<trip_id>')
+@cached_json
 def get_trip_summary(trip_id):
     """Resumo da viagem"""
-    summary = tracker.get_trip_summary(trip_id)
+    # ?transactions=0 devolve só os totais (usado nos cards da página de viagens)
+    include_transactions = request.args.get('transactions', '1').lower() not in ('0', 'false')
+    try:
+        summary = tracker.get_trip_summary(trip_id, include_transactions=include_transactions,
+                                           valuation=request.args.get('valuation'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     if summary:
         return jsonify(summary)
     else:
@@ -866,9 +4904,7 @@ def processar_voz():
         }
 
         # Salva no JSON do tracker
-        tracker.data["transactions"].append(nova_transacao)
-        with open(tracker.data_file, "w", encoding="utf-8") as f:
-            json.dump(tracker.data, f, ensure_ascii=False, indent=4)
+        tracker.add_raw_transaction(nova_transacao)
 
         return jsonify({"mensagem": f"Transação adicionada: R$ {valor:.2f} - {descricao}"})
     
@@ -911,6 +4947,33 @@ def classify_text():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/classify/batch', methods=['POST'])
+def classify_batch():
+    """Classificação IA em lote"""
+    try:
+        data = request.json
+        texts = data.get('texts') if isinstance(data, dict) else data
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return jsonify({"success": False, "error": "Envie uma lista de textos em 'texts'"}), 400
+        
+        results = tracker.classify_descriptions(texts)
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "classifications": [
+                {
+                    "category": category,
+                    "amount": amount,
+                    "type": trans_type,
+                    "original_text": text,
+                    "confidence": "high" if amount > 0 else "medium"
+                }
+                for text, (category, amount, trans_type) in zip(texts, results)
+            ]
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/convert')
 def convert_currency():
     """Conversão de moeda"""
@@ -940,26 +5003,43 @@ def convert_currency():
 
 @app.route('/api/chart/pie')
 def pie_chart():
-    """Gráfico de pizza"""
+    """Gráfico de pizza (?format=svg dispensa matplotlib; &raw=1 devolve o SVG direto)"""
     try:
-        chart_base64 = tracker.create_pie_chart()
-        if chart_base64:
-            return jsonify({"chart": chart_base64})
+        fmt = request.args.get('format', 'png')
+        chart = tracker.create_pie_chart(
+            year=request.args.get('year', type=int),
+            month=request.args.get('month', type=int),
+            fmt=fmt
+        )
+        if chart and fmt == 'svg':
+            if request.args.get('raw') == '1':
+                return Response(chart, mimetype='image/svg+xml')
+            return jsonify({"chart": svg_data_uri(chart)})
+        if chart:
+            return jsonify({"chart": chart})
         else:
             return jsonify({"error": "Dados insuficientes"})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/health')
 def health_check():
-    """Health check"""
+    """Health check (503 enquanto os dados ainda estão sendo carregados)"""
+    # Em TENANT_MODE=multi os dados de cada tenant são carregados sob demanda
+    single = tenants is None
+    ready = tracker.is_loaded if single else True
     return jsonify({
-        "status": "healthy",
+        "status": "healthy" if ready else "starting",
+        "ready": ready,
+        "startup": {**STARTUP_TIMINGS, **(tracker.startup if single else {})},
         "service": "Expense Tracker - Voice Fixed",
         "version": "3.0.2",
         "timestamp": datetime.now().isoformat(),
-        "total_transactions": len(tracker.data["transactions"]),
-        "total_trips": len(tracker.data["trips"]),
+        "total_transactions": tracker.transaction_count if single and ready else None,
+        "total_trips": len(tracker.data["trips"]) if single and ready else None,
+        "tenants": None if single else tenants.stats(),
         "features": [
             "🎤 Microfone Real Corrigido",
             "🧠 Reconhecimento Português Natural",
@@ -968,7 +5048,18 @@ def health_check():
             "✈️ Gestão de Viagens",
             "📊 Analytics Avançados"
         ]
-    })
+    }), 200 if ready else 503
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Métricas no formato texto do Prometheus"""
+    if tenants is not None:
+        gauges = {"expense_tenants_loaded": tenants.stats()["loaded"]}
+        return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+    gauges = {"expense_data_version": tracker.version, "expense_pending_mutations": tracker.pending_mutations}
+    if tracker.is_loaded:
+        gauges["expense_transactions"] = tracker.transaction_count
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/exchange-rate')
 def get_exchange_rate():
@@ -990,7 +5081,19 @@ def get_categories():
     """Lista categorias"""
     return jsonify(tracker.categories)
 
+def create_app() -> Flask:
+    """Ponto de entrada do servidor (ex.: gunicorn "expense_tracker_voice_fixed:create_app()")
+    
+    Começa a carregar os dados conforme PRELOAD; em "background" o servidor aceita
+    conexões enquanto o arquivo de dados é lido.
+    """
+    if tenants is None:
+        tracker.start_loading(os.environ.get('PRELOAD', 'background'))
+    return app
+
 if __name__ == '__main__':
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    create_app()
     print("🎤 EXPENSE TRACKER - MICROFONE CORRIGIDO")
     print("=" * 70)
     print("🌐 Padrões de voz melhorados para português natural")
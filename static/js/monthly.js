@@ -447,14 +447,36 @@ async function processVoiceCommand(command) {
 // 📊 CARREGAMENTO DE DADOS
 // ========================================
 
+async function fetchTransactionPages(params) {
+    // Percorre as páginas de /api/transactions seguindo o cabeçalho X-Next-Cursor
+    const transactions = [];
+    let cursor = null;
+    
+    do {
+        const query = new URLSearchParams(params);
+        query.set('limit', 500);
+        if (cursor) {
+            query.set('cursor', cursor);
+        }
+        
+        const response = await fetch(`/api/transactions?${query}`);
+        transactions.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    
+    return transactions;
+}
+
 async function loadMonthlyTransactions() {
     try {
         console.log('📊 Carregando transações mensais...');
-        const response = await fetch('/api/transactions');
-        const data = await response.json();
         
-        // Filtrar apenas transações sem trip_id (gastos mensais)
-        monthlyTransactions = data.filter(t => !t.trip_id);
+        // O servidor devolve apenas as transações sem trip_id do mês visualizado
+        monthlyTransactions = await fetchTransactionPages({
+            year: currentViewYear,
+            month: currentViewMonth + 1,
+            trip_id: 'none'
+        });
         
         console.log('✅ Transações mensais carregadas:', monthlyTransactions.length);
         
@@ -472,13 +494,8 @@ function updateMonthlyStats() {
     const viewMonth = currentViewMonth;
     const viewYear = currentViewYear;
     
-    // Filtrar transações do mês selecionado
-    const selectedMonthTransactions = monthlyTransactions.filter(t => {
-        const transactionDate = new Date(t.date);
-        return transactionDate.getMonth() === viewMonth && 
-               transactionDate.getFullYear() === viewYear &&
-               t.type === 'despesa';
-    });
+    // Transações do mês selecionado (já filtradas pelo servidor)
+    const selectedMonthTransactions = monthlyTransactions.filter(t => t.type === 'despesa');
     
     // Calcular totais na moeda selecionada
     const totalSpent = selectedMonthTransactions.reduce((sum, t) => {
@@ -551,13 +568,8 @@ function renderTransactionItem(transaction) {
 
 
 function updateCategoryChart() {
-    // Filtrar transações do mês selecionado
-    const selectedMonthTransactions = monthlyTransactions.filter(t => {
-        const transactionDate = new Date(t.date);
-        return transactionDate.getMonth() === currentViewMonth && 
-               transactionDate.getFullYear() === currentViewYear &&
-               t.type === 'despesa';
-    });
+    // Gastos do mês selecionado (já filtrados pelo servidor)
+    const selectedMonthTransactions = monthlyTransactions.filter(t => t.type === 'despesa');
     
     const container = document.getElementById('category-chart-container');
     
@@ -606,12 +618,8 @@ function updateCategoryChart() {
 function renderMonthlyTransactions() {
     const container = document.getElementById('transactions-container');
     
-    // Filtrar transações do mês selecionado
-    const selectedMonthTransactions = monthlyTransactions.filter(t => {
-        const transactionDate = new Date(t.date);
-        return transactionDate.getMonth() === currentViewMonth && 
-               transactionDate.getFullYear() === currentViewYear;
-    });
+    // Transações do mês selecionado (já filtradas pelo servidor)
+    const selectedMonthTransactions = [...monthlyTransactions];
     
     if (selectedMonthTransactions.length === 0) {
         const monthNames = [
@@ -660,13 +668,8 @@ function updateVoiceStatus(message, isRecording = false) {
 }
 
 function updateCategoryChart() {
-    // Filtrar transações do mês selecionado
-    const selectedMonthTransactions = monthlyTransactions.filter(t => {
-        const transactionDate = new Date(t.date);
-        return transactionDate.getMonth() === currentViewMonth && 
-               transactionDate.getFullYear() === currentViewYear &&
-               t.type === 'despesa';
-    });
+    // Gastos do mês selecionado (já filtrados pelo servidor)
+    const selectedMonthTransactions = monthlyTransactions.filter(t => t.type === 'despesa');
     
     const container = document.getElementById('category-chart-container');
     
@@ -780,20 +783,9 @@ async function deleteTransaction(transactionId) {
     }
     
     try {
-        // Encontrar índice da transação
-        const transactionIndex = monthlyTransactions.findIndex(t => t.id === transactionId);
-        
-        if (transactionIndex === -1) {
-            showError('Transação não encontrada');
-            return;
-        }
-        
-        const response = await fetch('/api/transaction/delete', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ transaction_index: transactionIndex })
+        // Remove pelo ID: a posição na lista filtrada não corresponde à do servidor
+        const response = await fetch(`/api/transactions/${transactionId}`, {
+            method: 'DELETE'
         });
         
         const result = await response.json();
@@ -211,8 +211,8 @@ async function renderTripCardWithStats(trip) {
 
 async function calculateTripStatsAsync(trip) {
     try {
-        // Buscar dados detalhados da viagem
-        const response = await fetch(`/api/trips/${trip.id}`);
+        // Buscar apenas os totais da viagem (sem a lista de transações)
+        const response = await fetch(`/api/trips/${trip.id}?transactions=0`);
         const data = await response.json();
         
         if (data.error) {
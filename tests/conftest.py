@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import expense_tracker_voice_fixed as app_module  # noqa: E402
+from synthetic import generate_dataset  # noqa: E402
+
+BACKENDS = ["json", "journal", "sqlite", "binary", "partitioned"]
+
+# Registros gravados por versões anteriores do app, como aparecem nos arquivos antigos
+LEGACY_TRANSACTIONS = [
+    # /api/voz: sem id, tipo, origem e valores convertidos, com as chaves em outra ordem
+    {"date": "2024-02-10", "description": "sushi", "amount": 30.0, "currency": "BRL", "category": "outros"},
+    {"date": "2024-02-11", "description": "pizza", "amount": 12, "currency": "BRL", "category": "outros"},
+    # Dados de demonstração: sem valores convertidos, moeda e origem
+    {"id": 3, "date": "2024-03-01T12:00:00", "amount": 8.5, "type": "despesa", "category": "transporte",
+     "description": "metro", "trip_id": None},
+    # Campos extras de versões antigas, ID em texto, data inválida, sem data
+    {"id": 9001, "date": "2024-04-01", "amount": 5.0, "type": "ganho", "voice_command": "recebi 5 euros",
+     "category": "outros", "description": "reembolso", "source": "voice"},
+    {"id": "17", "date": "não é data", "amount": 3.0, "type": "despesa", "category": "lazer", "source": "voice"},
+    {"amount": 7.25, "type": "ganho", "description": "sem data"},
+    {"id": 9002, "date": "2025-01-05T08:00:00", "amount": 2.5, "type": "despesa", "category": "lazer",
+     "description": "café", "trip_id": "", "currency": "EUR", "source": "web", "original_text": "café 2,50"},
+]
+
+
+@pytest.fixture
+def legacy_dataset():
+    """Dados sintéticos (mesma semente dos benchmarks) misturados a registros antigos"""
+    data = generate_dataset(3000, seed=7)
+    transactions = data["transactions"]
+    for position, legacy in enumerate(LEGACY_TRANSACTIONS):
+        transactions.insert(position * 400, dict(legacy))
+    return data
+
+
+@pytest.fixture
+def make_tracker(tmp_path):
+    """Cria trackers sobre um arquivo de dados temporário (mesmo arquivo a cada chamada)"""
+    data_file = str(tmp_path / "data.json")
+    created = []
+
+    def factory(storage_mode: str = "json", **options):
+        tracker = app_module.ExpenseTracker(data_file, storage_mode=storage_mode, **options)
+        created.append(tracker)
+        return tracker
+
+    yield factory
+    for tracker in created:
+        tracker.close()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def client(monkeypatch, make_tracker, backend):
+    """Cliente HTTP com o tracker global trocado por um tracker do backend do teste"""
+    tracker = make_tracker(backend)
+    monkeypatch.setattr(app_module, "tracker", tracker)
+    app_module.response_cache.clear()
+    return app_module.app.test_client()
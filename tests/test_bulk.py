@@ -0,0 +1,46 @@
+import threading
+
+
+def test_import_reads_rows_outside_the_writer_lock(make_tracker, backend):
+    tracker = make_tracker(backend)
+    concurrent = {}
+
+    def write_from_another_thread():
+        concurrent["transaction"] = tracker.add_transaction(5, "despesa", "outros", "concorrente",
+                                                            custom_date="2025-05-01")
+
+    def slow_upload():
+        yield {"amount": "10", "category": "lazer", "description": "primeira", "date": "2025-05-02"}
+        # Outra escrita termina enquanto o corpo da importação ainda está chegando
+        thread = threading.Thread(target=write_from_another_thread)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive(), "a importação reteve o lock de escrita durante a leitura"
+        yield {"amount": "20", "category": "lazer", "description": "segunda", "date": "2025-05-03"}
+
+    created, errors = tracker.add_transactions(slow_upload())
+
+    assert errors == []
+    imported = [transaction["id"] for transaction in created]
+    assert concurrent["transaction"]["id"] not in imported
+    assert len(set(imported)) == 2
+    assert sorted(t["id"] for t in tracker.list_transactions()) == sorted(
+        imported + [concurrent["transaction"]["id"]])
+    assert tracker.check_rollups() == []
+
+
+def test_import_rejects_rows_whose_trip_was_removed_meanwhile(make_tracker):
+    tracker = make_tracker("json")
+    trip_id = tracker.create_trip("Porto", "2025-05-01", "2025-05-10")["id"]
+
+    def upload():
+        yield {"amount": "10", "category": "lazer", "description": "antes", "trip_id": trip_id}
+        tracker.delete_trip(trip_id)
+        yield {"amount": "x", "description": "inválida"}
+        yield {"amount": "20", "category": "lazer", "description": "sem viagem"}
+
+    created, errors = tracker.add_transactions(upload())
+
+    assert [transaction["description"] for transaction in created] == ["sem viagem"]
+    assert [error["row"] for error in errors] == [1, 2]
+    assert "Viagem não encontrada" in errors[0]["error"]
@@ -0,0 +1,81 @@
+import pytest
+
+import expense_tracker_voice_fixed as app_module
+
+np = pytest.importorskip("numpy")
+
+FILTERS = [
+    {},
+    {"year": 2024},
+    {"year": 2024, "month": 2},
+    {"date_from": "2023-06-15", "date_to": "2024-01-31"},
+    {"type": "despesa"},
+    {"type": "ganho", "year": 2025},
+    {"has_trip": True},
+    {"has_trip": False, "category": "lazer"},
+    {"trip_id": "trip_1"},
+    {"source": "manual"},
+    {"currency": "BRL", "type": "despesa"},
+    {"category": "inexistente"},
+]
+
+
+def assert_same_aggregations(view, transactions):
+    for group_by in (None,) + app_module.GROUP_KEYS:
+        for filters in FILTERS:
+            expected = app_module.aggregate_scan(transactions, group_by, **filters)
+            # Igualdade exata: np.bincount soma na mesma ordem do laço em Python
+            assert view.aggregate(group_by, **dict(filters)) == expected, (group_by, filters)
+
+
+def test_columnar_view_matches_scan(legacy_dataset):
+    transactions = legacy_dataset["transactions"]
+    assert_same_aggregations(app_module.ColumnarView(np, transactions), transactions)
+
+
+def test_columnar_view_matches_scan_after_incremental_updates(legacy_dataset):
+    transactions = legacy_dataset["transactions"]
+    view = app_module.ColumnarView(np, transactions)
+
+    # Remoções trocam com a última linha, como IdIndex.remove
+    for position in (0, 400, 1234, -1):
+        position %= len(transactions)
+        transactions[position] = transactions[-1]
+        transactions.pop()
+        view.remove(position)
+    for position in (5, 800):
+        updated = dict(transactions[position], amount=1.23, category="moradia", date="2025-02-02T10:00:00")
+        transactions[position] = updated
+        view.write(position, updated)
+    added = [dict(legacy, id=10000 + number) for number, legacy in enumerate(transactions[:50])]
+    transactions.extend(added)
+    view.extend(added)
+    transactions.append(dict(added[0], id=20000))
+    view.extend([transactions[-1]])
+
+    assert_same_aggregations(view, transactions)
+
+
+def test_tracker_engines_agree(tmp_path, legacy_dataset):
+    """analytics="numpy" e "python" devolvem o mesmo resultado pelo tracker, também após mutações"""
+    trackers = []
+    for engine in ("numpy", "python"):
+        path = tmp_path / f"{engine}.json"
+        path.write_text(app_module.json.dumps(legacy_dataset), encoding="utf-8")
+        trackers.append(app_module.ExpenseTracker(str(path), analytics=engine))
+    try:
+        for tracker in trackers:
+            tracker.update_transaction(100, {"amount": 99.5, "category": "lazer"})
+            tracker.delete_transaction_by_id(tracker.list_transactions()[10]["id"])
+            tracker.add_raw_transaction({"date": "2024-02-12", "amount": 4.0, "type": "despesa",
+                                         "category": "outros", "description": "nova"})
+        numpy_tracker, python_tracker = trackers
+        assert numpy_tracker.columns is not None and python_tracker.columns is None
+        for group_by in (None,) + app_module.GROUP_KEYS:
+            for filters in FILTERS:
+                assert (numpy_tracker._aggregate_partition(numpy_tracker._resident, group_by, filters)
+                        == python_tracker._aggregate_partition(python_tracker._resident, group_by, filters)), \
+                    (group_by, filters)
+    finally:
+        for tracker in trackers:
+            tracker.close()
@@ -0,0 +1,30 @@
+from datetime import date
+
+from test_pagination import add
+
+
+def test_delete_by_index_follows_the_listed_order(client):
+    this_year = date.today().year
+    add(client, "atual", day=f"{this_year}-01-02")
+    add(client, "antiga", day=f"{this_year - 3}-06-01")
+    add(client, "recente", day=f"{this_year}-01-01")
+
+    listed = client.get("/api/transactions").get_json()
+    assert [t["description"] for t in listed] == ["antiga", "recente", "atual"]
+
+    response = client.post("/api/transaction/delete", json={"transaction_index": 0})
+    assert response.status_code == 200
+    assert response.get_json()["removed_transaction"]["description"] == "antiga"
+    assert response.get_json()["remaining_count"] == 2
+
+    remaining = client.get("/api/transactions").get_json()
+    assert [t["description"] for t in remaining] == ["recente", "atual"]
+
+
+def test_delete_by_index_out_of_range(client):
+    add(client, "unica")
+
+    response = client.post("/api/transaction/delete", json={"transaction_index": 1})
+    assert response.status_code == 400
+    assert "entre 0 e 0" in response.get_json()["error"]
+    assert len(client.get("/api/transactions").get_json()) == 1
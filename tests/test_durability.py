@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+# Intervalo longo: o flush do modo grouped só acontece quando o teste pede
+DEFERRED = [("grouped", {"flush_interval_ms": 60000}), ("shutdown", {})]
+
+
+@pytest.mark.parametrize("durability, options", DEFERRED)
+def test_sqlite_reads_see_pending_mutations(make_tracker, durability, options):
+    tracker = make_tracker("sqlite", durability=durability, **options)
+    added = tracker.add_transaction(10, "despesa", "alimentacao", "almoço", custom_date="2025-05-05")
+    assert tracker.pending_mutations == 1
+
+    summary = tracker.get_monthly_summary(2025, 5)
+    assert summary["total_expenses"] == 10.0
+    assert [t["id"] for t in summary["transactions"]] == [added["id"]]
+    assert summary["analytics"]["transaction_count"] == 1
+    assert summary["analytics"]["source_analysis"] == {"web": {"count": 1, "amount": 10.0}}
+    assert [t["id"] for t in tracker.query_transactions(year=2025)] == [added["id"]]
+    page, cursor = tracker.page_transactions(10, year=2025)
+    assert [t["id"] for t in page] == [added["id"]] and cursor is None
+
+    # Depois do flush as mesmas consultas vão ao SQL e continuam iguais
+    tracker.flush()
+    assert tracker.pending_mutations == 0
+    assert [t["id"] for t in tracker.query_transactions(year=2025)] == [added["id"]]
+    assert tracker.get_monthly_summary(2025, 5)["analytics"]["transaction_count"] == 1
+
+
+@pytest.mark.parametrize("durability, options", DEFERRED)
+def test_deferred_mutations_reach_disk_on_flush(make_tracker, backend, durability, options):
+    tracker = make_tracker(backend, durability=durability, **options)
+    kept = tracker.add_transaction(10, "despesa", "alimentacao", "almoço", custom_date="2025-05-05")
+    removed = tracker.add_transaction(20, "despesa", "lazer", "cinema", custom_date="2024-12-30")
+    tracker.update_transaction(kept["id"], {"amount": 15})
+    tracker.delete_transaction_by_id(removed["id"])
+
+    # Visíveis para os leitores antes do flush, mas ainda não gravadas
+    assert tracker.pending_mutations == 4
+    assert [(t["id"], t["amount"]) for t in tracker.list_transactions()] == [(kept["id"], 15)]
+    assert make_tracker(backend).list_transactions() == []
+
+    # Barreira: ao retornar, tudo o que foi feito antes está no disco
+    tracker.flush()
+    assert tracker.pending_mutations == 0
+    reopened = make_tracker(backend)
+    assert [(t["id"], t["amount"]) for t in reopened.list_transactions()] == [(kept["id"], 15)]
+    assert reopened.check_rollups() == []
+
+    # O contador de IDs também foi gravado: o próximo ID não repete o removido
+    tracker.close()
+    reopened.close()
+    assert make_tracker(backend).add_transaction(5, "despesa", "outros", "nova")["id"] > removed["id"]
+
+
+def test_grouped_mode_flushes_after_the_interval(make_tracker, backend):
+    tracker = make_tracker(backend, durability="grouped", flush_interval_ms=10)
+    tracker.add_transaction(10, "despesa", "alimentacao", "almoço", custom_date="2025-05-05")
+
+    for _ in range(200):
+        if tracker.pending_mutations == 0:
+            break
+        time.sleep(0.01)
+    assert tracker.pending_mutations == 0
+    assert [t["description"] for t in make_tracker(backend).list_transactions()] == ["almoço"]
+
+
+@pytest.mark.parametrize("durability, options", DEFERRED)
+def test_close_flushes_pending_mutations(make_tracker, backend, durability, options):
+    tracker = make_tracker(backend, durability=durability, **options)
+    tracker.add_transaction(10, "despesa", "alimentacao", "almoço", custom_date="2025-05-05")
+    tracker.close()
+
+    reopened = make_tracker(backend)
+    assert [t["description"] for t in reopened.list_transactions()] == ["almoço"]
+    assert reopened.check_rollups() == []
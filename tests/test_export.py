@@ -0,0 +1,26 @@
+import csv
+import io
+import json
+
+import expense_tracker_voice_fixed as app_module
+
+
+def test_export_after_patch_has_every_row_once(client, monkeypatch):
+    # Páginas pequenas: as fronteiras caem no meio das transações do mesmo dia
+    monkeypatch.setattr(app_module, "EXPORT_PAGE_SIZE", 2)
+    ids = []
+    for number in range(7):
+        response = client.post("/api/transactions", json={
+            "amount": 5 + number, "type": "despesa", "category": "lazer",
+            "description": f"t{number}", "date": "2025-05-05T10:00:00"})
+        ids.append(response.get_json()["transaction"]["id"])
+    for transaction_id in (ids[0], ids[3]):
+        assert client.patch(f"/api/transactions/{transaction_id}", json={"amount": 99}).status_code == 200
+    assert client.delete(f"/api/transactions/{ids[5]}").status_code == 200
+    expected = sorted(set(ids) - {ids[5]})
+
+    lines = client.get("/api/export?format=ndjson").get_data(as_text=True).splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == expected
+
+    rows = list(csv.DictReader(io.StringIO(client.get("/api/export?format=csv").get_data(as_text=True))))
+    assert sorted(int(row["id"]) for row in rows) == expected
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.mark.parametrize("storage_mode", ["journal", "binary"])
+def test_append_after_torn_journal_line_survives_reload(make_tracker, storage_mode):
+    tracker = make_tracker(storage_mode)
+    tracker.add_transaction(10, "despesa", "alimentacao", "primeira", custom_date="2025-05-05")
+    tracker.add_transaction(20, "despesa", "alimentacao", "segunda", custom_date="2025-05-06")
+    journal_file = tracker.storage.journal_file
+    tracker.close()
+
+    # Queda no meio da escrita: o último registro ficou pela metade
+    with open(journal_file, "ab") as f:
+        f.write(b'{"seq": 3, "ts": "2025-05-07T00:00:00", "op": "add_trans')
+
+    tracker = make_tracker(storage_mode)
+    assert [t["description"] for t in tracker.list_transactions()] == ["primeira", "segunda"]
+    tracker.add_transaction(30, "despesa", "alimentacao", "depois", custom_date="2025-05-07")
+    tracker.close()
+
+    tracker = make_tracker(storage_mode)
+    assert [t["description"] for t in tracker.list_transactions()] == ["primeira", "segunda", "depois"]
+    assert tracker.check_rollups() == []
@@ -0,0 +1,66 @@
+import json
+
+def add(client, description, day="2025-05-05"):
+    response = client.post("/api/transactions", json={
+        "amount": 10, "type": "despesa", "category": "lazer", "description": description, "date": f"{day}T10:00:00"})
+    assert response.status_code == 200
+    return response.get_json()["transaction"]["id"]
+
+
+def page_all(client, limit=1, **params):
+    ids, cursor = [], None
+    while True:
+        query = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/transactions", query_string=query)
+        assert response.status_code == 200
+        ids += [transaction["id"] for transaction in response.get_json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+
+def test_paging_after_patch_keeps_every_row(client):
+    ids = [add(client, f"t{number}") for number in range(3)]
+    assert client.patch(f"/api/transactions/{ids[0]}", json={"amount": 20}).status_code == 200
+
+    assert page_all(client, year=2025) == ids
+
+
+def test_paging_after_delete_and_backdated_add(client):
+    ids = [add(client, f"t{number}") for number in range(4)]
+    assert client.delete(f"/api/transactions/{ids[1]}").status_code == 200
+    older = add(client, "antiga", day="2025-05-04")
+
+    assert page_all(client, limit=2, year=2025) == [older, ids[0], ids[2], ids[3]]
+
+
+def test_unfiltered_list_is_stable_after_delete(client):
+    june, january, march = (add(client, name, day) for name, day in
+                            [("june", "2025-06-01"), ("jan", "2025-01-01"), ("mar", "2025-03-01")])
+    assert client.delete(f"/api/transactions/{june}").status_code == 200
+
+    listed = client.get("/api/transactions").get_json()
+    assert [transaction["description"] for transaction in listed] == ["jan", "mar"]
+    assert [transaction["id"] for transaction in listed] == page_all(client, limit=1, year=2025)
+
+
+def test_legacy_ids_open_and_page_on_every_backend(tmp_path, make_tracker, backend):
+    legacy = [
+        {"date": "2024-02-10", "description": "sem id", "amount": 30.0, "currency": "BRL", "category": "outros"},
+        {"date": "2024-02-10", "description": "sem id 2", "amount": 5.0, "currency": "BRL", "category": "outros"},
+        {"id": "7", "date": "2024-02-10", "amount": 3.0, "type": "despesa", "category": "lazer"},
+        {"id": 2, "date": "2024-02-09", "amount": 1.0, "type": "despesa", "category": "lazer"},
+    ]
+    (tmp_path / "data.json").write_text(json.dumps({"transactions": legacy, "trips": {}, "settings": {},
+                                                    "metadata": {}}), encoding="utf-8")
+
+    tracker = make_tracker(backend)
+    listed = [transaction["id"] for transaction in tracker.list_transactions()]
+    assert len(listed) == 4 and all(type(transaction_id) is int for transaction_id in listed)
+    paged, cursor = [], None
+    while True:
+        page, cursor = tracker.page_transactions(1, cursor)
+        paged += [transaction["id"] for transaction in page]
+        if cursor is None:
+            break
+    assert paged == listed
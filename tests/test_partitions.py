@@ -0,0 +1,67 @@
+import os
+from datetime import date
+
+import pytest
+
+import expense_tracker_voice_fixed as app_module
+
+THIS_YEAR = date.today().year
+OLD_DAY = f"{THIS_YEAR - 2}-03-01"
+
+
+def crash_before_manifest(monkeypatch):
+    """Queda depois de gravar as partições e antes de trocar o manifesto"""
+    def crash(self, data, rollups, generation):
+        raise OSError("queda simulada")
+    monkeypatch.setattr(app_module.PartitionedStorage, "_write_manifest", crash)
+
+
+def test_crash_between_partition_and_manifest_keeps_previous_state(make_tracker, monkeypatch):
+    tracker = make_tracker("partitioned")
+    moved = tracker.add_transaction(10, "despesa", "alimentacao", "antiga", custom_date=OLD_DAY)
+    kept = tracker.add_transaction(20, "despesa", "lazer", "atual", custom_date=f"{THIS_YEAR}-01-02")
+
+    with monkeypatch.context() as patch:
+        crash_before_manifest(patch)
+        # A linha muda de ano: as duas partições são regravadas antes do manifesto
+        with pytest.raises(OSError):
+            tracker.update_transaction(moved["id"], {"date": f"{THIS_YEAR}-01-01T10:00:00"})
+        with pytest.raises(OSError):
+            tracker.add_transaction(30, "despesa", "outros", "nova", custom_date=f"{THIS_YEAR - 1}-05-05")
+    tracker.close()
+
+    reopened = make_tracker("partitioned")
+    listed = reopened.list_transactions()
+    assert [(t["id"], t["date"][:10]) for t in listed] == [(moved["id"], OLD_DAY),
+                                                          (kept["id"], f"{THIS_YEAR}-01-02")]
+    assert reopened.check_rollups() == []
+    assert reopened.get_transaction(moved["id"])["description"] == "antiga"
+
+    # O estado anterior continua utilizável: nada some nem duplica e os IDs não se repetem
+    reopened.update_transaction(moved["id"], {"date": f"{THIS_YEAR}-01-01T10:00:00"})
+    added = reopened.add_transaction(30, "despesa", "outros", "nova", custom_date=f"{THIS_YEAR - 1}-05-05")
+    assert added["id"] > kept["id"]
+    reopened.close()
+
+    final = make_tracker("partitioned")
+    assert sorted(t["id"] for t in final.list_transactions()) == [moved["id"], kept["id"], added["id"]]
+    assert final.check_rollups() == []
+
+
+def test_unreferenced_partition_files_are_removed(make_tracker, monkeypatch):
+    tracker = make_tracker("partitioned")
+    tracker.add_transaction(10, "despesa", "alimentacao", "antiga", custom_date=OLD_DAY)
+    with monkeypatch.context() as patch:
+        crash_before_manifest(patch)
+        with pytest.raises(OSError):
+            tracker.add_transaction(30, "despesa", "outros", "nova", custom_date=OLD_DAY)
+    tracker.close()
+
+    reopened = make_tracker("partitioned")
+    for day in range(2, 5):
+        reopened.add_transaction(day, "despesa", "outros", "mais", custom_date=f"{THIS_YEAR - 2}-03-0{day}")
+
+    storage = reopened.storage
+    files = sorted(name for name in os.listdir(storage.directory) if name != "manifest.json")
+    # Só ficam os arquivos do manifesto atual e do anterior (para leitores atrasados)
+    assert files == [f"{THIS_YEAR - 2}.{storage.generation - 1}.json", f"{THIS_YEAR - 2}.{storage.generation}.json"]
@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import expense_tracker_voice_fixed as app_module
+from conftest import ROOT
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "rates.json")
+
+
+class FixedRates:
+    """Cotação atual fixa: os testes não dependem da rede"""
+
+    def get_rate(self, from_currency, to_currency):
+        return {"rate": 5.0}
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    path = str(tmp_path / "rates.json")
+    shutil.copy(FIXTURE, path)
+    monkeypatch.setenv("EXCHANGE_RATE_HISTORY", path)
+    return app_module.RateHistory(os.environ["EXCHANGE_RATE_HISTORY"])
+
+
+def test_rate_on_uses_the_last_known_day(history):
+    assert history.rate_on("EUR_BRL", "2025-02-03") == 6.00
+    assert history.rate_on("EUR_BRL", "2025-02-20T12:00:00") == 6.00
+    # Antes do histórico vale a taxa mais antiga; depois dele, a mais recente
+    assert history.rate_on("EUR_BRL", "2024-12-01") == 6.40
+    assert history.rate_on("EUR_BRL", "2025-09-01") == 6.30
+    assert history.rate_on("USD_BRL", "2025-02-03") is None
+
+
+def test_revalue_by_transaction_date_and_fixed_date(make_tracker, history):
+    tracker = make_tracker("json", rate_provider=FixedRates(), history=history)
+    tracker.add_transaction(10, "despesa", "lazer", "cinema", custom_date="2025-01-15")
+    tracker.add_transaction(20, "despesa", "alimentacao", "mercado", custom_date="2025-03-10")
+    tracker.add_transaction(100, "ganho", "salario", "salário", custom_date="2025-02-05")
+    transactions = tracker.list_transactions()
+
+    by_day = tracker.revalue(transactions, "transaction_date")
+    assert by_day["total_expenses"] == pytest.approx(10 * 6.40 + 20 * 6.25)
+    assert by_day["total_income"] == pytest.approx(100 * 6.00)
+    assert by_day["category_distribution"] == pytest.approx({"lazer": 64.0, "alimentacao": 125.0})
+
+    fixed = tracker.revalue(transactions, "2025-04-01")
+    assert fixed["total_expenses"] == pytest.approx(30 * 6.30)
+    assert fixed["date"] == "2025-04-01"
+
+    # Sem histórico do par, vale a cotação atual
+    assert tracker.revalue(transactions, "2025-04-01", "USD", "BRL")["total_expenses"] == pytest.approx(30 * 5.0)
+
+
+def test_save_round_trips_through_the_file(history, tmp_path):
+    history.record("EUR_BRL", "2025-05-02", 6.5)
+    history.save()
+
+    reloaded = app_module.RateHistory(os.environ["EXCHANGE_RATE_HISTORY"])
+    assert reloaded.rate_on("EUR_BRL", "2025-05-10") == 6.5
+    assert reloaded.rate_on("EUR_BRL", "2025-03-03") == 6.25
+    assert not os.path.exists(os.environ["EXCHANGE_RATE_HISTORY"] + ".tmp")
+
+
+def test_module_history_follows_the_environment(history):
+    code = "import expense_tracker_voice_fixed as m; print(m.rate_history.rate_on('EUR_BRL', '2025-03-15'))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == "6.25"
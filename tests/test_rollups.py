@@ -0,0 +1,23 @@
+def test_rollups_match_transactions_after_every_mutation(make_tracker, backend):
+    tracker = make_tracker(backend)
+    trip_id = tracker.create_trip("Lisboa", "2024-03-01", "2024-03-10", budget=500)["id"]
+    first = tracker.add_transaction(10, "despesa", "alimentacao", "almoço", custom_date="2024-03-02")
+    second = tracker.add_transaction(25, "despesa", "transporte", "trem", trip_id=trip_id,
+                                     custom_date="2024-03-03")
+    tracker.add_transaction(1000, "receita", "salario", "salário", custom_date="2025-01-05")
+    assert tracker.check_rollups() == []
+
+    tracker.update_transaction(first["id"], {"amount": 12, "category": "lazer", "date": "2025-02-01T10:00:00"})
+    assert tracker.check_rollups() == []
+
+    tracker.delete_transaction_by_id(first["id"])
+    assert tracker.check_rollups() == []
+
+    tracker.delete_trip(trip_id)
+    assert tracker.get_transaction(second["id"]).get("trip_id") is None
+    assert tracker.check_rollups() == []
+    tracker.close()
+
+    reloaded = make_tracker(backend)
+    assert reloaded.transaction_count == 2
+    assert reloaded.check_rollups() == []
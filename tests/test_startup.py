@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+PROBE = """
+import json, os, sys
+sys.path.insert(0, {root!r})
+import expense_tracker_voice_fixed as module
+imported = {{"loaded": module.tracker.is_loaded, "files": sorted(os.listdir("."))}}
+module.create_app()
+module.tracker.ensure_loaded()
+print(json.dumps({{"imported": imported, "loaded": module.tracker.is_loaded,
+                  "transactions": module.tracker.transaction_count}}))
+"""
+
+
+def run_probe(directory, preload):
+    env = {key: value for key, value in os.environ.items() if key != "PRELOAD"}
+    if preload:
+        env["PRELOAD"] = preload
+    result = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT)], cwd=directory, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_touch_the_data_file(tmp_path):
+    for preload in (None, "eager", "lazy"):
+        directory = tmp_path / (preload or "default")
+        directory.mkdir()
+        (directory / "expense_data_final.json").write_text(json.dumps({
+            "transactions": [{"id": 1, "date": "2025-05-05", "amount": 1.0, "type": "despesa", "category": "lazer"}],
+            "trips": {}, "settings": {}, "metadata": {"next_id": 2}}), encoding="utf-8")
+
+        probe = run_probe(directory, preload)
+        # Nada é lido nem criado (.lock) só por importar o módulo, em nenhum modo
+        assert probe["imported"] == {"loaded": False, "files": ["expense_data_final.json"]}
+        assert probe["loaded"] and probe["transactions"] == 1
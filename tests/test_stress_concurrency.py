@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKENDS, ROOT
+
+
+def test_concurrent_writers_lose_nothing():
+    """Roda o teste de estresse com poucos processos; ele sai com código != 0 se perder escritas"""
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "stress_concurrency.py"),
+         "--processes", "2", "--threads", "2", "--writes", "5", "--modes", ",".join(BACKENDS)],
+        capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert result.stdout.count("✅") == len(BACKENDS)
@@ -0,0 +1,69 @@
+import copy
+import json
+
+import pytest
+
+import expense_tracker_voice_fixed as app_module
+from conftest import LEGACY_TRANSACTIONS
+
+Transaction = app_module.Transaction
+
+
+def dumps(value, **options):
+    return json.dumps(value, ensure_ascii=False, default=app_module.json_default, **options)
+
+
+def test_records_serialize_byte_identical_to_dicts(legacy_dataset):
+    transactions = legacy_dataset["transactions"]
+    records = [Transaction(transaction) for transaction in transactions]
+
+    assert dumps(records, indent=2) == dumps(transactions, indent=2)
+    for transaction, record in zip(transactions, records):
+        assert list(record) == list(transaction)
+        assert record == transaction and dict(record) == transaction
+
+
+@pytest.mark.parametrize("legacy", LEGACY_TRANSACTIONS)
+def test_mutations_keep_dict_key_order(legacy):
+    plain, record = dict(legacy), Transaction(legacy)
+    mutations = [
+        ("set", "amount_eur", 1.5), ("set", "id", 42), ("pop", "trip_id", None), ("set", "trip_id", "trip_1"),
+        ("set", "voice_command", "gravar"), ("set", "amount", 2.0), ("pop", "description", None),
+        ("set", "source", "web"), ("set", "description", "de volta"),
+    ]
+    for action, key, value in mutations:
+        for target in (plain, record):
+            if action == "set":
+                target[key] = value
+            else:
+                target.pop(key, None)
+        assert dumps(record) == dumps(plain), (action, key)
+
+
+def test_backend_round_trip_keeps_json_bytes(tmp_path, make_tracker, backend, legacy_dataset):
+    (tmp_path / "data.json").write_text(json.dumps(legacy_dataset, ensure_ascii=False), encoding="utf-8")
+    expected = copy.deepcopy(legacy_dataset)
+    app_module.assign_ids(expected)
+    expected = {transaction["id"]: json.dumps(transaction, ensure_ascii=False)
+                for transaction in expected["transactions"]}
+
+    for _ in range(2):
+        tracker = make_tracker(backend)
+        loaded = {transaction["id"]: dumps(transaction) for transaction in tracker.list_transactions()}
+        assert loaded == expected
+        # Regravar tudo (snapshot, banco ou partições) e reabrir não muda nada
+        tracker.save_data()
+        tracker.close()
+
+
+def test_only_low_cardinality_fields_are_interned():
+    def fresh(text):
+        # Uma string nova a cada chamada, como as lidas de um arquivo
+        return "".join(list(text))
+
+    first, second = (Transaction({"category": fresh("alimentação"), "source": fresh("voice"),
+                                  "description": fresh("almoço com a equipe")}) for _ in range(2))
+    assert first["category"] is second["category"]
+    assert first["source"] is second["source"]
+    assert first["description"] == second["description"]
+    assert first["description"] is not second["description"]